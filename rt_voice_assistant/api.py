@@ -1,37 +1,100 @@
 import argparse
+import asyncio
+import json
 import logging
+import math
 import os
-import subprocess
-import tempfile
+import socket
 import uuid
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from datetime import datetime
-from tempfile import NamedTemporaryFile
+from functools import partial
+from typing import Annotated
+from urllib.parse import quote
 
-import soundfile as sf
+import numpy as np
 from dotenv import load_dotenv
 from fastapi import (
+    Cookie,
+    Depends,
     FastAPI,
     File,
+    Header,
     HTTPException,
     Query,
+    Request,
     UploadFile,
     WebSocket,
     WebSocketDisconnect,
 )
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import (
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import BaseModel
+from starlette.requests import HTTPConnection
 from starlette.websockets import WebSocketState
 
-from .bricks.llm import clean_thinking, get_client, trim_to_budget
-from .bricks.stt.whispercpp import transcribe
-from .bricks.tts import get_tts_engine
+from .bricks.audio import SR, wav_stream_header
+from .bricks.cancellation import (
+    CancellationToken,
+    Cancelled,
+    get_turn_registry,
+)
+from .bricks.duplex import VoiceSession
+from .bricks.encoding import (
+    FORMATS,
+    AudioFormat,
+    NotAcceptable,
+    encode,
+    get_audio_cache,
+    negotiate,
+)
+from .bricks.executors import Saturated, check_capacity, get_executor
+from .bricks.executors import shutdown as shutdown_executors
+from .bricks.executors import stats as executors_stats
+from .bricks.ingest import UndecodableAudio, decode_audio
+from .bricks.llm import (
+    clean_thinking,
+    complete,
+    get_client,
+    skip_thinking,
+    stream_complete,
+)
+from .bricks.sentences import pipeline_sentences
+from .bricks.sessions import SessionUnavailable, get_session_store
+from .bricks.slo import get_latency_controller
+from .bricks.stt.gate import check_transcript
+from .bricks.stt.language import AUTO, get_language_sessions, resolve_language
+from .bricks.stt.longform import (
+    LONG_AUDIO_S,
+    default_segments,
+    merge_results,
+    transcribe_long,
+)
+from .bricks.stt.remote import stats as stt_remote_stats
+from .bricks.stt.router import (
+    NoBackendAvailable,
+    transcribe_array,
+    transcribe_array_detailed,
+    transcribe_wav_bytes,
+)
+from .bricks.stt.router import stats as stt_router_stats
+from .bricks.stt.streaming import StreamingCallbacks, StreamingTranscriber
+from .bricks.stt.whispercpp import on_shutdown as on_shutdown_stt
+from .bricks.stt.whispercpp import on_startup as on_startup_stt
+from .bricks.stt.whispercpp import stats as stt_stats
+from .bricks.tts import SAMPLE_RATE as TTS_SAMPLE_RATE
+from .bricks.tts import kokoro_language, synthesize
 from .bricks.tts import on_startup as on_startup_tts
 
 load_dotenv()
 
-HISTORY = []
+logger = logging.getLogger("rt_py.api")
+logger.setLevel(logging.DEBUG)
+
 URL = os.getenv("OPENAI_BASE_URL", "https://openrouter.ai/api/v1")
 PROVIDERS_URLS = {
     "openrouter": URL,
@@ -44,12 +107,33 @@ SYSTEM_PROMPT = os.getenv(
 )
 MODEL = os.getenv("MODEL", "openai/gpt-4o")
 VOICE = os.getenv("VOICE", "af_heart")
+STT_MODEL = os.getenv("STT_MODEL", "base")
+# "auto": detected on the first utterances of each session (X-Session-Id), then
+# pinned; requests without a session id are detected one by one
+STT_LANGUAGE = os.getenv("STT_LANGUAGE", "en")
+# the session_node cookie: a load balancer routes on it to keep a session on
+# the node that served it
+NODE_ID = os.getenv("NODE_ID", socket.gethostname())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    on_startup_tts()
+    try:
+        on_startup_stt(STT_MODEL, "en" if STT_LANGUAGE == AUTO else STT_LANGUAGE)
+    except Exception:
+        logger.exception("Could not warm up the whisper.cpp workers")
+    yield
+    on_shutdown_stt()
+    shutdown_executors()
+
 
 app = FastAPI(
     title="RealTime Voice Assistant API",
     description="RealTime Voice Assistant API",
     root_path="/api/v1",
     docs_url="/docs",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -61,10 +145,69 @@ app.add_middleware(
 )
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    on_startup_tts()
-    yield
+@app.middleware("http")
+async def session_cookies(request: Request, call_next):
+    """
+    Give a client without a session id the one its request was served
+    with (see `_session_id`), and pin the client to this node with the
+    session_node cookie, which the load balancer routes on: the conversation
+    is shared across nodes (SESSION_BACKEND), but the language sessions,
+    the turns to cancel and the warm caches are local to each one.
+    """
+    response = await call_next(request)
+    new_session_id = getattr(request.state, "new_session_id", None)
+    if new_session_id is not None:
+        response.set_cookie("session_id", new_session_id, httponly=True)
+    if request.cookies.get("session_node") != NODE_ID:
+        response.set_cookie("session_node", NODE_ID, httponly=True)
+    return response
+
+
+@app.exception_handler(UndecodableAudio)
+async def undecodable_audio_handler(request: Request, exc: UndecodableAudio):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=415, content={"detail": f"Cannot decode the audio: {exc}"}
+    )
+
+
+@app.exception_handler(NotAcceptable)
+async def not_acceptable_handler(request: Request, exc: NotAcceptable):
+    return JSONResponse(
+        status_code=406,
+        content={"detail": str(exc), "formats": list(FORMATS)},
+    )
+
+
+@app.exception_handler(NoBackendAvailable)
+async def no_stt_backend_handler(request: Request, exc: NoBackendAvailable):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "stage": "stt"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(SessionUnavailable)
+async def session_unavailable_handler(request: Request, exc: SessionUnavailable):
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "stage": "sessions"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
+
+
+@app.exception_handler(Saturated)
+async def saturated_handler(request: Request, exc: Saturated):
+    """Fast rejection: the client retries later rather than queue behind us."""
+    logger.warning(f"Rejected {request.url.path}: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "stage": exc.name},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
 
 class TTSRequest(BaseModel):
@@ -72,171 +215,476 @@ class TTSRequest(BaseModel):
     voice: str = "af_heart"  # Default voice
 
 
-async def _prepare_wav_input(file: UploadFile):
+async def _ingest(
+    file: UploadFile, token: CancellationToken | None = None
+) -> np.ndarray:
     """
-    Prepares a WAV file for transcription.
-    If the input file is not WAV, it converts it to WAV using ffmpeg.
-    Returns the path to the temporary WAV file and the path of the original temp file if conversion occurred.
+    The 16 kHz mono samples of an upload, decoded in memory from the upload
+    stream (see `decode_audio`). ffmpeg, when needed, is killed if the token
+    is cancelled.
     """
-    original_temp_name = None
-    input_wav_path = None
-
-    # Check if it's already a WAV file
-    if file.content_type in ["audio/wav", "audio/x-wav"]:
-        with NamedTemporaryFile(delete=False, suffix=".wav") as temp_input_wav:
-            temp_input_wav.write(await file.read())
-            temp_input_wav.flush()
-            input_wav_path = temp_input_wav.name
-    else:
-        # Handle other audio formats (WebM, MP3, MP4, etc.)
-        # Determine file extension from filename or content type
-        if file.filename:
-            original_suffix = os.path.splitext(file.filename)[1]
-        elif file.content_type:
-            # Map common content types to extensions
-            content_type_to_ext = {
-                "audio/webm": ".webm",
-                "audio/mp4": ".m4a",
-                "audio/mpeg": ".mp3",
-                "audio/ogg": ".ogg",
-                "audio/flac": ".flac",
-                "audio/aac": ".aac",
-            }
-            original_suffix = content_type_to_ext.get(file.content_type, ".tmp")
-        else:
-            original_suffix = ".tmp"
-
-        with NamedTemporaryFile(
-            delete=False, suffix=original_suffix
-        ) as temp_original_file:
-            temp_original_file.write(await file.read())
-            temp_original_file.flush()
-            original_temp_name = temp_original_file.name
-
-        with NamedTemporaryFile(delete=False, suffix=".wav") as temp_converted_wav:
-            input_wav_path = temp_converted_wav.name
-
-        # FFmpeg command to convert any audio format to WAV
-        # -f format detection is automatic, so we don't need to specify input format
-        ffmpeg_cmd = [
-            "ffmpeg",
-            "-y",  # Overwrite output file
-            "-i",
-            original_temp_name,  # Input file
-            "-ar",
-            "16000",  # Sample rate: 16kHz
-            "-ac",
-            "1",  # Channels: mono
-            "-c:a",
-            "pcm_s16le",  # Audio codec: 16-bit PCM
-            input_wav_path,
-        ]
-
-        logging.info(
-            f"Converting {file.content_type or 'unknown'} file to WAV: {' '.join(ffmpeg_cmd)}"
-        )
+    logger.info(f"Decoding {file.filename or 'upload'} ({file.content_type})")
+    return await get_executor("transcode").run(decode_audio, file.file, token)
 
-        try:
-            process_handle = subprocess.run(
-                ffmpeg_cmd, check=True, capture_output=True, text=True
-            )
-            logging.info(f"FFmpeg conversion successful: {process_handle.stdout}")
-        except subprocess.CalledProcessError as e:
-            logging.error(f"FFmpeg conversion failed: {e.stderr}")
-            raise
 
-    return input_wav_path, original_temp_name
+async def _watch_disconnect(request: Request, token: CancellationToken):
+    while not token.cancelled:
+        if await request.is_disconnected():
+            token.cancel("client disconnected")
+            return
+        await asyncio.sleep(0.1)
 
 
-@app.post("/tts")
-async def text_to_speech(request: TTSRequest):
-    """Convert text to speech and return audio file."""
+def _client_session_id(
+    header: str | None = Header(None, alias="X-Session-Id"),
+    cookie: str | None = Cookie(None, alias="session_id"),
+) -> str | None:
+    """The X-Session-Id header of a request, else its session_id cookie."""
+    return header or cookie
+
+
+def _session_id(
+    connection: HTTPConnection,
+    client_session_id: str | None = Depends(_client_session_id),
+) -> str:
+    """
+    The session of a request. A client without one gets a new id, sent back
+    as its session_id cookie: until it returns it, its requests are
+    throwaway sessions that share nothing with the other clients.
+    """
+    if client_session_id:
+        return client_session_id
+    connection.state.new_session_id = session_id = uuid.uuid4().hex
+    return session_id
+
+
+@asynccontextmanager
+async def _request_token(request: Request, session_id: str | None = None):
+    """
+    The cancellation token of a request, set when the client disconnects and,
+    for the turns of a session, when a newer turn of the same session starts.
+    It is the current token of the block, and of the stage executors and
+    `asyncio.to_thread` calls made from it: the STT bricks pick it up there.
+    Clients without a session id of their own get a private token.
+    """
+    if session_id is None:
+        token = CancellationToken()
+    else:
+        token = get_turn_registry().start(session_id)
+    watcher = asyncio.create_task(_watch_disconnect(request, token))
     try:
-        tts = get_tts_engine()
+        with token.bound():
+            yield token
+    finally:
+        watcher.cancel()
+        if session_id is not None:
+            get_turn_registry().finish(session_id, token)
+
+
+async def _transcribe(
+    samples: np.ndarray, model: str, language: str, session_id: str | None = None
+):
+    """
+    Transcribe off the event loop: concurrent requests reach the STT brick
+    together and get micro-batched.
+    Returns the text and the language it was transcribed in.
+    """
+    language = await get_executor("stt").run(
+        resolve_language, language, samples, session_id
+    )
+    text = await get_executor("stt").run(
+        transcribe_array, samples, model=model, language=language
+    )
+    return text, language
 
-        samples, sample_rate = tts.create(request.text, voice=request.voice)
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            sf.write(temp_file.name, samples, sample_rate)
-            temp_file_path = temp_file.name
+def _output_format(
+    accept: str = Header(None),
+    requested: str = Query(None, alias="format"),
+) -> AudioFormat:
+    """The audio format of the answer: `?format=`, else the Accept header."""
+    return negotiate(accept, requested)
 
-        return FileResponse(
-            temp_file_path, media_type="audio/wav", filename="tts_output.wav"
+
+def _speech(
+    text: str,
+    voice: str,
+    lang: str,
+    output: AudioFormat,
+    compression_level: float | None = None,
+    token: CancellationToken | None = None,
+) -> bytes:
+    """
+    Synthesized and encoded speech, in memory. A phrase said before comes
+    from the cache, without synthesis nor encoding.
+    """
+    cache = get_audio_cache()
+    key = (text, voice, lang, output.name, compression_level)
+    data = cache.get(key)
+    if data is None:
+        samples, sample_rate = synthesize(text, voice=voice, lang=lang, token=token)
+        data = encode(samples, sample_rate, output, compression_level)
+        cache.put(key, data)
+    return data
+
+
+def _user_turn(session_id: str, text: str) -> list[dict]:
+    """Add the user's words to the session, the messages to send to the LLM."""
+    store = get_session_store()
+    with store.session(session_id) as conversation:
+        conversation.append("user", text)
+        return store.context(conversation, SYSTEM_PROMPT)
+
+
+def _assistant_turn(session_id: str, text: str):
+    with get_session_store().session(session_id) as conversation:
+        conversation.append("assistant", text)
+
+
+def _audio_response(
+    data: bytes, output: AudioFormat, filename: str, headers: dict | None = None
+) -> Response:
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{output.extension}"',
+        **(headers or {}),
+    }
+    if output.name == "pcm":
+        headers["X-Sample-Rate"] = str(TTS_SAMPLE_RATE)
+    return Response(data, media_type=output.media_type, headers=headers)
+
+
+@app.post("/tts")
+async def text_to_speech(
+    request: TTSRequest,
+    output: Annotated[AudioFormat, Depends(_output_format)],
+    compression_level: float = Query(None, ge=0.0, le=1.0),
+):
+    """
+    Convert text to speech and return the audio, in the format asked with
+    `?format=` or the Accept header (pcm, wav, ogg (Opus), mp3 or flac).
+    """
+    try:
+        data = await get_executor("tts").run(
+            _speech,
+            request.text,
+            request.voice,
+            "en-us",
+            output,
+            compression_level,
         )
+        return _audio_response(data, output, "tts_output")
 
+    except Saturated:
+        raise
     except Exception as e:
-        logging.exception("TTS generation failed")
+        logger.exception("TTS generation failed")
         raise HTTPException(status_code=500, detail=f"TTS generation failed: {str(e)}")
 
 
+async def _segment_events(results, language: str, token: CancellationToken):
+    """
+    Server-sent events: one per transcribed chunk, then the merged text.
+    The stream outlives the request handler and its disconnect watcher: when
+    it ends early (client gone) it cancels the token itself.
+    """
+    iterator = iter(results)
+    done = []
+    reading = None
+    finished = False
+    try:
+        while True:
+            # shielded: a chunk being read is waited for, not abandoned
+            reading = asyncio.ensure_future(asyncio.to_thread(next, iterator, None))
+            result = await asyncio.shield(reading)
+            if result is None:
+                break
+            done.append(result)
+            yield f"data: {json.dumps(result.as_dict())}\n\n"
+        final = {"text": merge_results(done), "language": language}
+        yield f"event: done\ndata: {json.dumps(final)}\n\n"
+        finished = True
+    except Cancelled as e:
+        logger.info(f"Transcription stream stopped: {e}")
+    except Saturated as e:
+        # the headers are gone: all we can do is end the stream early
+        logger.warning(f"Transcription stream cut short: {e}")
+    finally:
+        if not finished:
+            token.cancel("stream abandoned")
+        if reading is not None and not reading.done():
+            # the cancelled token ends the chunk being read, then the iterator
+            # can be closed: the chunks not started yet are dropped
+            with suppress(Exception):
+                await reading
+        iterator.close()
+
+
 @app.post("/audio/transcriptions")
 async def transcribe_audio(
-    file: UploadFile = File(...),
-    model: str = Query("base"),
-    language: str = Query("en"),
+    request: Request,
+    file: Annotated[UploadFile, File()],
+    model: str = Query(STT_MODEL),
+    language: str = Query(STT_LANGUAGE),
+    stream: bool = Query(False),
+    session_id: str | None = Depends(_client_session_id),
 ):
-    input_wav_path, original_temp_file_path = await _prepare_wav_input(file)
+    """
+    Long recordings are cut at the speech gaps and the chunks transcribed in
+    parallel. With `stream=true` every chunk is sent as a server-sent event
+    as soon as it and the ones before it are done.
+    A client that disconnects stops the transcription.
+    """
+    check_capacity("transcode", "stt")
+    async with _request_token(request) as token:
+        try:
+            samples = await _ingest(file, token)
+
+            if stream or samples.size / SR > LONG_AUDIO_S:
+                language = await get_executor("stt").run(
+                    resolve_language, language, samples, session_id
+                )
+                # the VAD runs in the STT stage too, before any response is sent
+                regions = await get_executor("stt").run(default_segments, samples, SR)
+
+                def transcribe_chunk(chunk):
+                    # the chunks are submitted from the thread reading the results
+                    with token.bound():
+                        return transcribe_array(chunk, model=model, language=language)
+
+                results = transcribe_long(
+                    samples,
+                    transcribe_chunk,
+                    segment_fn=lambda audio, sr: regions,
+                    executor=get_executor("stt"),
+                )
+                if stream:
+                    return StreamingResponse(
+                        _segment_events(results, language, token),
+                        media_type="text/event-stream",
+                    )
+                results = await asyncio.to_thread(list, results)
+                return {
+                    "text": merge_results(results),
+                    "language": language,
+                    "segments": [result.as_dict() for result in results],
+                }
+
+            text, language = await _transcribe(samples, model, language, session_id)
+        except Cancelled as e:
+            raise HTTPException(status_code=409, detail=f"Cancelled: {e}")
 
     return {
-        "text": transcribe(
-            model=model,
-            language=language,
-            input_wav_path=input_wav_path,
-        ),
+        "text": text,
+        "language": language,
     }
 
 
 @app.post("/audio/completions")
 async def completions(
-    file: UploadFile = File(...),
-    stt_model: str = Query("base"),
+    request: Request,
+    file: Annotated[UploadFile, File()],
+    output: Annotated[AudioFormat, Depends(_output_format)],
+    stt_model: str = Query(STT_MODEL),
     llm_provider: str = Query("openrouter"),
     llm_model: str = Query(MODEL),
-    language: str = Query("en"),
+    language: str = Query(STT_LANGUAGE),
     voice: str = Query(VOICE),
+    stream: bool = Query(False),
+    compression_level: float = Query(None, ge=0.0, le=1.0),
+    session_id: str = Depends(_session_id),
+    client_session_id: str | None = Depends(_client_session_id),
 ):
-    input_wav_path, original_temp_file_path = await _prepare_wav_input(file)
-
-    transcription = transcribe(
-        model=stt_model,
-        language=language,
-        input_wav_path=input_wav_path,
+    """
+    A whole turn: transcription, LLM reply and synthesis. The turn is
+    cancelled (ffmpeg and whisper killed, the LLM stream closed, the synthesis
+    stopped at the next sentence) when the client disconnects or when a newer
+    turn of the same session arrives.
+    A turn is only started when every stage it needs has room for it.
+    The reply audio is in the format asked with `?format=` or the Accept
+    header. With `stream=true` it is sent while it is generated, sentence by
+    sentence, as a WAV of unknown length or raw PCM16 (`format=pcm`).
+    """
+    if stream and not output.streamable:
+        raise NotAcceptable(f"{output.name} cannot be streamed, use wav or pcm")
+    check_capacity("transcode", "stt", "llm", "tts")
+    async with _request_token(request, client_session_id) as token:
+        try:
+            samples = await _ingest(file, token)
+            language = await get_executor("stt").run(
+                resolve_language, language, samples, client_session_id
+            )
+            transcript = await get_executor("stt").run(
+                transcribe_array_detailed, samples, model=stt_model, language=language
+            )
+            # silence, noise or a whisper hallucination: no LLM call, no TTS
+            decision = check_transcript(transcript, duration=samples.size / SR)
+            if not decision:
+                logger.info(f"Turn skipped ({decision.reason}): {decision.text!r}")
+                return Response(
+                    status_code=204,
+                    headers={"X-Transcript-Rejected": decision.reason},
+                )
+            transcription = decision.text
+
+            # a shared backend is a network round trip: off the event loop
+            messages = await asyncio.to_thread(_user_turn, session_id, transcription)
+            url = PROVIDERS_URLS.get(llm_provider, URL)
+            logger.info(f"Using LLM provider: {llm_provider} with URL: {url}")
+            client = get_client(url=url)
+            if stream:
+                # the reply outlives this block: it is a turn of its own
+                return StreamingResponse(
+                    _spoken_reply(
+                        request,
+                        session_id,
+                        client_session_id,
+                        client,
+                        llm_model,
+                        messages,
+                        voice,
+                        language,
+                        output,
+                    ),
+                    media_type=output.media_type,
+                    headers={
+                        "X-Transcript": quote(transcription),
+                        "X-Language": language or "",
+                        "X-Sample-Rate": str(TTS_SAMPLE_RATE),
+                    },
+                )
+            text = await get_executor("llm").run(
+                complete, client, llm_model, messages, token
+            )
+            audible_text = clean_thinking(text)
+            await asyncio.to_thread(_assistant_turn, session_id, audible_text)
+            data = await get_executor("tts").run(
+                _speech,
+                audible_text,
+                voice,
+                kokoro_language(language),
+                output,
+                compression_level,
+                token,
+            )
+        except Cancelled as e:
+            raise HTTPException(status_code=409, detail=f"Cancelled: {e}")
+
+    return _audio_response(
+        data,
+        output,
+        "completions_output",
+        headers={"X-Transcript": quote(transcription)},
     )
 
-    HISTORY.append({"role": "user", "content": transcription})
-    messages = trim_to_budget(HISTORY, SYSTEM_PROMPT, budget=6000)
-    url = PROVIDERS_URLS.get(llm_provider, URL)
-    logging.info(f"Using LLM provider: {llm_provider} with URL: {url}")
-    client = get_client(url=url)
-    response = client.chat.completions.create(
-        model=llm_model,
-        messages=messages,
-    )
-    text = response.choices[0].message.content
-    audible_text = clean_thinking(text)
-    tts_language = {"en": "en-us", "fr": "fr-fr"}.get(language, "en-us")
-    tts = get_tts_engine()
-    samples, sample_rate = tts.create(audible_text, voice=voice, lang=tts_language)
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-        sf.write(temp_file.name, samples, sample_rate)
-        temp_file_path = temp_file.name
-
-    return FileResponse(
-        temp_file_path,
-        media_type="audio/wav",
-        filename="completions_output.wav",
-    )
+
+async def _spoken_reply(
+    request: Request,
+    session_id: str,
+    client_session_id: str | None,
+    client,
+    llm_model: str,
+    messages: list[dict],
+    voice: str,
+    language: str,
+    output: AudioFormat,
+):
+    """
+    The LLM reply, streamed as audio: the next sentences are generated while
+    the current one is synthesized, and each sentence is sent once synthesized.
+    """
+    async with _request_token(request, client_session_id) as token:
+        if output.name == "wav":
+            yield wav_stream_header(TTS_SAMPLE_RATE)
+        sentences = pipeline_sentences(
+            skip_thinking(stream_complete(client, llm_model, messages, token))
+        )
+        finished = False
+        reply = []
+        try:
+            while True:
+                sentence = await asyncio.to_thread(next, sentences, None)
+                if sentence is None:
+                    finished = True
+                    break
+                reply.append(sentence)
+                # cached as PCM: the WAV stream only differs by its header
+                yield await get_executor("tts").run(
+                    _speech,
+                    sentence,
+                    voice,
+                    kokoro_language(language),
+                    FORMATS["pcm"],
+                    None,
+                    token,
+                )
+        except Cancelled as e:
+            logger.info(f"Spoken reply stopped: {e}")
+        except Saturated as e:
+            # the headers are gone: all we can do is end the audio early
+            logger.warning(f"Spoken reply cut short: {e}")
+        finally:
+            if reply:
+                try:
+                    await asyncio.to_thread(
+                        _assistant_turn, session_id, " ".join(reply)
+                    )
+                except SessionUnavailable as e:
+                    logger.warning(f"Spoken reply not remembered: {e}")
+            if not finished:
+                token.cancel("reply abandoned")
+            try:
+                sentences.close()
+            except ValueError:
+                pass  # still reading in a worker thread: the cancelled token ends it
 
 
 @app.post("/assistant/clear-history")
-async def clear_history():
-    HISTORY.clear()
+async def clear_history(session_id: str | None = Depends(_client_session_id)):
+    """Forget the conversation of this session only."""
+    if session_id is not None:
+        await asyncio.to_thread(get_session_store().clear, session_id)
     return {"message": "History cleared"}
 
 
+@app.get("/metrics")
+async def metrics():
+    return {
+        "stt": stt_stats(),
+        "stt_router": stt_router_stats(),
+        "stt_language": get_language_sessions().stats(),
+        "stt_remote": stt_remote_stats(),
+        "latency": get_latency_controller().stats(),
+        "turns": get_turn_registry().stats(),
+        "executors": executors_stats(),
+        "sessions": await asyncio.to_thread(get_session_store().stats),
+        "tts_cache": get_audio_cache().stats(),
+    }
+
+
 @app.websocket("/wss/audio/transcriptions")
 async def websocket_audio(websocket: WebSocket):
+    """
+    One WAV utterance per binary message, one reply per utterance. An
+    utterance arriving before the previous one is transcribed replaces it.
+    """
     await websocket.accept()
+    pending: tuple[CancellationToken, asyncio.Task] | None = None
+
+    async def reply(data: bytes, token: CancellationToken):
+        try:
+            with token.bound():
+                full_text = await get_executor("stt").run(
+                    transcribe_wav_bytes,
+                    data,
+                    model="small",
+                    language="en",
+                )
+        except Cancelled:
+            return
+        except Saturated as e:
+            await websocket.send_json({"error": str(e), "retry_after": e.retry_after})
+            return
+        await websocket.send_json({"text": full_text})
 
     try:
         while True:
@@ -244,22 +692,182 @@ async def websocket_audio(websocket: WebSocket):
             if not data:
                 break
 
-            utterance_filename = f"data/out-{uuid.uuid4()}.wav"
-            with open(utterance_filename, "wb") as f:
-                f.write(data)
+            if pending is not None:
+                pending[0].cancel("superseded by a new utterance")
+            token = CancellationToken()
+            pending = (token, asyncio.create_task(reply(data, token)))
 
-            full_text = transcribe(
-                model="small",
-                language="en",
-                input_wav_path=utterance_filename,
-            )
+        if pending is not None:
+            await pending[1]
+
+    except WebSocketDisconnect:
+        print("WebSocket disconnected")
+    finally:
+        if pending is not None:
+            pending[0].cancel("client disconnected")
+        if websocket.client_state != WebSocketState.DISCONNECTED:
+            await websocket.close()
+
+
+@app.websocket("/wss/audio/transcriptions/stream")
+async def websocket_audio_stream(
+    websocket: WebSocket,
+    model: str = Query("small"),
+    language: str = Query("en"),
+):
+    """
+    Incremental transcription of utterances streamed as raw audio.
+    Binary messages are 16 kHz mono PCM16 chunks, the text message "end" closes
+    the current utterance. Replies with JSON events:
+      {"type": "partial", "committed": ..., "tentative": ...}
+      {"type": "final", "text": ...}
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def emit(event: dict):
+        loop.call_soon_threadsafe(events.put_nowait, event)
+
+    # the partials run in the STT stage too: a saturated stage skips them
+    streaming = StreamingTranscriber(
+        lambda audio: get_executor("stt").call(
+            transcribe_array, audio, model=model, language=language
+        ),
+        cb=StreamingCallbacks(
+            on_partial=lambda committed, tentative: emit(
+                {"type": "partial", "committed": committed, "tentative": tentative}
+            ),
+            on_final=lambda text: emit({"type": "final", "text": text}),
+        ),
+    )
+
+    async def send_events():
+        while True:
+            await websocket.send_json(await events.get())
+
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                pcm = np.frombuffer(message["bytes"], dtype=np.int16)
+                streaming.feed(pcm.astype(np.float32) / 32768.0)
+            elif message.get("text") == "end":
+                # not in the STT stage itself: finish() queues its decode there
+                await asyncio.to_thread(streaming.finish)
+
+    except WebSocketDisconnect:
+        print("WebSocket disconnected")
+    finally:
+        streaming.close()
+        sender.cancel()
+        if websocket.client_state != WebSocketState.DISCONNECTED:
+            await websocket.close()
 
-            message_to_send = {"text": full_text}
-            await websocket.send_text(str(message_to_send))
+
+@app.websocket("/wss/session")
+async def websocket_session(
+    websocket: WebSocket,
+    stt_model: str = Query(STT_MODEL),
+    language: str = Query(STT_LANGUAGE),
+    llm_provider: str = Query("openrouter"),
+    llm_model: str = Query(MODEL),
+    voice: str = Query(VOICE),
+    session_id: str = Depends(_session_id),
+    client_session_id: str | None = Depends(_client_session_id),
+):
+    """
+    A full-duplex voice session: the client streams its microphone, the server
+    detects the turns and answers with speech on the same socket.
+
+    In: binary messages of 16 kHz mono PCM16 (any size), the text message
+    "end" to close the current utterance (push-to-talk), "interrupt" to
+    stop the assistant.
+    With `language=auto` the language is detected as for the HTTP turns, in
+    the session of the client or else of the connection.
+    Out: JSON events (speech_start, speech_end, partial, final, rejected,
+    llm_token, audio, response_end, interrupted, error); every "audio"
+    event is followed by a binary message of PCM16 at its sample_rate.
+    """
+    # torch is only needed by the sessions
+    from .bricks.vad.silero import SileroProb
+
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    outbox: asyncio.Queue = asyncio.Queue()
+
+    def send(message):
+        loop.call_soon_threadsafe(outbox.put_nowait, message)
+
+    turn_language = "en" if language == AUTO else language
+
+    def transcribe(audio: np.ndarray) -> str:
+        nonlocal turn_language
+        if language == AUTO:
+            languages = get_language_sessions().get(session_id)
+            if languages.pinned or languages.enough_speech(audio):
+                turn_language = get_executor("stt").call(languages.language_for, audio)
+            else:
+                # a partial window is too short to identify: the last language
+                turn_language = languages.guess()
+        return get_executor("stt").call(
+            transcribe_array, audio, model=stt_model, language=turn_language
+        )
+
+    # called from the turn thread of the session, never on the event loop
+    def respond(text: str, token: CancellationToken):
+        messages = _user_turn(session_id, text)
+        client = get_client(url=PROVIDERS_URLS.get(llm_provider, URL))
+        return skip_thinking(stream_complete(client, llm_model, messages, token))
+
+    session = VoiceSession(
+        prob_fn=await asyncio.to_thread(SileroProb),
+        transcribe_fn=transcribe,
+        respond_fn=respond,
+        synthesize_fn=lambda sentence, token: get_executor("tts").call(
+            synthesize,
+            sentence,
+            voice=voice,
+            lang=kokoro_language(turn_language),
+            token=token,
+        ),
+        emit_event=send,
+        emit_audio=send,
+        save_reply_fn=partial(_assistant_turn, session_id),
+    )
+
+    async def send_messages():
+        while True:
+            message = await outbox.get()
+            if isinstance(message, bytes):
+                await websocket.send_bytes(message)
+            else:
+                await websocket.send_json(message)
+
+    sender = asyncio.create_task(send_messages())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes"):
+                session.feed(message["bytes"])
+            elif message.get("text") == "end":
+                session.end_of_speech()
+            elif message.get("text") == "interrupt":
+                session.interrupt()
 
     except WebSocketDisconnect:
         print("WebSocket disconnected")
     finally:
+        session.close()
+        sender.cancel()
+        if client_session_id is None:
+            # the language session of the connection goes with it
+            get_language_sessions().drop(session_id)
         if websocket.client_state != WebSocketState.DISCONNECTED:
             await websocket.close()
 
@@ -1,5 +1,8 @@
+import io
+import struct
+
 import numpy as np
-import sounddevice as sd
+import soundfile as sf
 
 SR = 16000
 
@@ -39,8 +42,40 @@ def prepare_for_write(x: np.ndarray, sr: int = SR) -> np.ndarray:
     return x
 
 
+def to_wav_bytes(x: np.ndarray, sr: int = SR, subtype: str = "FLOAT") -> bytes:
+    """Encode a mono signal as an in-memory WAV file."""
+    buffer = io.BytesIO()
+    sf.write(buffer, x, sr, format="WAV", subtype=subtype)
+    return buffer.getvalue()
+
+
+def to_pcm16(x: np.ndarray) -> bytes:
+    """Little endian 16-bit PCM of a float signal in [-1, 1]."""
+    x = np.clip(np.asarray(x, dtype=np.float32).reshape(-1), -1.0, 1.0)
+    return (x * 32767.0).astype("<i2").tobytes()
+
+
+def wav_stream_header(sr: int, channels: int = 1) -> bytes:
+    """
+    The header of a PCM16 WAV file of unknown length, to stream the samples
+    right after it. The sizes are set to the maximum, as players expect.
+    """
+    byte_rate = sr * channels * 2
+    return (
+        b"RIFF"
+        + struct.pack("<I", 0xFFFFFFFF)
+        + b"WAVEfmt "
+        + struct.pack("<IHHIIHH", 16, 1, channels, sr, byte_rate, channels * 2, 16)
+        + b"data"
+        + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
 def list_audio_devices():
     """List available audio devices to help with troubleshooting."""
+    # imported here: PortAudio is not needed to prepare audio on a server
+    import sounddevice as sd
+
     print("Available audio devices:")
     devices = sd.query_devices()
     for i, device in enumerate(devices):
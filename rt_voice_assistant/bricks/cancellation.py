@@ -0,0 +1,178 @@
+import logging
+import subprocess
+import threading
+from collections.abc import Callable
+from concurrent.futures import CancelledError, Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("rt_py.bricks.cancellation")
+logger.setLevel(logging.DEBUG)
+
+POLL_S = 0.05
+
+
+class Cancelled(Exception):
+    pass
+
+
+class CancellationToken:
+    """
+    Set once when the work it was handed to is no longer wanted: the client
+    went away, or a newer utterance replaced this one. The work checks it
+    between steps, and the steps that block (a subprocess, an HTTP stream)
+    register a callback that aborts them.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: list[Callable[[], None]] = []
+        self.reason: str | None = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.info(f"Cancelling: {reason}")
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                logger.exception("Cancellation callback failed")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise Cancelled(self.reason)
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]):
+        """Run `callback` if the token is cancelled while inside the block."""
+        with self._lock:
+            registered = not self._event.is_set()
+            if registered:
+                self._callbacks.append(callback)
+        if not registered:
+            callback()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+    @contextmanager
+    def bound(self):
+        """Make this the `current_token()` of the block (and of to_thread calls)."""
+        reset = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(reset)
+
+
+_current: ContextVar[CancellationToken] = ContextVar("cancellation_token", default=None)
+
+
+def current_token() -> CancellationToken:
+    return _current.get()
+
+
+def run_process(
+    cmd: list[str],
+    input: bytes | None = None,
+    token: CancellationToken | None = None,
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """
+    `subprocess.run(cmd, check=True, capture_output=True)`, killed as soon
+    as the token is cancelled (raises Cancelled then).
+    """
+    token = token or current_token()
+    if token is None:
+        return subprocess.run(
+            cmd, check=True, capture_output=True, input=input, **kwargs
+        )
+
+    token.raise_if_cancelled()
+    with (
+        subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if input is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            **kwargs,
+        ) as process,
+        token.on_cancel(process.kill),
+    ):
+        stdout, stderr = process.communicate(input)
+    token.raise_if_cancelled()
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+
+def future_result(future: Future, token: CancellationToken | None = None):
+    """Wait for a future, giving up (and cancelling it if not started) on cancel."""
+    token = token or current_token()
+    if token is None:
+        return future.result()
+    with token.on_cancel(future.cancel):
+        while True:
+            if token.cancelled:
+                # the callback may still be on its way from the cancelling thread
+                future.cancel()
+                token.raise_if_cancelled()
+            try:
+                return future.result(timeout=POLL_S)
+            except FutureTimeout:
+                continue
+            except CancelledError:
+                token.raise_if_cancelled()
+                raise
+
+
+class TurnRegistry:
+    """
+    One turn in flight per session: starting a turn cancels the previous one
+    of the same session (the user spoke again before the answer came).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turns: dict[str, CancellationToken] = {}
+        self.superseded = 0
+
+    def start(self, session_id: str) -> CancellationToken:
+        token = CancellationToken()
+        with self._lock:
+            previous = self._turns.get(session_id)
+            self._turns[session_id] = token
+        if previous is not None and not previous.cancelled:
+            self.superseded += 1
+            previous.cancel(f"superseded by a new turn of {session_id}")
+        return token
+
+    def finish(self, session_id: str, token: CancellationToken):
+        with self._lock:
+            if self._turns.get(session_id) is token:
+                del self._turns[session_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"inflight": len(self._turns), "superseded": self.superseded}
+
+
+turns = TurnRegistry()
+
+
+def get_turn_registry() -> TurnRegistry:
+    return turns
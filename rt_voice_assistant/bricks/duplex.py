@@ -0,0 +1,346 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .audio import to_pcm16
+from .cancellation import CancellationToken, Cancelled
+from .frame_processor import Callbacks, FrameProcessor, FrameProcessorOptions
+from .sentences import SentenceBuffer
+from .stt.gate import check_transcript
+from .stt.streaming import StreamingCallbacks, StreamingTranscriber
+
+logger = logging.getLogger("rt_py.bricks.duplex")
+logger.setLevel(logging.DEBUG)
+
+# ---- Types ------------------------------------------------------------------
+
+ProbFn = Callable[[np.ndarray], float]  # float32 frame -> P(speech)
+TranscribeFn = Callable[[np.ndarray], str]  # float32 mono @ 16 kHz -> text
+RespondFn = Callable[[str, CancellationToken], Iterator[str]]  # user text -> LLM tokens
+SynthesizeFn = Callable[[str, CancellationToken], tuple]  # sentence -> (samples, sr)
+SaveReplyFn = Callable[[str], None]  # the reply, as far as the user heard it
+EmitEvent = Callable[[dict], None]
+EmitAudio = Callable[[bytes], None]
+
+
+# ---- Options ----------------------------------------------------------------
+
+
+@dataclass
+class SessionOptions:
+    sample_rate: int = 16000
+    frame_samples: int = 512  # what Silero expects @ 16 kHz
+    max_backlog_s: float = 2.0  # audio the VAD may lag behind before frames are dropped
+    partials: bool = True  # incremental transcription while the user speaks
+
+
+# ---- Jitter buffer ------------------------------------------------------------
+
+
+class JitterBuffer:
+    """
+    Reframe PCM16 packets of any size (and any byte alignment) into the
+    fixed-size float32 frames of the VAD, between the socket (`push`) and
+    the VAD thread (`pop`). When the VAD falls more than `max_frames`
+    behind, the oldest frames are dropped: the session stays real time
+    rather than answering late.
+    """
+
+    def __init__(self, frame_samples: int = 512, max_frames: int = 64):
+        self.frame_samples = frame_samples
+        self.max_frames = max_frames
+        self._cond = threading.Condition()
+        self._pending = b""
+        self._frames: deque[np.ndarray] = deque()
+        self._unfinished = 0
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, data: bytes):
+        with self._cond:
+            data = self._pending + data
+            frame_bytes = self.frame_samples * 2
+            whole = len(data) // frame_bytes * frame_bytes
+            self._pending = data[whole:]
+            if whole:
+                pcm = np.frombuffer(data[:whole], dtype="<i2").astype(np.float32)
+                frames = (pcm / 32768.0).reshape(-1, self.frame_samples)
+                self._frames.extend(frames)
+                self._unfinished += len(frames)
+            overflow = len(self._frames) - self.max_frames
+            if overflow > 0:
+                self.dropped += overflow
+                self._unfinished -= overflow
+                for _ in range(overflow):
+                    self._frames.popleft()
+                logger.warning(f"Jitter buffer overrun: {overflow} frames dropped")
+            self._cond.notify_all()
+
+    def pop(self, timeout: float | None = None):
+        """The next frame, None on timeout or once closed and drained."""
+        with self._cond:
+            while not self._frames and not self.closed:
+                if not self._cond.wait(timeout):
+                    return None
+            return self._frames.popleft() if self._frames else None
+
+    def task_done(self):
+        with self._cond:
+            self._unfinished -= 1
+            self._cond.notify_all()
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until every frame pushed so far has been processed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unfinished <= 0, timeout)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._frames)
+
+
+# ---- Session ------------------------------------------------------------------
+
+
+class VoiceSession:
+    """
+    A full-duplex voice turn-taking loop over one stream of PCM16 frames.
+
+    The packets go through the jitter buffer, then the VAD and the
+    FrameProcessor on a thread of their own.
+    While the user speaks, partial transcripts are emitted; at the end of
+    the utterance the final transcript goes through the gate, the LLM reply
+    is emitted token by token, and each sentence is synthesized and emitted
+    as PCM16 as soon as it is complete. A user speaking over the assistant
+    cancels the reply (barge-in) once the VAD confirms it is speech, not a
+    cough or a click. The reply goes to `save_reply_fn` as far as it was
+    spoken.
+
+    Events: speech_start, speech_end, partial, final, rejected, llm_token,
+    audio (followed by the PCM16 binary chunk), response_end, interrupted.
+    """
+
+    def __init__(
+        self,
+        prob_fn: ProbFn,
+        transcribe_fn: TranscribeFn,
+        respond_fn: RespondFn,
+        synthesize_fn: SynthesizeFn,
+        emit_event: EmitEvent,
+        emit_audio: EmitAudio,
+        options: SessionOptions | None = None,
+        frame_options: FrameProcessorOptions | None = None,
+        save_reply_fn: SaveReplyFn | None = None,
+    ):
+        self.opt = options or SessionOptions()
+        self._transcribe_fn = transcribe_fn
+        self._respond_fn = respond_fn
+        self._synthesize_fn = synthesize_fn
+        self._save_reply_fn = save_reply_fn
+        self._emit_event = emit_event
+        self._emit_audio = emit_audio
+
+        self.jitter = JitterBuffer(
+            self.opt.frame_samples,
+            max_frames=int(
+                self.opt.max_backlog_s * self.opt.sample_rate / self.opt.frame_samples
+            ),
+        )
+        self.frame_processor = FrameProcessor(
+            prob_fn=prob_fn,
+            options=frame_options or FrameProcessorOptions(),
+            cb=Callbacks(
+                on_speech_start=self._on_speech_start,
+                on_speech_real_start=self._on_speech_real_start,
+                on_speech_frame=self._on_speech_frame,
+                on_speech_segment=self._on_speech_segment,
+                on_vad_misfire=self._on_vad_misfire,
+            ),
+        )
+        self._streaming: StreamingTranscriber | None = None
+        self._lock = threading.Lock()
+        self._turn: CancellationToken | None = None
+        self._turn_future: Future | None = None
+        # turns are answered one after the other; the STT and TTS work in
+        # them is bounded by the callables (the API runs them in its stages)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="turn")
+        self._end_requested = threading.Event()
+        self._vad_thread = threading.Thread(
+            target=self._vad_loop, name="session-vad", daemon=True
+        )
+        self._vad_thread.start()
+
+    # --- Public API -----------------------------------------------------------
+
+    def feed(self, pcm16: bytes):
+        """Queue a packet of 16 kHz mono PCM16 (little endian) for the VAD."""
+        self.jitter.push(pcm16)
+
+    def end_of_speech(self):
+        """The client knows the user stopped talking (push-to-talk release)."""
+        self._end_requested.set()  # handled by the VAD thread within 100 ms
+
+    def interrupt(self, reason: str = "interrupted"):
+        with self._lock:
+            turn = self._turn
+        if turn is not None and not turn.cancelled:
+            turn.cancel(reason)
+            self._emit({"type": "interrupted", "reason": reason})
+
+    def wait(self, timeout: float | None = None):
+        """Block until the audio fed so far is processed and its turn answered."""
+        self.jitter.join(timeout)
+        with self._lock:
+            future = self._turn_future
+        if future is not None:
+            future.exception(timeout)
+
+    def close(self):
+        self.jitter.close()
+        self.interrupt("session closed")
+        if self._streaming is not None:
+            self._streaming.close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ------------------------------------------------------------
+
+    def _vad_loop(self):
+        while True:
+            frame = self.jitter.pop(timeout=0.1)
+            if self._end_requested.is_set():
+                self._end_requested.clear()
+                self.frame_processor.pause()
+                self.frame_processor.resume()
+            if frame is None:
+                if self.jitter.closed:
+                    return
+                continue
+            try:
+                self.frame_processor.process(frame)
+            except Exception:
+                logger.exception("VAD failed on a frame")
+            finally:
+                self.jitter.task_done()
+
+    def _emit(self, event: dict):
+        try:
+            self._emit_event(event)
+        except Exception:
+            logger.exception(f"Could not emit {event.get('type')}")
+
+    def _on_speech_start(self):
+        self._emit({"type": "speech_start"})
+        if self.opt.partials:
+            self._streaming = StreamingTranscriber(
+                self._transcribe_fn,
+                cb=StreamingCallbacks(
+                    on_partial=lambda committed, tentative: self._emit(
+                        {
+                            "type": "partial",
+                            "committed": committed,
+                            "tentative": tentative,
+                        }
+                    )
+                ),
+            )
+
+    def _on_speech_real_start(self):
+        # not on the onset: a misfire must not cut the assistant off
+        self.interrupt("barge-in")
+
+    def _on_speech_frame(self, frame: np.ndarray):
+        if self._streaming is not None:
+            self._streaming.feed(frame)
+
+    def _on_vad_misfire(self):
+        self._emit({"type": "speech_end", "misfire": True})
+        streaming, self._streaming = self._streaming, None
+        if streaming is not None:
+            streaming.close()
+
+    def _on_speech_segment(self, audio: np.ndarray, probs: np.ndarray):
+        duration = audio.size / self.opt.sample_rate
+        self._emit({"type": "speech_end", "duration": round(duration, 3)})
+        # the next utterance gets its own transcriber: this one finishes in the turn
+        streaming, self._streaming = self._streaming, None
+        token = CancellationToken()
+        with self._lock:
+            self._turn = token
+            self._turn_future = self._executor.submit(
+                self._run_turn, audio, duration, streaming, token
+            )
+
+    def _run_turn(self, audio, duration, streaming, token: CancellationToken):
+        try:
+            with token.bound():
+                self._answer(audio, duration, streaming, token)
+        except Cancelled:
+            logger.info(f"Turn cancelled: {token.reason}")
+        except Exception as e:
+            logger.exception("Turn failed")
+            self._emit({"type": "error", "detail": str(e)})
+        finally:
+            if streaming is not None:
+                streaming.close()
+            with self._lock:
+                if self._turn is token:
+                    self._turn = None
+
+    def _answer(self, audio, duration, streaming, token: CancellationToken):
+        token.raise_if_cancelled()
+        text = streaming.finish() if streaming else self._transcribe_fn(audio)
+        token.raise_if_cancelled()
+
+        decision = check_transcript(text, duration=duration)
+        if not decision:
+            self._emit({"type": "rejected", "reason": decision.reason, "text": text})
+            return
+        self._emit({"type": "final", "text": decision.text})
+
+        sentences = SentenceBuffer()
+        reply, spoken = [], []
+        finished = False
+        try:
+            for piece in self._respond_fn(decision.text, token):
+                token.raise_if_cancelled()
+                reply.append(piece)
+                self._emit({"type": "llm_token", "text": piece})
+                for sentence in sentences.push(piece):
+                    self._speak(sentence, token)
+                    spoken.append(sentence)
+            for sentence in sentences.flush():
+                self._speak(sentence, token)
+                spoken.append(sentence)
+            finished = True
+        finally:
+            # the next turn builds on what the user heard, barge-in or not
+            heard = "".join(reply) if finished else " ".join(spoken)
+            if heard and self._save_reply_fn is not None:
+                self._save_reply_fn(heard)
+        self._emit({"type": "response_end", "text": "".join(reply)})
+
+    def _speak(self, sentence: str, token: CancellationToken):
+        samples, sample_rate = self._synthesize_fn(sentence, token)
+        token.raise_if_cancelled()
+        pcm = to_pcm16(samples)
+        self._emit(
+            {
+                "type": "audio",
+                "text": sentence,
+                "sample_rate": sample_rate,
+                "bytes": len(pcm),
+            }
+        )
+        self._emit_audio(pcm)
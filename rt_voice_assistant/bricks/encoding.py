@@ -0,0 +1,219 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+import soundfile as sf
+
+from .audio import to_pcm16
+from .ingest import resample
+
+DEFAULT_FORMAT = "wav"
+DEFAULT_CACHE_MB = 32
+# longer texts are answers, not phrases: they are not worth keeping
+DEFAULT_CACHE_MAX_TEXT = 200
+
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+# LAME refuses the lowest bitrates at the speech sample rates
+MP3_MAX_COMPRESSION = 0.9
+
+
+class NotAcceptable(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AudioFormat:
+    name: str
+    media_type: str
+    extension: str
+    sf_format: str | None = None  # None: raw PCM16
+    subtype: str | None = None
+    streamable: bool = False  # can be sent sentence by sentence
+
+    @property
+    def compressed(self) -> bool:
+        return self.name in ("ogg", "mp3", "flac")
+
+
+FORMATS = {
+    "pcm": AudioFormat("pcm", "audio/L16", "pcm", streamable=True),
+    "wav": AudioFormat("wav", "audio/wav", "wav", "WAV", "PCM_16", streamable=True),
+    "ogg": AudioFormat("ogg", "audio/ogg; codecs=opus", "ogg", "OGG", "OPUS"),
+    "mp3": AudioFormat("mp3", "audio/mpeg", "mp3", "MP3", "MPEG_LAYER_III"),
+    "flac": AudioFormat("flac", "audio/flac", "flac", "FLAC", "PCM_16"),
+}
+
+# Accept media types -> format
+MEDIA_TYPES = {
+    "audio/l16": "pcm",
+    "audio/pcm": "pcm",
+    "audio/wav": "wav",
+    "audio/wave": "wav",
+    "audio/x-wav": "wav",
+    "audio/ogg": "ogg",
+    "audio/opus": "ogg",
+    "audio/mpeg": "mp3",
+    "audio/mp3": "mp3",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+}
+
+
+def available(format: AudioFormat) -> bool:
+    """Whether the libsndfile that soundfile loaded can write `format`."""
+    if format.sf_format is None:
+        return True
+    return format.sf_format in sf.available_formats() and (
+        format.subtype is None
+        or format.subtype in sf.available_subtypes(format.sf_format)
+    )
+
+
+# MP3 needs libsndfile >= 1.1 and Opus >= 1.0.29: only offer what can be written
+FORMATS = {name: format for name, format in FORMATS.items() if available(format)}
+MEDIA_TYPES = {
+    media_type: name for media_type, name in MEDIA_TYPES.items() if name in FORMATS
+}
+
+
+def negotiate(
+    accept: str | None = None,
+    requested: str | None = None,
+    default: str = DEFAULT_FORMAT,
+) -> AudioFormat:
+    """
+    The output format: the one `requested` (a format name, from the query)
+    if any, else the client's preferred one among the Accept media types.
+    Raises NotAcceptable when none of them can be produced.
+    """
+    if requested:
+        if requested.lower() not in FORMATS:
+            raise NotAcceptable(
+                f"unknown format {requested!r}, use one of {', '.join(FORMATS)}"
+            )
+        return FORMATS[requested.lower()]
+    if not accept:
+        return FORMATS[default]
+
+    offers = []
+    for position, item in enumerate(accept.split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        media_type = media_type.lower()
+        if q <= 0:
+            continue
+        if media_type in ("*/*", "audio/*"):
+            name = default
+        else:
+            name = MEDIA_TYPES.get(media_type)
+        if name is not None:
+            offers.append((-q, position, name))
+    if not offers:
+        raise NotAcceptable(f"cannot produce any of {accept!r}")
+    return FORMATS[min(offers)[2]]
+
+
+def encode(
+    samples: np.ndarray,
+    sample_rate: int,
+    format: AudioFormat,
+    compression_level: float | None = None,
+) -> bytes:
+    """
+    The samples encoded in memory. `compression_level` (0 to 1, libsndfile's)
+    trades size for quality with Opus and MP3, and for speed with FLAC.
+    """
+    if format.sf_format is None:
+        return to_pcm16(samples)
+    if format.subtype == "OPUS" and sample_rate not in OPUS_RATES:
+        samples = resample(np.asarray(samples, dtype=np.float32), sample_rate, 48000)
+        sample_rate = 48000
+    if format.name == "mp3" and compression_level is not None:
+        compression_level = min(compression_level, MP3_MAX_COMPRESSION)
+    buffer = io.BytesIO()
+    sf.write(
+        buffer,
+        samples,
+        sample_rate,
+        format=format.sf_format,
+        subtype=format.subtype,
+        compression_level=compression_level if format.compressed else None,
+    )
+    return buffer.getvalue()
+
+
+class EncodedAudioCache:
+    """
+    Encoded speech by (text, voice, language, format, compression level): a
+    phrase said again is neither synthesized nor encoded again. LRU, bounded
+    by the size of the encoded audio.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_CACHE_MB * 1024 * 1024,
+        max_text: int = DEFAULT_CACHE_MAX_TEXT,
+    ):
+        self.max_bytes = max_bytes
+        self.max_text = max_text
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> bytes:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: tuple, data: bytes):
+        if len(key[0]) > self.max_text or len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+cache: EncodedAudioCache | None = None
+
+
+def get_audio_cache() -> EncodedAudioCache:
+    global cache
+
+    if cache is None:
+        cache = EncodedAudioCache(
+            max_bytes=int(os.getenv("TTS_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 * 1024,
+            max_text=int(os.getenv("TTS_CACHE_MAX_TEXT", DEFAULT_CACHE_MAX_TEXT)),
+        )
+    return cache
@@ -0,0 +1,171 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+
+logger = logging.getLogger("rt_py.bricks.executors")
+logger.setLevel(logging.DEBUG)
+
+# name -> (default concurrency, default queue length)
+DEFAULT_LIMITS = {
+    "transcode": (2, 16),
+    "stt": (4, 16),
+    "llm": (8, 32),
+    "tts": (1, 8),
+}
+
+
+class Saturated(RuntimeError):
+    """The stage has `max_workers` jobs running and `max_queue` waiting."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"The {name} stage is saturated")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    A thread pool for one blocking stage (ffmpeg, whisper, the LLM client,
+    Kokoro), with a bounded queue in front of it. A job that finds the
+    queue full is rejected at once with an estimate of when to retry,
+    instead of waiting behind work that will not finish in time.
+    The context variables of the caller (the cancellation token) are
+    carried into the worker thread, like `asyncio.to_thread` does.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, alpha: float = 0.2):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.alpha = alpha
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"api-{name}"
+        )
+        self._lock = threading.Lock()
+        self._admitted = 0  # running + queued
+        self._running = 0
+        self._service_s: float | None = None
+        self.completed = 0
+        self.rejected = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    @property
+    def saturated(self) -> bool:
+        return self._admitted >= self.max_workers + self.max_queue
+
+    def retry_after(self) -> float:
+        """Seconds until a queue slot is likely to free up."""
+        service_s = self._service_s or 1.0
+        waves = max(1, self._admitted - self.max_workers + 1) / self.max_workers
+        return max(1.0, service_s * waves)
+
+    def check(self):
+        """Reject early, before the request does any work, if the stage is full."""
+        if self.saturated:
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(self.name, self.retry_after())
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """
+        Queue a job from any thread. Its slot is released when the job is
+        done, not when the caller stops waiting for it: a worker thread
+        still busy with an abandoned job still counts.
+        """
+        with self._lock:
+            if self.saturated:
+                self.rejected += 1
+                raise Saturated(self.name, self.retry_after())
+            self._admitted += 1
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(
+                partial(context.run, self._timed, fn, *args, **kwargs)
+            )
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def call(self, fn, *args, **kwargs):
+        """`submit` and wait, for the blocking callers (worker threads)."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "service_s": self._service_s,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Internals ------------------------------------------------------------
+
+    def _release(self, future: Future | None = None):
+        with self._lock:
+            self._admitted -= 1
+
+    def _timed(self, fn, *args, **kwargs):
+        with self._lock:
+            self._running += 1
+        started = time.monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            elapsed = time.monotonic() - started
+            a = self.alpha
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._service_s = (
+                    elapsed
+                    if self._service_s is None
+                    else (1 - a) * self._service_s + a * elapsed
+                )
+
+
+executors: dict[str, BoundedExecutor] = {}
+
+
+def get_executor(name: str) -> BoundedExecutor:
+    """The executor of a stage, sized by <NAME>_CONCURRENCY and <NAME>_QUEUE."""
+    if name not in executors:
+        workers, queue = DEFAULT_LIMITS.get(name, (4, 16))
+        prefix = name.upper()
+        executors[name] = BoundedExecutor(
+            name,
+            max_workers=int(os.getenv(f"{prefix}_CONCURRENCY", workers)),
+            max_queue=int(os.getenv(f"{prefix}_QUEUE", queue)),
+        )
+    return executors[name]
+
+
+def check_capacity(*names: str):
+    for name in names:
+        get_executor(name).check()
+
+
+def stats() -> dict:
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+def shutdown():
+    for executor in executors.values():
+        executor.shutdown()
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from dataclasses import dataclass
+
 from collections import deque
-from typing import Callable, Optional, List
-import numpy as np
+from collections.abc import Callable
+from dataclasses import dataclass
 
+import numpy as np
 
 # ---- Types ------------------------------------------------------------------
 
@@ -14,6 +15,8 @@ OnVADMisfire = Callable[[], None]
 OnSpeechStart = Callable[[], None]
 OnSpeechRealStart = Callable[[], None]
 OnSpeechEnd = Callable[[np.ndarray], None]
+OnSpeechFrame = Callable[[np.ndarray], None]
+OnSpeechSegment = Callable[[np.ndarray, np.ndarray], None]
 
 
 # ---- Options ----------------------------------------------------------------
@@ -32,11 +35,15 @@ class FrameProcessorOptions:
 
 @dataclass
 class Callbacks:
-    on_frame_processed: Optional[OnFrameProcessed] = None
-    on_vad_misfire: Optional[OnVADMisfire] = None
-    on_speech_start: Optional[OnSpeechStart] = None
-    on_speech_real_start: Optional[OnSpeechRealStart] = None
-    on_speech_end: Optional[OnSpeechEnd] = None
+    on_frame_processed: OnFrameProcessed | None = None
+    on_vad_misfire: OnVADMisfire | None = None
+    on_speech_start: OnSpeechStart | None = None
+    on_speech_real_start: OnSpeechRealStart | None = None
+    on_speech_end: OnSpeechEnd | None = None
+    # every frame added to the active segment (pre-speech padding included)
+    on_speech_frame: OnSpeechFrame | None = None
+    # the utterance with one P(speech) per frame, e.g. to trim silence before STT
+    on_speech_segment: OnSpeechSegment | None = None
 
 
 # ---- Processor ---------------------------------------------------------------
@@ -50,8 +57,8 @@ class FrameProcessor:
       - idle: keep a ring buffer for pre-speech padding
       - speaking: accumulate frames; tolerate up to `redemption_frames` of low prob
       - finalize:
-          - if total < min_speech_frames -> misfire
-          - else -> emit on_speech_end(audio)
+          - if fewer than min_speech_frames frames were confident speech -> misfire
+          - else -> emit on_speech_segment(audio, probs) and on_speech_end(audio)
 
     All frames are assumed to be Float32 mono @ 16 kHz with `frame_samples` length.
     """
@@ -63,9 +70,13 @@ class FrameProcessor:
 
         # Ring buffer for pre-speech audio
         self._pre_ring: deque[np.ndarray] = deque(maxlen=self.opt.pre_speech_pad_frames)
+        self._pre_ring_probs: deque[float] = deque(
+            maxlen=self.opt.pre_speech_pad_frames
+        )
 
         # Active segment buffer
-        self._active_frames: List[np.ndarray] = []
+        self._active_frames: list[np.ndarray] = []
+        self._active_probs: list[float] = []
         self._in_speech: bool = False
         self._speech_frame_count: int = 0
         self._real_start_fired: bool = False
@@ -89,7 +100,9 @@ class FrameProcessor:
     def reset(self):
         """Hard reset of all buffers and state."""
         self._pre_ring.clear()
+        self._pre_ring_probs.clear()
         self._active_frames.clear()
+        self._active_probs.clear()
         self._in_speech = False
         self._speech_frame_count = 0
         self._real_start_fired = False
@@ -113,6 +126,7 @@ class FrameProcessor:
         if not self._in_speech:
             # Idle: collect ring buffer and look for activation
             self._pre_ring.append(frame)
+            self._pre_ring_probs.append(p_speech)
 
             if p_speech >= self.opt.positive_speech_threshold:
                 # Enter speaking
@@ -120,7 +134,12 @@ class FrameProcessor:
         else:
             # Already speaking: append and manage deactivation
             self._active_frames.append(frame)
-            self._speech_frame_count += 1
+            self._active_probs.append(p_speech)
+            # only confident frames confirm speech: not the padding nor the pauses
+            if p_speech >= self.opt.positive_speech_threshold:
+                self._speech_frame_count += 1
+            if self.cb.on_speech_frame:
+                self.cb.on_speech_frame(frame)
 
             # Fire "real start" once, after min_speech_frames
             if (not self._real_start_fired) and (
@@ -143,15 +162,21 @@ class FrameProcessor:
     def _enter_speaking(self):
         # Build initial buffer with pre-speech padding
         self._active_frames = list(self._pre_ring)  # copy current ring
+        self._active_probs = list(self._pre_ring_probs)
         self._pre_ring.clear()
+        self._pre_ring_probs.clear()
         self._in_speech = True
-        self._speech_frame_count = len(self._active_frames)
+        self._speech_frame_count = 1  # the frame that started it
         self._real_start_fired = False
         self._low_prob_streak = 0
 
         if self.cb.on_speech_start:
             self.cb.on_speech_start()
 
+        if self.cb.on_speech_frame:
+            for frame in self._active_frames:
+                self.cb.on_speech_frame(frame)
+
         # Note: do NOT call on_speech_real_start here; we wait for min_speech_frames
 
     def _finalize_segment(self):
@@ -161,9 +186,11 @@ class FrameProcessor:
             if self._active_frames
             else np.zeros((0,), dtype=np.float32)
         )
+        probs = np.asarray(self._active_probs, dtype=np.float32)
 
         # Reset state before callbacks to avoid reentrancy pitfalls
         self._active_frames = []
+        self._active_probs = []
         self._in_speech = False
         self._speech_frame_count = 0
         self._real_start_fired = False
@@ -174,5 +201,8 @@ class FrameProcessor:
                 self.cb.on_vad_misfire()
             return
 
+        if self.cb.on_speech_segment:
+            self.cb.on_speech_segment(audio, probs)
+
         if self.cb.on_speech_end:
             self.cb.on_speech_end(audio)
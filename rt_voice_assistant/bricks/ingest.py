@@ -0,0 +1,159 @@
+import io
+import logging
+import math
+import subprocess
+from functools import lru_cache
+from typing import BinaryIO
+
+import numpy as np
+import soundfile as sf
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .audio import SR
+from .cancellation import CancellationToken, run_process
+
+logger = logging.getLogger("rt_py.bricks.ingest")
+logger.setLevel(logging.DEBUG)
+
+# libsndfile decodes these in process; the rest goes through ffmpeg
+SOUNDFILE_FORMATS = {"wav", "flac", "ogg", "aiff"}
+if "MP3" in sf.available_formats():  # libsndfile >= 1.1
+    SOUNDFILE_FORMATS.add("mp3")
+
+RESAMPLE_BLOCK = 8192  # output samples per matrix product
+RESAMPLE_ZERO_CROSSINGS = 16  # of the sinc, on each side
+RESAMPLE_ROLLOFF = 0.94  # cutoff, relative to the lower Nyquist frequency
+RESAMPLE_KAISER_BETA = 8.6
+
+
+class UndecodableAudio(ValueError):
+    pass
+
+
+def sniff_format(head: bytes) -> str:
+    """The container of an audio file from its first bytes, None if unknown."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[:4] == b"fLaC":
+        return "flac"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"FORM" and head[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if head[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"  # or Matroska
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:3] == b"ID3":
+        return "mp3"
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xF6 == 0xF0:
+        return "aac"  # ADTS
+    if len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+        return "mp3"  # MPEG audio frame sync
+    return None
+
+
+def resample(x: np.ndarray, sr: int, target_sr: int = SR) -> np.ndarray:
+    """
+    Polyphase windowed-sinc resampling by target_sr / sr: the output samples
+    sharing a filter phase are dot products with strided windows of the input,
+    computed a block at a time so memory stays bounded on long uploads. The
+    Kaiser-windowed low-pass, cut below the lower of the two Nyquist
+    frequencies, is also the anti-aliasing filter.
+    """
+    if sr == target_sr or x.size == 0:
+        return x.astype(np.float32, copy=False)
+    g = math.gcd(sr, target_sr)
+    up, down = target_sr // g, sr // g
+    phases, center = _polyphase_filter(up, down)
+    taps = phases.shape[1]
+    # odd extension at both ends rather than zeros, which would ring through
+    # the filter
+    padded = np.pad(
+        x.astype(np.float32, copy=False), taps, mode="reflect", reflect_type="odd"
+    )
+    windows = sliding_window_view(padded, taps)
+    n = max(1, round(x.size * up / down))
+    out = np.empty(n, dtype=np.float32)
+    # output k sits at k * down + center on the upsampled grid: every `up`
+    # outputs the phase repeats and the window moves `down` input samples
+    for first in range(min(up, n)):
+        t = first * down + center
+        rows = windows[t // up + 1 :: down][: len(range(first, n, up))]
+        for start in range(0, len(rows), RESAMPLE_BLOCK):
+            block = rows[start : start + RESAMPLE_BLOCK]
+            k = first + start * up
+            out[k : k + block.shape[0] * up : up] = block @ phases[t % up]
+    return out
+
+
+@lru_cache(maxsize=16)
+def _polyphase_filter(up: int, down: int) -> tuple[np.ndarray, int]:
+    """
+    The low-pass on the grid upsampled by `up` split into its `up` phases, and
+    the position of its center. Each phase is reversed to be applied to an
+    input window in order, and scaled by `up` to make up for the zeros that
+    upsampling inserts.
+    """
+    half = RESAMPLE_ZERO_CROSSINGS * max(up, down)
+    cutoff = RESAMPLE_ROLLOFF * 0.5 / max(up, down)  # cycles per upsampled sample
+    n = np.arange(-half, half + 1)
+    h = np.sinc(2 * cutoff * n) * np.kaiser(n.size, RESAMPLE_KAISER_BETA)
+    h *= up / h.sum()
+    taps = -(-h.size // up)
+    h = np.pad(h, (0, taps * up - h.size))
+    phases = h.reshape(taps, up).T[:, ::-1]
+    return np.ascontiguousarray(phases, dtype=np.float32), half
+
+
+def decode_audio(
+    source: bytes | BinaryIO, token: CancellationToken | None = None, sr: int = SR
+) -> np.ndarray:
+    """
+    Mono float32 samples at `sr` of an audio file in memory (bytes or a
+    seekable file object such as an upload). The container is sniffed from
+    its magic bytes: WAV, FLAC, OGG and AIFF are decoded by soundfile, the
+    other formats are piped through ffmpeg (stdin to stdout, no file).
+    """
+    stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+    stream.seek(0)
+    head = stream.read(16)
+    stream.seek(0)
+    if not head:
+        raise UndecodableAudio("empty audio file")
+
+    container = sniff_format(head)
+    if container in SOUNDFILE_FORMATS:
+        try:
+            samples, source_sr = sf.read(stream, dtype="float32", always_2d=True)
+            return resample(samples.mean(axis=1), source_sr, sr)
+        except RuntimeError as e:
+            # e.g. Opus in OGG with an older libsndfile
+            logger.info(f"soundfile could not decode the {container} file: {e}")
+            stream.seek(0)
+
+    return _decode_with_ffmpeg(stream.read(), token, sr)
+
+
+def _decode_with_ffmpeg(data: bytes, token: CancellationToken, sr: int) -> np.ndarray:
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        "pipe:0",
+        "-f",
+        "f32le",
+        "-ac",
+        "1",
+        "-ar",
+        str(sr),
+        "pipe:1",
+    ]
+    try:
+        process = run_process(cmd, data, token)
+    except subprocess.CalledProcessError as e:
+        detail = (e.stderr or b"").decode(errors="replace").strip()
+        raise UndecodableAudio(detail or "ffmpeg could not decode the audio") from e
+    return np.frombuffer(process.stdout, dtype="<f4").copy()
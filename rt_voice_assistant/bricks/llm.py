@@ -1,8 +1,12 @@
 import re
+from collections.abc import Iterator
+from contextlib import nullcontext
 
 import tiktoken
 from openai import OpenAI
 
+from .cancellation import CancellationToken
+
 
 def get_client(url=None, api_key=None):
     if not url:
@@ -14,6 +18,44 @@ def get_client(url=None, api_key=None):
     return client
 
 
+def stream_complete(
+    client, model: str, messages: list[dict], token: CancellationToken | None = None
+) -> Iterator[str]:
+    """
+    The assistant reply, token by token. Cancelling the token closes the
+    HTTP response instead of waiting for the last token.
+    """
+    if token is not None:
+        token.raise_if_cancelled()
+    stream = client.chat.completions.create(model=model, messages=messages, stream=True)
+    try:
+        with token.on_cancel(stream.close) if token else nullcontext():
+            for chunk in stream:
+                if token is not None:
+                    token.raise_if_cancelled()
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception:
+        # reading a stream closed under our feet fails with a transport error
+        if token is not None:
+            token.raise_if_cancelled()
+        raise
+    finally:
+        stream.close()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+def complete(
+    client, model: str, messages: list[dict], token: CancellationToken | None = None
+) -> str:
+    """The whole assistant reply; streamed (and cancellable) with a token."""
+    if token is None:
+        response = client.chat.completions.create(model=model, messages=messages)
+        return response.choices[0].message.content
+    return "".join(stream_complete(client, model, messages, token))
+
+
 enc = tiktoken.get_encoding("cl100k_base")
 
 
@@ -33,3 +75,26 @@ def trim_to_budget(history, system_prompt, budget=6000):
 
 def clean_thinking(text):
     return re.sub(r"<think>.*?</think>", "", text, flags=re.DOTALL)
+
+
+def skip_thinking(pieces: Iterator[str]) -> Iterator[str]:
+    """`clean_thinking` for a token stream: drop a leading <think> block."""
+    pieces = iter(pieces)
+    head = ""
+    for piece in pieces:
+        head += piece
+        start = head.lstrip()
+        if start.startswith("<think>"):
+            if "</think>" not in start:
+                continue
+            head = start.split("</think>", 1)[1]
+        elif "<think>".startswith(start):
+            continue  # not enough text yet to tell
+        if head:
+            yield head
+        break
+    else:
+        if head and not head.lstrip().startswith("<think>"):
+            yield head
+        return
+    yield from pieces
@@ -0,0 +1,77 @@
+import queue
+import re
+import threading
+from collections.abc import Iterable, Iterator
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?;:。！？])\s+")
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in SENTENCE_END_RE.split(text.strip()) if s.strip()]
+
+
+class SentenceBuffer:
+    """
+    Cut a text arriving piece by piece (LLM tokens) into sentences, each
+    available as soon as the whitespace after its final punctuation arrives.
+    """
+
+    def __init__(self):
+        self._text = ""
+
+    def push(self, piece: str) -> list[str]:
+        """The sentences completed by this piece."""
+        self._text += piece
+        parts = SENTENCE_END_RE.split(self._text)
+        self._text = parts.pop()
+        return [p.strip() for p in parts if p.strip()]
+
+    def flush(self) -> list[str]:
+        """The last, unterminated sentence."""
+        rest, self._text = self._text.strip(), ""
+        return [rest] if rest else []
+
+
+def pipeline_sentences(pieces: Iterable[str], max_ahead: int = 4) -> Iterator[str]:
+    """
+    The sentences of a text stream, read ahead by a background thread: the
+    LLM keeps generating the next sentences while the caller synthesizes
+    the current one. Closing the iterator stops the reader.
+    """
+    sentences: queue.Queue = queue.Queue(maxsize=max_ahead)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item) -> bool:
+        while not stopped.is_set():
+            try:
+                sentences.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def read():
+        buffer = SentenceBuffer()
+        try:
+            for piece in pieces:
+                for sentence in buffer.push(piece):
+                    if not put(sentence):
+                        return
+            for sentence in buffer.flush():
+                put(sentence)
+            put(done)
+        except Exception as e:  # noqa: BLE001 - raised by the consumer
+            put(e)
+
+    threading.Thread(target=read, name="sentences", daemon=True).start()
+    try:
+        while True:
+            item = sentences.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,273 @@
+import json
+import logging
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Protocol
+from urllib.parse import urlparse
+
+logger = logging.getLogger("rt_py.bricks.session_backends")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_REDIS_PREFIX = "rtva:session:"
+
+
+class SessionBackend(Protocol):
+    """
+    Where the conversations are kept when several API processes share them.
+    Every record has a version: `save` only writes when the stored version
+    is still the one that was loaded (optimistic concurrency).
+    """
+
+    def load(self, session_id: str) -> tuple[int, bytes]:
+        """(version, data); (0, None) for an unknown or expired session."""
+
+    def save(self, session_id: str, data: bytes, version: int, ttl_s: float) -> bool:
+        """Store version + 1, False when the session changed since `version`."""
+
+    def delete(self, session_id: str): ...
+
+    def stats(self) -> dict: ...
+
+
+# --- Serialization ----------------------------------------------------------
+
+
+def encode_history(messages: list[dict], tokens: list[int]) -> bytes:
+    """A compact copy of a history: [[role, content, tokens], ...] deflated."""
+    rows = [[m["role"], m["content"], t] for m, t in zip(messages, tokens)]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 6)
+
+
+def decode_history(data: bytes) -> tuple[list[dict], list[int]]:
+    rows = json.loads(zlib.decompress(data)) if data else []
+    return [{"role": r, "content": c} for r, c, _ in rows], [t for _, _, t in rows]
+
+
+# --- SQLite -----------------------------------------------------------------
+
+
+class SQLiteBackend:
+    """
+    The sessions in a SQLite database in WAL mode: the API workers of one
+    host share it, readers never wait for the writer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+        with self._connection() as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " data BLOB NOT NULL,"
+                " expires REAL NOT NULL)"
+            )
+
+    def load(self, session_id: str) -> tuple[int, bytes]:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT version, data FROM sessions WHERE id = ? AND expires > ?",
+                (session_id, time.time()),
+            )
+            .fetchone()
+        )
+        return (row[0], row[1]) if row else (0, None)
+
+    def save(self, session_id: str, data: bytes, version: int, ttl_s: float) -> bool:
+        now = time.time()
+        with self._connection() as db:
+            if version:
+                cursor = db.execute(
+                    "UPDATE sessions SET version = ?, data = ?, expires = ?"
+                    " WHERE id = ? AND version = ?",
+                    (version + 1, data, now + ttl_s, session_id, version),
+                )
+            else:
+                # an expired row counts as absent
+                cursor = db.execute(
+                    "INSERT INTO sessions (id, version, data, expires)"
+                    " VALUES (?, 1, ?, ?)"
+                    " ON CONFLICT (id) DO UPDATE SET"
+                    " version = 1, data = excluded.data, expires = excluded.expires"
+                    " WHERE sessions.expires <= ?",
+                    (session_id, data, now + ttl_s, now),
+                )
+            if now - self._last_purge > 60:
+                self._last_purge = now
+                db.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+        return cursor.rowcount == 1
+
+    def delete(self, session_id: str):
+        with self._connection() as db:
+            db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def stats(self) -> dict:
+        count, size = (
+            self._connection()
+            .execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions"
+                " WHERE expires > ?",
+                (time.time(),),
+            )
+            .fetchone()
+        )
+        return {"backend": "sqlite", "sessions": count, "bytes": size}
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+
+# --- Redis ------------------------------------------------------------------
+
+
+class RespError(RuntimeError):
+    pass
+
+
+class RespClient:
+    """
+    A minimal client for the Redis protocol (RESP2): enough for GET, SET,
+    DEL and WATCH/MULTI/EXEC, with one connection per thread (WATCH is a
+    state of the connection).
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", timeout: float = 2.0):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def execute(self, *args, retry: bool = True):
+        """
+        Run a command. A broken connection is reopened and the command sent
+        again, unless `retry` is False (inside a transaction, whose state
+        went away with the connection).
+        """
+        try:
+            return self._execute(self._connection(), args)
+        except OSError:
+            self.close()
+            if not retry:
+                raise
+            logger.warning(f"Lost the connection to {self.host}:{self.port}, retrying")
+            return self._execute(self._connection(), args)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn[0].close()
+
+    # --- Internals ------------------------------------------------------------
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            sock = socket.create_connection((self.host, self.port), self.timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (sock, sock.makefile("rb"))
+            if self.password:
+                self._execute(conn, ("AUTH", self.password))
+            if self.db:
+                self._execute(conn, ("SELECT", self.db))
+        return conn
+
+    @staticmethod
+    def _execute(conn, args):
+        sock, reader = conn
+        sock.sendall(encode_command(*args))
+        return read_reply(reader)
+
+
+def encode_command(*args) -> bytes:
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+def read_reply(reader):
+    line = reader.readline()
+    if not line:
+        raise ConnectionError("connection closed by the server")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RespError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = reader.read(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(rest)
+        if size < 0:
+            return None
+        return [read_reply(reader) for _ in range(size)]
+    raise RespError(f"unexpected reply: {line!r}")
+
+
+class RedisBackend:
+    """
+    The sessions on a Redis-protocol server (Redis, Valkey, KeyDB...), shared
+    by the API nodes. A record is "<version>:<data>", expiring after the TTL;
+    the compare-and-set runs in a WATCH/MULTI/EXEC transaction.
+    """
+
+    def __init__(self, client: RespClient, prefix: str = DEFAULT_REDIS_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def load(self, session_id: str) -> tuple[int, bytes]:
+        return self._parse(self.client.execute("GET", self.prefix + session_id))
+
+    def save(self, session_id: str, data: bytes, version: int, ttl_s: float) -> bool:
+        key = self.prefix + session_id
+        record = b"%d:" % (version + 1) + data
+        self.client.execute("WATCH", key)
+        try:
+            current, _ = self._parse(self.client.execute("GET", key, retry=False))
+            if current != version:
+                self.client.execute("UNWATCH", retry=False)
+                return False
+            ttl_ms = max(1, int(ttl_s * 1000))
+            self.client.execute("MULTI", retry=False)
+            self.client.execute("SET", key, record, "PX", ttl_ms, retry=False)
+            return self.client.execute("EXEC", retry=False) is not None
+        except BaseException:
+            self.client.close()  # drop the half-done transaction with the connection
+            raise
+
+    def delete(self, session_id: str):
+        self.client.execute("DEL", self.prefix + session_id)
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "server": f"{self.client.host}:{self.client.port}"}
+
+    @staticmethod
+    def _parse(record: bytes) -> tuple[int, bytes]:
+        if record is None:
+            return 0, None
+        version, _, data = record.partition(b":")
+        return int(version), data
@@ -0,0 +1,354 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from .session_backends import (
+    RedisBackend,
+    RespClient,
+    RespError,
+    SessionBackend,
+    SQLiteBackend,
+    decode_history,
+    encode_history,
+)
+
+logger = logging.getLogger("rt_py.bricks.sessions")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_TTL_S = 3600.0
+DEFAULT_MAX_SESSIONS = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_BUDGET = 6000
+
+# (messages) -> tokens, as `llm.count_tokens`
+CountFn = Callable[[list[dict]], int]
+
+
+class SessionUnavailable(RuntimeError):
+    """The shared backend failed: the turn can be retried shortly."""
+
+    retry_after = 1.0
+
+
+class SessionConflict(SessionUnavailable):
+    pass
+
+
+# what a backend raises when it is down, slow or locked
+BACKEND_ERRORS = (OSError, sqlite3.Error, RespError)
+
+
+# a message costs more than its text: the dict, the role, the cached count
+MESSAGE_OVERHEAD = 256
+
+
+class Conversation:
+    """
+    The history of one session, with the token count of every message
+    computed once, when it is added.
+    With `journal`, the changes are recorded too, to replay them on a newer
+    copy of the history when a shared backend reports a conflict.
+    """
+
+    def __init__(self, count_fn: CountFn, journal: bool = False):
+        self.count_fn = count_fn
+        self.messages: list[dict] = []
+        self.tokens: list[int] = []
+        self.size = 0  # approximate memory, in bytes
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self.journal: list[tuple] | None = [] if journal else None
+
+    def append(self, role: str, content: str):
+        message = {"role": role, "content": content}
+        self.add(message, self.count_fn([message]))
+        if self.journal is not None:
+            self.journal.append(("append", message, self.tokens[-1]))
+
+    def add(self, message: dict, tokens: int):
+        """Append a message whose tokens are already counted."""
+        self.messages.append(message)
+        self.tokens.append(tokens)
+        self.size += len(message["content"].encode()) + MESSAGE_OVERHEAD
+
+    def context(
+        self, system_prompt: str, system_tokens: int, budget: int = DEFAULT_BUDGET
+    ) -> list[dict]:
+        """
+        The messages to send to the LLM, as `llm.trim_to_budget`: the oldest
+        messages are dropped from the history until it fits the budget,
+        keeping at least the last two.
+        """
+        total = system_tokens + sum(self.tokens)
+        dropped = 0
+        while total > budget and len(self.messages) - dropped > 2:
+            total -= self.tokens[dropped]
+            self.size -= len(self.messages[dropped]["content"].encode())
+            self.size -= MESSAGE_OVERHEAD
+            dropped += 1
+        if dropped:
+            del self.messages[:dropped]
+            del self.tokens[:dropped]
+        return [{"role": "system", "content": system_prompt}] + list(self.messages)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self.tokens)
+
+    def clear(self):
+        self.messages, self.tokens, self.size = [], [], 0
+        if self.journal is not None:
+            self.journal.append(("clear",))
+
+    def replay(self, journal: list[tuple]):
+        for entry in journal:
+            if entry[0] == "clear":
+                self.clear()
+            else:
+                self.add(*entry[1:])
+
+
+class SessionStore:
+    """
+    The conversations by session id. Sessions idle for more than `ttl_s` are
+    dropped, and the least recently used ones go first when there are more
+    than `max_sessions` or their histories take more than `max_bytes`.
+    A session in use (inside `session()`) is never evicted.
+    """
+
+    def __init__(
+        self,
+        count_fn: CountFn,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.count_fn = count_fn
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, Conversation] = OrderedDict()
+        self._system_tokens: dict[str, int] = {}
+        self._bytes = 0
+        self.expired = 0
+        self.evicted = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Conversation]:
+        """The conversation of a session, locked against its other requests."""
+        conversation = self._get(session_id)
+        with conversation.lock:
+            before = conversation.size
+            try:
+                yield conversation
+            finally:
+                conversation.last_used = self.clock()
+                with self._lock:
+                    self._bytes += conversation.size - before
+        self._evict()
+
+    def context(
+        self,
+        conversation: Conversation,
+        system_prompt: str,
+        budget: int = DEFAULT_BUDGET,
+    ) -> list[dict]:
+        """The LLM messages of a conversation, see `Conversation.context`."""
+        return conversation.context(
+            system_prompt, self._system_prompt_tokens(system_prompt), budget
+        )
+
+    def clear(self, session_id: str):
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+        if conversation is None:
+            return
+        with self.session(session_id) as conversation:
+            conversation.clear()
+
+    def drop(self, session_id: str):
+        with self._lock:
+            conversation = self._sessions.pop(session_id, None)
+            if conversation is not None:
+                self._bytes -= conversation.size
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            return {
+                "sessions": len(sessions),
+                "bytes": self._bytes,
+                "messages": sum(len(c.messages) for c in sessions),
+                "tokens": sum(c.total_tokens for c in sessions),
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _get(self, session_id: str) -> Conversation:
+        with self._lock:
+            conversation = self._sessions.get(session_id)
+            if conversation is None:
+                conversation = Conversation(self.count_fn)
+                conversation.last_used = self.clock()
+                self._sessions[session_id] = conversation
+            self._sessions.move_to_end(session_id)
+            return conversation
+
+    def _system_prompt_tokens(self, system_prompt: str) -> int:
+        tokens = self._system_tokens.get(system_prompt)
+        if tokens is None:
+            tokens = self.count_fn([{"role": "system", "content": system_prompt}])
+            with self._lock:
+                if len(self._system_tokens) >= 16:
+                    self._system_tokens.clear()
+                self._system_tokens[system_prompt] = tokens
+        return tokens
+
+    def _evict(self):
+        now = self.clock()
+        with self._lock:
+            for session_id, conversation in list(self._sessions.items()):
+                if now - conversation.last_used <= self.ttl_s:
+                    break  # the rest were used more recently
+                if conversation.lock.locked():
+                    continue
+                del self._sessions[session_id]
+                self._bytes -= conversation.size
+                self.expired += 1
+
+            # the most recent session stays, whatever its size
+            for session_id, conversation in list(self._sessions.items())[:-1]:
+                if (
+                    len(self._sessions) <= self.max_sessions
+                    and self._bytes <= self.max_bytes
+                ):
+                    break
+                if conversation.lock.locked():
+                    continue
+                del self._sessions[session_id]
+                self._bytes -= conversation.size
+                self.evicted += 1
+                logger.info(f"Session {session_id} evicted")
+
+
+class SharedSessionStore(SessionStore):
+    """
+    The conversations on a backend shared by several API processes or nodes
+    (see `session_backends`). Every `session()` block loads the history and,
+    when it changed, saves it back if no other process saved it meanwhile;
+    otherwise the changes of the block are replayed on the newer history.
+    Expiry is left to the backend, the memory bound with it.
+    """
+
+    def __init__(
+        self,
+        backend: SessionBackend,
+        count_fn: CountFn,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_attempts: int = 5,
+    ):
+        super().__init__(count_fn, ttl_s=ttl_s)
+        self.backend = backend
+        self.max_attempts = max_attempts
+        # the requests of this process wait for each other rather than conflict
+        self._locks = [threading.Lock() for _ in range(64)]
+        self.saves = 0
+        self.conflicts = 0
+        self.failures = 0
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[Conversation]:
+        with self._locks[hash(session_id) % len(self._locks)]:
+            version, data = self._backend("load", session_id)
+            conversation = self._conversation(data, journal=True)
+            yield conversation
+            if not conversation.journal:
+                return
+
+            latest = conversation
+            for _ in range(self.max_attempts):
+                record = encode_history(latest.messages, latest.tokens)
+                if self._backend("save", session_id, record, version, self.ttl_s):
+                    self.saves += 1
+                    return
+                self.conflicts += 1
+                logger.debug(f"Session {session_id} changed meanwhile, replaying")
+                version, data = self._backend("load", session_id)
+                latest = self._conversation(data)
+                latest.replay(conversation.journal)
+            raise SessionConflict(f"session {session_id} keeps changing")
+
+    def clear(self, session_id: str):
+        self._backend("delete", session_id)
+
+    def drop(self, session_id: str):
+        self._backend("delete", session_id)
+
+    def stats(self) -> dict:
+        return {
+            **self.backend.stats(),
+            "saves": self.saves,
+            "conflicts": self.conflicts,
+            "failures": self.failures,
+        }
+
+    def _backend(self, method: str, *args):
+        try:
+            return getattr(self.backend, method)(*args)
+        except BACKEND_ERRORS as e:
+            self.failures += 1
+            raise SessionUnavailable(f"the session backend failed: {e}") from e
+
+    def _conversation(self, data: bytes, journal: bool = False) -> Conversation:
+        conversation = Conversation(self.count_fn, journal=journal)
+        for message, tokens in zip(*decode_history(data)):
+            conversation.add(message, tokens)
+        return conversation
+
+
+def make_backend(name: str) -> SessionBackend:
+    """The shared backend for SESSION_BACKEND, None for "memory"."""
+    if name == "memory":
+        return None
+    if name == "sqlite":
+        return SQLiteBackend(os.getenv("SESSION_SQLITE_PATH", "sessions.db"))
+    if name == "redis":
+        url = os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0")
+        return RedisBackend(RespClient(url))
+    raise ValueError(f"Unknown session backend: {name}")
+
+
+store: SessionStore | None = None
+
+
+def get_session_store() -> SessionStore:
+    global store
+
+    if store is None:
+        # tiktoken is only needed once there is a conversation to count
+        from .llm import count_tokens
+
+        ttl_s = float(os.getenv("SESSION_TTL_S", DEFAULT_TTL_S))
+        backend = make_backend(os.getenv("SESSION_BACKEND", "memory"))
+        if backend is None:
+            store = SessionStore(
+                count_tokens,
+                ttl_s=ttl_s,
+                max_sessions=int(os.getenv("SESSION_MAX", DEFAULT_MAX_SESSIONS)),
+                max_bytes=int(os.getenv("SESSION_MAX_MB", "64")) * 1024 * 1024,
+            )
+        else:
+            store = SharedSessionStore(backend, count_tokens, ttl_s=ttl_s)
+    return store
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import bisect
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .audio import SR
+
+# ---- Options ----------------------------------------------------------------
+
+
+@dataclass
+class TrimOptions:
+    speech_threshold: float = 0.35  # frames below are considered silence
+    margin_frames: int = 3  # silence kept before the first / after the last speech
+    max_pause_frames: int = 8  # longer internal pauses are shortened to this
+
+
+# ---- Time map ---------------------------------------------------------------
+
+
+@dataclass
+class TimeMap:
+    """
+    Map offsets of the trimmed audio back to the original utterance.
+    `spans` holds (trimmed_start, original_start, length) in samples.
+    """
+
+    sample_rate: int = SR
+    spans: list[tuple[int, int, int]] = field(default_factory=list)
+
+    @property
+    def kept_samples(self) -> int:
+        return sum(length for _, _, length in self.spans)
+
+    def to_original_sample(self, sample: int) -> int:
+        if not self.spans:
+            return sample
+        starts = [start for start, _, _ in self.spans]
+        i = max(0, bisect.bisect_right(starts, sample) - 1)
+        start, original, length = self.spans[i]
+        return original + min(sample - start, length)
+
+    def to_original(self, seconds: float) -> float:
+        """A timestamp of the trimmed audio (e.g. a segment start) in the original."""
+        sample = round(seconds * self.sample_rate)
+        return self.to_original_sample(sample) / self.sample_rate
+
+
+# ---- Trimming ---------------------------------------------------------------
+
+
+def speech_spans(probs, options: TrimOptions) -> list[tuple[int, int]]:
+    """Frame ranges [start, end) to keep, speech plus the allowed silence."""
+    speech = np.asarray(probs, dtype=np.float32) >= options.speech_threshold
+    voiced = np.flatnonzero(speech)
+    if voiced.size == 0:
+        return []
+
+    first = max(0, voiced[0] - options.margin_frames)
+    last = min(len(speech), voiced[-1] + 1 + options.margin_frames)
+
+    spans = []
+    start = first
+    # gaps between two voiced frames longer than the allowed pause
+    gaps = np.flatnonzero(np.diff(voiced) - 1 > options.max_pause_frames)
+    for g in gaps:
+        pause_start, pause_end = voiced[g] + 1, voiced[g + 1]
+        head = options.max_pause_frames // 2
+        tail = options.max_pause_frames - head
+        spans.append((start, pause_start + head))
+        start = pause_end - tail
+    spans.append((start, last))
+    return spans
+
+
+def trim_silence(
+    audio: np.ndarray,
+    probs,
+    options: TrimOptions | None = None,
+    sample_rate: int = SR,
+) -> tuple[np.ndarray, TimeMap]:
+    """
+    Drop the leading and trailing silence of an utterance and shorten its long
+    pauses, using the per-frame speech probabilities of the VAD.
+
+    `probs` holds one probability per frame of `audio`. When no frame is
+    voiced the audio is returned untouched.
+    """
+    options = options or TrimOptions()
+    if len(probs) == 0 or len(audio) == 0:
+        return audio, TimeMap(sample_rate, [(0, 0, len(audio))])
+
+    frame_samples = len(audio) // len(probs)
+    spans = speech_spans(probs, options)
+    if not spans:
+        return audio, TimeMap(sample_rate, [(0, 0, len(audio))])
+
+    pieces, time_spans, trimmed = [], [], 0
+    for start, end in spans:
+        original = start * frame_samples
+        # the last frame owns the remainder of the samples
+        stop = len(audio) if end >= len(probs) else end * frame_samples
+        pieces.append(audio[original:stop])
+        time_spans.append((trimmed, original, stop - original))
+        trimmed += stop - original
+
+    return np.concatenate(pieces), TimeMap(sample_rate, time_spans)
@@ -0,0 +1,214 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+logger = logging.getLogger("rt_py.bricks.slo")
+logger.setLevel(logging.DEBUG)
+
+# whisper models, smallest first
+MODEL_SIZES = [
+    "tiny",
+    "base",
+    "small",
+    "medium",
+    "large-v1",
+    "large-v2",
+    "large-v3-turbo",
+    "large-v3",
+]
+DEFAULT_LADDER_MODELS = "small,base,tiny"
+
+
+@dataclass(frozen=True)
+class Level:
+    """One step of the degradation ladder. None keeps the caller's choice."""
+
+    model: str | None = None  # largest model allowed
+    beam_size: int | None = None  # 1: greedy decoding
+    threads: int | None = None  # whisper threads per request
+
+    def describe(self) -> str:
+        return (
+            f"model<={self.model or 'any'} "
+            f"beam={self.beam_size or 'default'} threads={self.threads or 'default'}"
+        )
+
+
+def build_ladder(models: list[str], cpu_count: int | None = None) -> list[Level]:
+    """
+    From the requested decoding down to the cheapest one:
+    beam search -> greedy, then each smaller model, then fewer threads per
+    request (more requests fit on the cores at the same time).
+    """
+    cpu_count = cpu_count or os.cpu_count() or 4
+    threads = max(1, min(4, cpu_count) // 2)
+    ladder = [Level(), Level(models[0] if models else None, beam_size=1)]
+    for model in models[1:]:
+        ladder.append(Level(model, beam_size=1))
+    ladder.append(Level(ladder[-1].model, beam_size=1, threads=threads))
+    return ladder
+
+
+def model_size(model: str) -> int:
+    return MODEL_SIZES.index(model) if model in MODEL_SIZES else len(MODEL_SIZES)
+
+
+class LatencyController:
+    """
+    Keep the turn latency (STT + TTS) under a target by trading accuracy.
+
+    Every stage reports its latency (and the STT its real-time factor per
+    model); the controller keeps an EWMA per stage and the number of requests
+    in flight. When the predicted turn latency exceeds the target, or too many
+    requests queue up, it steps down the ladder; when the latency falls well
+    under the target it steps back up. After each change it holds for
+    `hold_s` so the new level can be measured (hysteresis).
+    Without a target the controller only measures.
+    """
+
+    def __init__(
+        self,
+        target_s: float | None = None,
+        ladder: list[Level] | None = None,
+        alpha: float = 0.3,
+        low_watermark: float = 0.6,
+        max_queue: int = 4,
+        hold_s: float = 10.0,
+        clock=time.monotonic,
+    ):
+        self.target_s = target_s
+        self.ladder = ladder or build_ladder(DEFAULT_LADDER_MODELS.split(","))
+        self.alpha = alpha
+        self.low_watermark = low_watermark
+        self.max_queue = max_queue
+        self.hold_s = hold_s
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._level = 0
+        self._changed_at = float("-inf")
+        self._latency: dict[str, float] = {}
+        self._rtf: dict[str, float] = {}
+        self._inflight: dict[str, int] = {}
+        self.downgrades = 0
+        self.upgrades = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    def level(self) -> Level:
+        return self.ladder[self._level]
+
+    def model_for(self, requested: str | None = None) -> str:
+        """The requested model, or a smaller one while the host is overloaded."""
+        cap = self.level().model
+        if cap is None or (requested and model_size(requested) <= model_size(cap)):
+            return requested
+        return cap
+
+    @contextmanager
+    def track(self, stage: str, audio_s: float | None = None, model: str | None = None):
+        with self._lock:
+            self._inflight[stage] = self._inflight.get(stage, 0) + 1
+        started = self.clock()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._inflight[stage] -= 1
+        self.observe(stage, self.clock() - started, audio_s, model)
+
+    def observe(
+        self,
+        stage: str,
+        elapsed: float,
+        audio_s: float | None = None,
+        model: str | None = None,
+    ):
+        a = self.alpha
+        with self._lock:
+            previous = self._latency.get(stage)
+            self._latency[stage] = (
+                elapsed if previous is None else (1 - a) * previous + a * elapsed
+            )
+            if audio_s and model:
+                rtf = elapsed / audio_s
+                previous = self._rtf.get(model)
+                self._rtf[model] = (
+                    rtf if previous is None else (1 - a) * previous + a * rtf
+                )
+            self._adjust()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "target_s": self.target_s,
+                "level": self._level,
+                "decoding": self.level().describe(),
+                "predicted_s": self._predicted(),
+                "latency_s": dict(self._latency),
+                "rtf": dict(self._rtf),
+                "inflight": dict(self._inflight),
+                "downgrades": self.downgrades,
+                "upgrades": self.upgrades,
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _predicted(self) -> float:
+        return sum(self._latency.values())
+
+    def _adjust(self):
+        if self.target_s is None:
+            return
+        now = self.clock()
+        if now - self._changed_at < self.hold_s:
+            return
+
+        predicted = self._predicted()
+        queued = sum(self._inflight.values())
+        overloaded = predicted > self.target_s or queued > self.max_queue
+        relaxed = (
+            predicted < self.low_watermark * self.target_s
+            and queued <= self.max_queue // 2
+        )
+        if overloaded and self._level + 1 < len(self.ladder):
+            self._set_level(self._level + 1, now)
+            self.downgrades += 1
+            logger.warning(
+                f"Turn latency {predicted:.2f}s (target {self.target_s:.2f}s, "
+                f"{queued} in flight): stepping down to {self.level().describe()}"
+            )
+        elif relaxed and self._level > 0:
+            self._set_level(self._level - 1, now)
+            self.upgrades += 1
+            logger.info(
+                f"Turn latency {predicted:.2f}s: "
+                f"stepping up to {self.level().describe()}"
+            )
+
+    def _set_level(self, level: int, now: float):
+        self._level = level
+        self._changed_at = now
+        # the STT latency measured at the previous level no longer applies
+        self._latency.pop("stt", None)
+
+
+controller: LatencyController | None = None
+
+
+def get_latency_controller() -> LatencyController:
+    global controller
+
+    if controller is None:
+        target_ms = os.getenv("TURN_LATENCY_TARGET_MS")
+        models = os.getenv("STT_SLO_MODELS", DEFAULT_LADDER_MODELS)
+        controller = LatencyController(
+            target_s=float(target_ms) / 1000 if target_ms else None,
+            ladder=build_ladder([m.strip() for m in models.split(",") if m.strip()]),
+            max_queue=int(os.getenv("STT_SLO_MAX_QUEUE", "4")),
+            hold_s=float(os.getenv("STT_SLO_HOLD_S", "10")),
+        )
+    return controller
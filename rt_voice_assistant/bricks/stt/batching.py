@@ -0,0 +1,115 @@
+import logging
+import threading
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger("rt_py.bricks.stt_batching")
+logger.setLevel(logging.DEBUG)
+
+# batch_fn(key, items) -> one result per item (an Exception fails that item only)
+BatchFn = Callable[[Hashable, list[Any]], list[Any]]
+
+
+@dataclass
+class BatchOptions:
+    window_ms: float = 5.0  # how long the first request waits for companions
+    max_batch_size: int = 8  # flush immediately once this many requests are queued
+    max_concurrent_batches: int = 4
+
+
+class BatchScheduler:
+    """
+    Collect concurrent requests sharing the same key (e.g. model and language)
+    and run them through `batch_fn` together.
+
+    A batch is flushed `window_ms` after its first request arrived, or as soon
+    as it reaches `max_batch_size`: the extra latency is bounded by the window.
+    """
+
+    def __init__(self, batch_fn: BatchFn, options: BatchOptions | None = None):
+        self.batch_fn = batch_fn
+        self.opt = options or BatchOptions()
+        self._lock = threading.Lock()
+        self._pending: dict[Hashable, list[tuple[Any, Future]]] = {}
+        self._timers: dict[Hashable, threading.Timer] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.opt.max_concurrent_batches,
+            thread_name_prefix="stt-batch",
+        )
+        self.batches = 0
+        self.items = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    def submit(self, key: Hashable, item: Any) -> Future:
+        future = Future()
+        flush_now = False
+        with self._lock:
+            pending = self._pending.setdefault(key, [])
+            pending.append((item, future))
+            if len(pending) >= self.opt.max_batch_size:
+                flush_now = True
+            elif len(pending) == 1:
+                timer = threading.Timer(self.opt.window_ms / 1000, self._flush, (key,))
+                timer.daemon = True
+                self._timers[key] = timer
+                timer.start()
+        if flush_now:
+            self._flush(key)
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "average_batch_size": self.items / self.batches if self.batches else 0,
+                "pending": sum(len(p) for p in self._pending.values()),
+            }
+
+    def shutdown(self):
+        with self._lock:
+            keys = list(self._pending)
+        for key in keys:
+            self._flush(key)
+        self._executor.shutdown(wait=True)
+
+    # --- Internals ------------------------------------------------------------
+
+    def _flush(self, key: Hashable):
+        with self._lock:
+            batch = self._pending.pop(key, None)
+            timer = self._timers.pop(key, None)
+            if not batch:
+                return
+            self.batches += 1
+            self.items += len(batch)
+        if timer is not None:
+            timer.cancel()
+        self._executor.submit(self._run, key, batch)
+
+    def _run(self, key: Hashable, batch: list[tuple[Any, Future]]):
+        # the requests cancelled while waiting for companions are dropped
+        batch = [(item, f) for item, f in batch if f.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        items = [item for item, _ in batch]
+        logger.debug(f"Running a batch of {len(items)} for {key}")
+        try:
+            results = self.batch_fn(key, items)
+            if len(results) != len(items):
+                raise ValueError(
+                    f"batch_fn returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:  # noqa: BLE001 - raised by the futures
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,208 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger("rt_py.bricks.stt_cache")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_DISK_MB = 256
+
+
+def pcm_fingerprint(audio: np.ndarray) -> str:
+    """Hash of the samples, whatever container they came in."""
+    samples = np.ascontiguousarray(audio, dtype="<f4").reshape(-1)
+    return hashlib.sha256(samples.tobytes()).hexdigest()
+
+
+def wav_fingerprint(data: bytes) -> str:
+    try:
+        samples, _ = sf.read(io.BytesIO(data), dtype="float32", always_2d=False)
+    except RuntimeError:
+        # not decodable here: fall back to the encoded bytes
+        return hashlib.sha256(data).hexdigest()
+    return pcm_fingerprint(samples)
+
+
+def cache_key(fingerprint: str, model: str, language: str, **params) -> str:
+    decoding = json.dumps(
+        {"model": model, "language": language, **params}, sort_keys=True
+    )
+    return hashlib.sha256(f"{fingerprint}:{decoding}".encode()).hexdigest()
+
+
+class TranscriptionCache:
+    """
+    Transcriptions by content: a bounded in-memory LRU in front of an
+    optional on-disk tier (one small JSON file per entry, oldest files
+    removed beyond `max_disk_bytes`).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        directory: str | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_MB * 1024 * 1024,
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._lock = threading.Lock()
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._disk_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    # --- Public API -----------------------------------------------------------
+
+    def get(self, key: str):
+        with self._lock:
+            text = self._memory.get(key)
+            if text is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return text
+
+        text = self._disk_get(key)
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._memory_put(key, text)
+        return text
+
+    def put(self, key: str, text: str):
+        if text is None:
+            return
+        with self._lock:
+            self._memory_put(key, text)
+        self._disk_put(key, text)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.directory:
+                for path, _, _ in self._disk_entries():
+                    os.remove(path)
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _memory_put(self, key: str, text: str):
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str):
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                text = json.load(f)["text"]
+            os.utime(path)  # the mtime is the LRU clock of the disk tier
+        except (OSError, ValueError, KeyError):
+            return None
+        return text
+
+    def _disk_put(self, key: str, text: str):
+        if not self.directory:
+            return
+        path = self._path(key)
+        payload = json.dumps({"text": text}).encode("utf-8")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            previous = os.path.getsize(path) if os.path.exists(path) else 0
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception(f"Could not write the cache entry {path}")
+            return
+        with self._lock:
+            self._disk_bytes += len(payload) - previous
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._disk_evict()
+
+    def _disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _disk_evict(self):
+        # drop the least recently used entries down to 90% of the budget
+        entries = sorted(self._disk_entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = self.max_disk_bytes * 0.9
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+
+cache: TranscriptionCache | None = None
+
+
+def get_transcription_cache():
+    """Return the process-wide cache, None when STT_CACHE_SIZE=0."""
+    global cache
+
+    max_entries = int(os.getenv("STT_CACHE_SIZE", DEFAULT_MAX_ENTRIES))
+    if max_entries <= 0:
+        return None
+    if cache is None:
+        cache = TranscriptionCache(
+            max_entries=max_entries,
+            directory=os.getenv("STT_CACHE_DIR"),
+            max_disk_bytes=int(os.getenv("STT_CACHE_DISK_MB", DEFAULT_MAX_DISK_MB))
+            * 1024
+            * 1024,
+        )
+    return cache
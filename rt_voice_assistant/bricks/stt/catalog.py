@@ -0,0 +1,223 @@
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+logger = logging.getLogger("rt_py.bricks.stt_catalog")
+logger.setLevel(logging.DEBUG)
+
+# model names published by whisper.cpp (models/download-ggml-model.sh)
+KNOWN_MODELS = {
+    "tiny",
+    "base",
+    "small",
+    "medium",
+    "large-v1",
+    "large-v2",
+    "large-v3",
+    "large-v3-turbo",
+}
+# order used when the caller does not ask for a specific model
+FALLBACK_MODELS = ["small", "tiny", "medium", "base"]
+
+# ggml-small.bin, ggml-small.en.bin, ggml-small.en-q5_1.bin, ggml-large-v3-turbo-q8_0.bin
+MODEL_FILE_RE = re.compile(
+    r"^ggml-(?P<model>[a-z0-9]+(?:-[a-z0-9]+)*?)"
+    r"(?:\.(?P<language>[a-z]{2}))?"
+    r"(?:-(?P<quantization>q\d+(?:_[0-9a-z]+)?|f16|f32))?\.bin$"
+)
+
+
+@dataclass(frozen=True)
+class ModelFile:
+    model: str
+    language: str  # None for multilingual models
+    quantization: str  # None for full precision models
+    path: str
+    priority: int  # index of the models directory, lower wins
+
+
+def parse_model_filename(filename: str):
+    match = MODEL_FILE_RE.match(filename)
+    if not match:
+        return None
+    return match.group("model"), match.group("language"), match.group("quantization")
+
+
+def default_directories(whisper_cpp_dir: str) -> list[str]:
+    return [
+        os.getenv("WHISPER_MODELS_DIR", "./models"),
+        f"{whisper_cpp_dir}/models",
+    ]
+
+
+class ModelCatalog:
+    """
+    In-memory index of the ggml models available on disk.
+
+    The directories are scanned once (and again on `refresh()` or when the
+    watcher notices a change); lookups are dictionary accesses.
+    Preference order for a (model, language) lookup:
+      - the language specific variant (`ggml-small.en.bin`) over the multilingual one
+      - the preferred quantization, then full precision, then any quantization
+      - the first models directory over the following ones
+    """
+
+    def __init__(
+        self,
+        whisper_binary: str | None = None,
+        directories: list[str] | None = None,
+        quantization: str | None = None,
+    ):
+        self.whisper_binary = whisper_binary
+        self.directories = directories or []
+        self.quantization = quantization
+        self._lock = threading.Lock()
+        self._best: dict[tuple[str, str], ModelFile] = {}
+        self._files: list[ModelFile] = []
+        self._models: set[str] = set()
+        self._signature = None
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    # --- Public API -----------------------------------------------------------
+
+    def refresh(self):
+        files = []
+        for priority, directory in enumerate(self.directories):
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                parsed = parse_model_filename(filename)
+                if parsed:
+                    model, language, quantization = parsed
+                    files.append(
+                        ModelFile(
+                            model,
+                            language,
+                            quantization,
+                            f"{directory}/{filename}",
+                            priority,
+                        )
+                    )
+
+        best = {}
+        for model_file in sorted(files, key=self._rank):
+            best.setdefault((model_file.model, model_file.language), model_file)
+
+        with self._lock:
+            self._files = files
+            self._best = best
+            self._models = {f.model for f in files}
+            self._signature = self._directories_signature()
+        logger.info(f"Model catalog: {len(files)} models in {self.directories}")
+
+    def lookup(
+        self, model: str | None = None, language: str | None = None
+    ) -> tuple[str, str]:
+        """Return (whisper_binary, model_path) without touching the disk."""
+        language = language or "en"
+        if model is None:
+            for candidate in FALLBACK_MODELS:
+                model_file = self._find(candidate, language)
+                if model_file:
+                    return self.whisper_binary, model_file.path
+            raise ValueError(f"No valid models directory found in {self.directories}")
+
+        if model not in KNOWN_MODELS and model not in self._models:
+            raise ValueError(f"Unknown whisper model: {model}")
+
+        model_file = self._find(model, language)
+        if model_file is None:
+            raise ValueError(
+                f"Model {model} ({language}) not found in {self.directories}"
+            )
+        return self.whisper_binary, model_file.path
+
+    def models(self) -> list[ModelFile]:
+        with self._lock:
+            return list(self._files)
+
+    def watch(self, interval: float = 10.0):
+        """Poll the directories and refresh the catalog when they change."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(
+            target=self._watch_loop,
+            args=(interval,),
+            name="whisper-model-catalog",
+            daemon=True,
+        )
+        self._watcher.start()
+
+    def stop(self):
+        self._stop_watching.set()
+
+    # --- Internals ------------------------------------------------------------
+
+    def _find(self, model: str, language: str):
+        best = self._best
+        return best.get((model, language)) or best.get((model, None))
+
+    def _rank(self, model_file: ModelFile):
+        if model_file.quantization == self.quantization:
+            quantization_rank = 0
+        elif model_file.quantization is None:
+            quantization_rank = 1
+        else:
+            quantization_rank = 2
+        return (quantization_rank, model_file.priority, model_file.path)
+
+    def _directories_signature(self):
+        signature = []
+        for directory in self.directories:
+            try:
+                signature.append(os.stat(directory).st_mtime_ns)
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _watch_loop(self, interval: float):
+        while not self._stop_watching.wait(interval):
+            if self._directories_signature() != self._signature:
+                logger.info("Models directories changed, refreshing the catalog")
+                self.refresh()
+
+
+catalog: ModelCatalog | None = None
+
+
+def detect_whisper_binary(whisper_cpp_dir: str):
+    whisper_binary = f"{whisper_cpp_dir}/build/bin/whisper-cli"
+    if not os.path.exists(whisper_binary):
+        logger.warning(
+            f"Whisper binary does not exist: {whisper_binary} -- will be using docker!"
+        )
+        whisper_binary = None
+    return whisper_binary
+
+
+def get_catalog() -> ModelCatalog:
+    """Return the process-wide catalog, built on first use."""
+    global catalog
+
+    if catalog is None:
+        home = os.path.expanduser("~")
+        whisper_cpp_dir = os.getenv(
+            "WHISPER_CPP_DIR", f"{home}/whisper.cpp"
+        )  # as suggested for macOS in our README
+        catalog = ModelCatalog(
+            whisper_binary=detect_whisper_binary(whisper_cpp_dir),
+            directories=default_directories(whisper_cpp_dir),
+            quantization=os.getenv("WHISPER_QUANTIZATION"),
+        )
+        catalog.refresh()
+        interval = float(os.getenv("WHISPER_CATALOG_WATCH_INTERVAL", "0"))
+        if interval > 0:
+            catalog.watch(interval)
+    return catalog
+
+
+def refresh_catalog():
+    get_catalog().refresh()
@@ -1,2 +1,14 @@
-def transcribe(input_wav_path: str, model: str = None, language: str = None) -> str:
+import numpy as np
+
+
+def transcribe(
+    input_wav_path: str, model: str | None = None, language: str | None = None
+) -> str:
+    return "transcription"
+
+
+def transcribe_array(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+) -> str:
+    """`audio`: 16 kHz float32 mono, as produced by the FrameProcessor."""
     return "transcription"
@@ -0,0 +1,210 @@
+import re
+from dataclasses import dataclass, field
+
+# whisper output on silence, music or noise: the usual subtitle credits
+HALLUCINATIONS = {
+    "thank you",
+    "thank you very much",
+    "thanks for watching",
+    "thank you for watching",
+    "thanks for listening",
+    "please subscribe",
+    "subscribe to the channel",
+    "subtitles by the amara.org community",
+    "you",
+    "bye",
+    "merci",
+    "merci d'avoir regardé cette vidéo",
+    "sous-titrage st' 501",
+    "sous-titres réalisés par la communauté d'amara.org",
+}
+# [BLANK_AUDIO], [MUSIC], (wind blowing), *coughs*, ♪
+NON_SPEECH_RE = re.compile(r"\[[^\]]*\]|\([^)]*\)|\*[^*]*\*|♪+")
+SPECIAL_TOKEN_RE = re.compile(r"^\[_.*_?\]$|^<\|.*\|>$")
+
+
+# ---- Types ------------------------------------------------------------------
+
+
+@dataclass
+class Segment:
+    start: float  # seconds
+    end: float
+    text: str
+    token_probs: list[float] = field(default_factory=list)
+    no_speech_prob: float | None = None
+    avg_logprob: float | None = None
+
+
+@dataclass
+class Transcript:
+    """A transcription with the decoder evidence, when the backend reports it."""
+
+    text: str
+    segments: list[Segment] = field(default_factory=list)
+    language: str | None = None
+
+    @property
+    def token_probs(self) -> list[float]:
+        return [p for segment in self.segments for p in segment.token_probs]
+
+
+@dataclass
+class GateOptions:
+    min_token_prob: float = 0.45  # mean probability of the text tokens
+    max_no_speech_prob: float = 0.6
+    max_words_per_second: float = 6.0  # faster than anyone speaks: a loop
+    min_unique_ratio: float = 0.3  # "you you you you you ..."
+    hallucinations: set[str] = field(default_factory=lambda: set(HALLUCINATIONS))
+    # a listed phrase is only dropped when the decoder doubts it
+    hallucination_min_token_prob: float = 0.8
+    hallucination_max_no_speech_prob: float = 0.3
+    hallucination_min_avg_logprob: float = -0.5
+
+
+@dataclass
+class GateDecision:
+    accepted: bool
+    reason: str | None = None
+    text: str | None = None  # the transcript without the non-speech annotations
+
+    def __bool__(self):
+        return self.accepted
+
+
+# ---- Parsing ----------------------------------------------------------------
+
+
+def _is_special(token_text: str) -> bool:
+    return bool(SPECIAL_TOKEN_RE.match(token_text.strip()))
+
+
+def from_whisper_cpp_json(data: dict, language: str | None = None) -> Transcript:
+    """The `-ojf` output of whisper-cli: segments with per-token probabilities."""
+    segments = []
+    for item in data.get("transcription", []):
+        offsets = item.get("offsets", {})
+        segments.append(
+            Segment(
+                start=offsets.get("from", 0) / 1000,
+                end=offsets.get("to", 0) / 1000,
+                text=item.get("text", ""),
+                token_probs=[
+                    token["p"]
+                    for token in item.get("tokens", [])
+                    if "p" in token and not _is_special(token.get("text", ""))
+                ],
+            )
+        )
+    language = language or data.get("result", {}).get("language")
+    return Transcript(
+        "".join(s.text for s in segments).strip(), segments, language=language
+    )
+
+
+def from_verbose_json(data: dict, language: str | None = None) -> Transcript:
+    """whisper-server `verbose_json` responses and openai-whisper results."""
+    segments = []
+    for item in data.get("segments", []):
+        probs = [
+            word["probability"]
+            for word in item.get("words") or []
+            if "probability" in word
+        ] or [
+            token["p"]
+            for token in item.get("tokens") or []
+            if isinstance(token, dict)
+            and "p" in token
+            and not _is_special(token.get("text", ""))
+        ]
+        segments.append(
+            Segment(
+                start=item.get("start", 0.0),
+                end=item.get("end", 0.0),
+                text=item.get("text", ""),
+                token_probs=probs,
+                no_speech_prob=item.get("no_speech_prob"),
+                avg_logprob=item.get("avg_logprob"),
+            )
+        )
+    text = data.get("text")
+    if text is None:
+        text = "".join(s.text for s in segments)
+    return Transcript(text.strip(), segments, language or data.get("language"))
+
+
+# ---- Gate -------------------------------------------------------------------
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"[^\w\s'-]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def _doubtful(
+    transcript: Transcript, confidence: float | None, options: GateOptions
+) -> bool:
+    """
+    Whether the decoder evidence casts doubt on the transcript. Without any
+    evidence there is no doubt: a real "thank you" must not be dropped.
+    """
+    if confidence is not None and confidence < options.hallucination_min_token_prob:
+        return True
+    no_speech = [
+        s.no_speech_prob for s in transcript.segments if s.no_speech_prob is not None
+    ]
+    if no_speech and max(no_speech) > options.hallucination_max_no_speech_prob:
+        return True
+    logprobs = [s.avg_logprob for s in transcript.segments if s.avg_logprob is not None]
+    return bool(logprobs) and (
+        sum(logprobs) / len(logprobs) < options.hallucination_min_avg_logprob
+    )
+
+
+def check_transcript(
+    transcript,
+    duration: float | None = None,
+    options: GateOptions | None = None,
+) -> GateDecision:
+    """
+    Decide whether a transcription is a real turn worth an LLM call and a TTS
+    synthesis. `transcript` is a Transcript, or the plain text of a backend
+    that reports no decoder evidence (only the textual checks apply then, and
+    the known hallucinations are kept: they are also things people say).
+    """
+    options = options or GateOptions()
+    if transcript is None or isinstance(transcript, str):
+        transcript = Transcript(transcript or "")
+
+    text = " ".join(NON_SPEECH_RE.sub(" ", transcript.text or "").split())
+    words = normalize(text).split()
+    if not words:
+        return GateDecision(False, "empty", text)
+
+    segments = transcript.segments
+    if segments and all(
+        s.no_speech_prob is not None and s.no_speech_prob > options.max_no_speech_prob
+        for s in segments
+    ):
+        return GateDecision(False, "no-speech", text)
+
+    probs = transcript.token_probs
+    confidence = sum(probs) / len(probs) if probs else None
+    if confidence is not None and confidence < options.min_token_prob:
+        return GateDecision(False, "low-confidence", text)
+
+    if normalize(text) in options.hallucinations and _doubtful(
+        transcript, confidence, options
+    ):
+        return GateDecision(False, "hallucination", text)
+
+    if len(words) >= 8 and len(set(words)) / len(words) < options.min_unique_ratio:
+        return GateDecision(False, "repetition", text)
+
+    spoken = duration
+    if segments:
+        spoken = max(s.end for s in segments) - min(s.start for s in segments)
+    if spoken and len(words) > max(3, spoken * options.max_words_per_second):
+        return GateDecision(False, "too-fast", text)
+
+    return GateDecision(True, None, text)
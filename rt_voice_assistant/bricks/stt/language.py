@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+import numpy as np
+
+from .whispercpp import detect_language
+
+logger = logging.getLogger("rt_py.bricks.stt_language")
+logger.setLevel(logging.DEBUG)
+
+AUTO = "auto"
+SR = 16000
+DEFAULT_MIN_CONFIDENCE = 0.6
+# shorter windows (a streaming partial) are not reliably identified
+MIN_DETECT_SECONDS = 2.0
+DEFAULT_MAX_SESSIONS = 1024
+# a pinned language is checked again every that many turns...
+DEFAULT_RECHECK_EVERY = 10
+# ...and unpinned after that many doubtful checks in a row
+DEFAULT_MAX_DOUBTS = 2
+
+# (audio) -> (language, probability)
+DetectFn = Callable[[np.ndarray], tuple[str, float]]
+
+
+class LanguageSession:
+    """
+    The spoken language of one conversation.
+
+    Until the language is pinned every turn goes through language
+    identification. A detection is pinned when it is confident, or when two
+    consecutive low confidence detections agree; later turns reuse it
+    without paying for the detection (and get the `.en` model when it applies).
+    Every `recheck_every` turns the pinned language is detected again: after
+    `max_doubts` checks in a row that disagree or are not confident, it is
+    unpinned (the speaker switched language, or the first pin was wrong).
+
+    The detection runs outside the lock, its result is only published if no
+    other turn published one meanwhile: the turns of a session do not wait
+    for each other's whisper-cli.
+    """
+
+    def __init__(
+        self,
+        detect_fn: DetectFn,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        default: str = "en",
+        recheck_every: int = DEFAULT_RECHECK_EVERY,
+        max_doubts: int = DEFAULT_MAX_DOUBTS,
+    ):
+        self.detect_fn = detect_fn
+        self.min_confidence = min_confidence
+        self.default = default
+        self.recheck_every = recheck_every
+        self.max_doubts = max_doubts
+        self.language: str | None = None
+        self.confidence: float = 0.0
+        self.pinned = False
+        self.detections = 0
+        self._turns = 0  # since the last detection
+        self._doubts = 0
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def language_for(self, audio: np.ndarray) -> str:
+        with self._lock:
+            if self.pinned:
+                self._turns += 1
+                if self._turns < self.recheck_every and not self._doubts:
+                    return self.language
+            version = self._version
+
+        language, confidence = self.detect_fn(audio)
+
+        with self._lock:
+            self.detections += 1
+            if language is None:
+                return self.language or self.default
+            if self._version != version:
+                # another turn published its detection first
+                return self.language if self.pinned else language
+            self._version += 1
+            self._turns = 0
+            confident = confidence >= self.min_confidence
+
+            if self.pinned:
+                if language == self.language and confident:
+                    self._doubts = 0
+                    return language
+                self._doubts += 1
+                if self._doubts < self.max_doubts:
+                    return language if confident else self.language
+                logger.info(
+                    f"Language unpinned: {self.language}, "
+                    f"{self._doubts} doubtful checks in a row"
+                )
+                self.pinned, self._doubts = False, 0
+
+            agrees = language == self.language
+            self.language, self.confidence = language, confidence
+            if confident or agrees:
+                self.pinned = True
+                logger.info(f"Language pinned: {language} (p = {confidence:.2f})")
+            return language
+
+    def guess(self) -> str:
+        """The language to use before a detection: the last one, else the default."""
+        return self.language or self.default
+
+    def enough_speech(self, audio: np.ndarray) -> bool:
+        return audio.size >= MIN_DETECT_SECONDS * SR
+
+    def pin(self, language: str):
+        with self._lock:
+            self.language, self.confidence, self.pinned = language, 1.0, True
+            self._turns, self._doubts = 0, 0
+            self._version += 1
+
+    def reset(self):
+        with self._lock:
+            self.language, self.confidence, self.pinned = None, 0.0, False
+            self._turns, self._doubts = 0, 0
+            self._version += 1
+
+
+class LanguageSessions:
+    """The language sessions by id, least recently used ones dropped first."""
+
+    def __init__(
+        self,
+        detect_fn: DetectFn,
+        min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        recheck_every: int = DEFAULT_RECHECK_EVERY,
+    ):
+        self.detect_fn = detect_fn
+        self.min_confidence = min_confidence
+        self.max_sessions = max_sessions
+        self.recheck_every = recheck_every
+        self.detections = 0  # of the requests without a session
+        self._lock = threading.Lock()
+        self._sessions: OrderedDict[str, LanguageSession] = OrderedDict()
+
+    def get(self, session_id: str) -> LanguageSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = LanguageSession(
+                    self.detect_fn,
+                    self.min_confidence,
+                    recheck_every=self.recheck_every,
+                )
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def detect(self, audio: np.ndarray, default: str = "en") -> str:
+        """The language of one utterance, without a session to pin it in."""
+        language, _ = self.detect_fn(audio)
+        with self._lock:
+            self.detections += 1
+        return language or default
+
+    def drop(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            detections = self.detections
+        return {
+            "sessions": len(sessions),
+            "pinned": sum(s.pinned for s in sessions),
+            "detections": detections + sum(s.detections for s in sessions),
+        }
+
+
+sessions: LanguageSessions | None = None
+
+
+def get_language_sessions() -> LanguageSessions:
+    global sessions
+
+    if sessions is None:
+        sessions = LanguageSessions(
+            detect_language,
+            min_confidence=float(
+                os.getenv("STT_LANGUAGE_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE)
+            ),
+            recheck_every=int(
+                os.getenv("STT_LANGUAGE_RECHECK_EVERY", DEFAULT_RECHECK_EVERY)
+            ),
+        )
+    return sessions
+
+
+def resolve_language(
+    language: str, audio: np.ndarray, session_id: str | None = None
+) -> str:
+    """
+    The language to transcribe with: as given, or detected for "auto", in
+    the client's session. Without a session id nothing is pinned: every
+    utterance is identified on its own.
+    """
+    if language != AUTO:
+        return language
+    if session_id is None:
+        return get_language_sessions().detect(audio)
+    return get_language_sessions().get(session_id).language_for(audio)
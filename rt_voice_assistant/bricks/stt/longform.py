@@ -0,0 +1,151 @@
+import logging
+import os
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger("rt_py.bricks.stt_longform")
+logger.setLevel(logging.DEBUG)
+
+SR = 16000
+DEFAULT_MAX_CHUNK_S = 28.0  # stay inside the 30 s whisper window
+DEFAULT_WORKERS = 4
+LONG_AUDIO_S = 30.0  # shorter recordings are transcribed in one go
+
+# (audio, sample_rate) -> [{"start": sample, "end": sample}, ...]
+SegmentFn = Callable[[np.ndarray, int], list[dict]]
+# (audio) -> text
+TranscribeFn = Callable[[np.ndarray], str]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    index: int
+    start: int  # samples, in the whole recording
+    end: int
+
+
+@dataclass
+class ChunkResult:
+    index: int
+    start: float  # seconds, in the whole recording
+    end: float
+    text: str
+
+    def as_dict(self) -> dict:
+        return {
+            "index": self.index,
+            "start": round(self.start, 3),
+            "end": round(self.end, 3),
+            "text": self.text,
+        }
+
+
+def plan_chunks(
+    regions: list[dict],
+    total_samples: int,
+    sr: int = SR,
+    max_chunk_s: float = DEFAULT_MAX_CHUNK_S,
+) -> list[Chunk]:
+    """
+    Group the speech regions into chunks of at most `max_chunk_s`, cut in the
+    middle of the gaps between regions. Regions longer than a chunk are split
+    at fixed intervals. The silence before the first and after the last region
+    is left out.
+    """
+    max_len = int(max_chunk_s * sr)
+    spans = []
+    for region in regions:
+        start, end = int(region["start"]), min(int(region["end"]), total_samples)
+        while end - start > max_len:
+            spans.append((start, start + max_len))
+            start += max_len
+        if end > start:
+            spans.append((start, end))
+
+    chunks: list[tuple[int, int]] = []
+    for start, end in spans:
+        if chunks and end - chunks[-1][0] <= max_len:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+
+    # give each chunk half of the gaps around it, whisper likes some context
+    bounds = []
+    for i, (start, end) in enumerate(chunks):
+        if i > 0:
+            start = max(start - (start - chunks[i - 1][1]) // 2, end - max_len)
+        if i + 1 < len(chunks):
+            end = min(end + (chunks[i + 1][0] - end) // 2, start + max_len)
+        bounds.append((start, end))
+    return [Chunk(i, start, end) for i, (start, end) in enumerate(bounds)]
+
+
+def default_segments(audio: np.ndarray, sr: int) -> list[dict]:
+    # torch is only needed for long recordings
+    from ..vad.silero import speech_timestamps
+
+    return speech_timestamps(audio, sr, max_speech_duration_s=DEFAULT_MAX_CHUNK_S)
+
+
+def transcribe_long(
+    audio: np.ndarray,
+    transcribe_fn: TranscribeFn,
+    segment_fn: SegmentFn | None = None,
+    sr: int = SR,
+    max_workers: int | None = None,
+    max_chunk_s: float = DEFAULT_MAX_CHUNK_S,
+    executor: Executor | None = None,
+) -> Iterator[ChunkResult]:
+    """
+    Transcribe a long recording chunk by chunk.
+
+    The recording is cut at the speech gaps found by the VAD, the chunks are
+    transcribed in parallel, and the results are yielded in order, each as
+    soon as it and the chunks before it are done. Timestamps are relative to
+    the start of the recording.
+    At most `max_workers` chunks are submitted ahead of the one being
+    waited for, to a pool of that size or to `executor` (anything with a
+    `submit`, e.g. the STT stage of the API) when given.
+    """
+    segment_fn = segment_fn or default_segments
+    max_workers = max_workers or int(os.getenv("STT_LONG_WORKERS", DEFAULT_WORKERS))
+
+    chunks = plan_chunks(segment_fn(audio, sr), len(audio), sr, max_chunk_s)
+    logger.info(f"{len(audio) / sr:.1f}s of audio in {len(chunks)} chunks")
+    if not chunks:
+        return
+
+    own_pool = executor is None
+    if own_pool:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    with executor if own_pool else nullcontext():
+        pending = iter(chunks)
+        futures = deque()
+
+        def submit_next():
+            chunk = next(pending, None)
+            if chunk is not None:
+                audio_chunk = audio[chunk.start : chunk.end]
+                futures.append((chunk, executor.submit(transcribe_fn, audio_chunk)))
+
+        try:
+            for _ in range(max_workers):
+                submit_next()
+            while futures:
+                chunk, future = futures.popleft()
+                text = future.result()
+                submit_next()
+                yield ChunkResult(chunk.index, chunk.start / sr, chunk.end / sr, text)
+        finally:
+            # the consumer went away: do not transcribe the rest
+            for _, future in futures:
+                future.cancel()
+
+
+def merge_results(results: list[ChunkResult]) -> str:
+    return " ".join(r.text.strip() for r in results if r.text and r.text.strip())
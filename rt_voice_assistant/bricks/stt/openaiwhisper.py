@@ -1,7 +1,45 @@
 import whisper
 
+from .gate import from_verbose_json
+from .registry import ModelKey, default_device, get_model_registry
 
-def transcribe(input_wav_path: str, model: str = None, language: str = None):
-    model = whisper.load_model(model or "tiny")
-    result = model.transcribe(input_wav_path)
+
+def load_model(model: str | None = None, device: str | None = None):
+    """Load once, then reuse the resident model (see registry)."""
+    model = model or "tiny"
+    device = device or default_device()
+    return get_model_registry().get(
+        ModelKey("openaiwhisper", model, device),
+        lambda: whisper.load_model(model, device=device),
+    )
+
+
+def transcribe(
+    input_wav_path: str, model: str | None = None, language: str | None = None
+):
+    device = default_device()
+    model = load_model(model, device)
+    result = model.transcribe(input_wav_path, language=language, fp16=device == "cuda")
+    return result["text"]
+
+
+def transcribe_array(audio, model: str | None = None, language: str | None = None):
+    """`audio`: 16 kHz float32 mono, as produced by the FrameProcessor."""
+    device = default_device()
+    model = load_model(model, device)
+    result = model.transcribe(
+        audio.astype("float32").reshape(-1), language=language, fp16=device == "cuda"
+    )
     return result["text"]
+
+
+def transcribe_array_detailed(
+    audio, model: str | None = None, language: str | None = None
+):
+    """The text with the segments, their no-speech and average log probabilities."""
+    device = default_device()
+    model = load_model(model, device)
+    result = model.transcribe(
+        audio.astype("float32").reshape(-1), language=language, fp16=device == "cuda"
+    )
+    return from_verbose_json(result, language)
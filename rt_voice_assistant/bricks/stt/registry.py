@@ -0,0 +1,182 @@
+import gc
+import logging
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+logger = logging.getLogger("rt_py.bricks.stt_registry")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_BUDGET_MB = 4096
+
+# rough resident size of the whisper checkpoints, used when RSS can't be measured
+MODEL_SIZE_MB = {
+    "tiny": 150,
+    "base": 290,
+    "small": 970,
+    "medium": 3100,
+    "large": 6200,
+    "turbo": 3300,
+}
+
+
+@dataclass(frozen=True)
+class ModelKey:
+    backend: str
+    model: str
+    device: str
+    compute_type: str | None = None
+
+
+@dataclass
+class ResidentModel:
+    model: Any
+    size_bytes: int
+
+
+def default_device() -> str:
+    try:
+        import torch
+    except ImportError:
+        return "cpu"
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def default_compute_type(device: str) -> str:
+    # int8 is the fastest option CTranslate2 offers on CPU
+    return "float16" if device == "cuda" else "int8"
+
+
+def resident_set_size() -> int:
+    """Current RSS of this process in bytes, 0 when unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def estimated_size(model: str) -> int:
+    for name, size_mb in MODEL_SIZE_MB.items():
+        if model.startswith(name):
+            return size_mb * 1024 * 1024
+    return MODEL_SIZE_MB["small"] * 1024 * 1024
+
+
+class ModelRegistry:
+    """
+    Keep in-process STT models resident between calls.
+
+    Models are loaded once per (backend, model, device, compute_type) and
+    evicted least-recently-used first once the accounted memory exceeds
+    `budget_bytes`. The memory of a model is the RSS growth measured while
+    loading it (or a static estimate when RSS is not available).
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._lock = threading.Lock()
+        self._models: OrderedDict[ModelKey, ResidentModel] = OrderedDict()
+        # one lock per key: two callers never load the same model twice
+        self._loading: dict[ModelKey, threading.Lock] = {}
+        self.loads = 0
+        self.evictions = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    def get(self, key: ModelKey, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            resident = self._models.get(key)
+            if resident is not None:
+                self._models.move_to_end(key)
+                return resident.model
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                resident = self._models.get(key)
+                if resident is not None:
+                    self._models.move_to_end(key)
+                    return resident.model
+
+            logger.info(f"Loading {key}")
+            rss_before = resident_set_size()
+            model = loader()
+            rss_growth = resident_set_size() - rss_before
+            size_bytes = rss_growth if rss_growth > 0 else estimated_size(key.model)
+
+            with self._lock:
+                self._models[key] = ResidentModel(model, size_bytes)
+                self.loads += 1
+                evicted = self._evict_locked(keep=key)
+
+        if evicted:
+            gc.collect()
+        return model
+
+    def evict(self, key: ModelKey) -> bool:
+        with self._lock:
+            removed = self._models.pop(key, None) is not None
+        if removed:
+            gc.collect()
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def used_bytes(self) -> int:
+        with self._lock:
+            return sum(m.size_bytes for m in self._models.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": sum(m.size_bytes for m in self._models.values()),
+                "loads": self.loads,
+                "evictions": self.evictions,
+                "models": [
+                    {
+                        "backend": key.backend,
+                        "model": key.model,
+                        "device": key.device,
+                        "compute_type": key.compute_type,
+                        "size_bytes": resident.size_bytes,
+                    }
+                    for key, resident in self._models.items()
+                ],
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _evict_locked(self, keep: ModelKey) -> bool:
+        evicted = False
+        used = sum(m.size_bytes for m in self._models.values())
+        for key in list(self._models):
+            if used <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            used -= self._models.pop(key).size_bytes
+            self.evictions += 1
+            evicted = True
+            logger.info(f"Evicted {key} to stay within {self.budget_bytes} bytes")
+        return evicted
+
+
+registry: ModelRegistry | None = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Return the registry shared by all the in-process STT backends."""
+    global registry
+
+    if registry is None:
+        budget_mb = int(os.getenv("STT_MODEL_RAM_BUDGET_MB", DEFAULT_BUDGET_MB))
+        registry = ModelRegistry(budget_mb * 1024 * 1024)
+    return registry
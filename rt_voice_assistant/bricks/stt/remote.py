@@ -0,0 +1,265 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import requests
+
+from ..audio import SR, to_wav_bytes
+from .gate import Transcript, from_verbose_json
+
+logger = logging.getLogger("rt_py.bricks.stt_remote")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_HEALTH_INTERVAL = 5.0
+DEFAULT_REQUEST_TIMEOUT = 120.0
+
+
+class NoRemoteWorker(RuntimeError):
+    pass
+
+
+@dataclass
+class RemoteWorker:
+    """
+    An STT worker reachable over HTTP (see `rt_voice_assistant.stt_worker`,
+    or any whisper-server). `models` is the subset of models it keeps
+    resident, None when it serves every model.
+    """
+
+    url: str
+    models: frozenset[str] | None = None
+    healthy: bool = True
+    outstanding: int = 0
+    requests: int = 0
+    failures: int = 0
+    last_failure_at: float = field(default=0.0, repr=False)
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+
+def parse_workers(spec: str) -> list[RemoteWorker]:
+    """
+    "http://gpu-1:8178=small,base;http://gpu-2:8178=tiny;http://cpu-1:8178"
+    -> three workers, the last one serving every model.
+    """
+    workers = []
+    for entry in (spec or "").split(";"):
+        entry = entry.strip()
+        if not entry:
+            continue
+        url, _, models = entry.partition("=")
+        workers.append(
+            RemoteWorker(
+                url.rstrip("/"),
+                frozenset(m.strip() for m in models.split(",") if m.strip()) or None,
+            )
+        )
+    return workers
+
+
+class RemoteWorkerPool:
+    """
+    Dispatch transcriptions to remote STT workers.
+
+      - affinity: a model only goes to the workers that keep it resident
+      - balancing: among those, the worker with the fewest requests in flight
+      - failures: a worker that cannot be reached (or answers 5xx) is marked
+        unhealthy and the request is retried on another worker
+      - health: a background thread polls GET /health and brings workers back
+    """
+
+    def __init__(
+        self,
+        workers: list[RemoteWorker],
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        max_attempts: int = 2,
+        session=None,
+    ):
+        self.workers = workers
+        self.health_interval = health_interval
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._health_thread = None
+
+    # --- Public API -----------------------------------------------------------
+
+    def transcribe(
+        self, audio: bytes, model: str, language: str | None = None, **params
+    ) -> dict:
+        tried = set()
+        last_error = None
+        for _ in range(self.max_attempts):
+            worker = self._acquire(model, tried)
+            if worker is None:
+                break
+            tried.add(worker.url)
+            try:
+                return self._inference(worker, audio, model, language, **params)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._failed(worker, e)
+                last_error = e
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code < 500:
+                    raise
+                self._failed(worker, e)
+                last_error = e
+            finally:
+                self._release(worker)
+
+        raise NoRemoteWorker(
+            f"No remote STT worker could transcribe with {model} (tried {sorted(tried)})"
+        ) from last_error
+
+    def check_health(self):
+        for worker in list(self.workers):
+            if self._stopped.is_set():
+                return
+            try:
+                response = self.session.get(f"{worker.url}/health", timeout=2.0)
+                healthy = response.status_code in (200, 404)
+            except requests.RequestException:
+                healthy = False
+            with self._lock:
+                if healthy and not worker.healthy:
+                    logger.info(f"Remote STT worker {worker.url} is back")
+                worker.healthy = healthy
+
+    def start(self):
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="stt-remote-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def shutdown(self):
+        self._stopped.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                worker.url: {
+                    "models": sorted(worker.models) if worker.models else None,
+                    "healthy": worker.healthy,
+                    "outstanding": worker.outstanding,
+                    "requests": worker.requests,
+                    "failures": worker.failures,
+                }
+                for worker in self.workers
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _acquire(self, model: str, exclude: set[str]):
+        with self._lock:
+            serving = [
+                w for w in self.workers if w.serves(model) and w.url not in exclude
+            ]
+            # when every worker looks down, try them anyway rather than fail
+            candidates = [w for w in serving if w.healthy] or serving
+            if not candidates:
+                return None
+            # ties go to the worker that dedicates itself to the model
+            worker = min(candidates, key=lambda w: (w.outstanding, w.models is None))
+            worker.outstanding += 1
+            worker.requests += 1
+            return worker
+
+    def _release(self, worker: RemoteWorker):
+        with self._lock:
+            worker.outstanding -= 1
+
+    def _failed(self, worker: RemoteWorker, error: Exception):
+        logger.warning(f"Remote STT worker {worker.url} failed: {error}")
+        with self._lock:
+            worker.healthy = False
+            worker.failures += 1
+            worker.last_failure_at = time.monotonic()
+
+    def _inference(self, worker, audio, model, language, **params) -> dict:
+        data = {"response_format": "json", "model": model}
+        if language:
+            data["language"] = language
+        data.update({k: str(v) for k, v in params.items() if v is not None})
+        response = self.session.post(
+            f"{worker.url}/inference",
+            files={"file": ("audio.wav", audio, "audio/wav")},
+            data=data,
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            self.check_health()
+
+
+pool: RemoteWorkerPool | None = None
+
+
+def get_remote_pool() -> RemoteWorkerPool:
+    """The pool of STT_REMOTE_WORKERS, created on first use."""
+    global pool
+
+    if pool is None:
+        workers = parse_workers(os.getenv("STT_REMOTE_WORKERS", ""))
+        if not workers:
+            raise NoRemoteWorker("STT_REMOTE_WORKERS is not configured")
+        pool = RemoteWorkerPool(
+            workers,
+            health_interval=float(
+                os.getenv("STT_REMOTE_HEALTH_INTERVAL", DEFAULT_HEALTH_INTERVAL)
+            ),
+            timeout=float(os.getenv("STT_REMOTE_TIMEOUT", DEFAULT_REQUEST_TIMEOUT)),
+        )
+        pool.start()
+    return pool
+
+
+def stats():
+    return pool.stats() if pool is not None else None
+
+
+# --- STT backend (see router) -------------------------------------------------
+
+
+def transcribe_wav_bytes(
+    audio: bytes, model: str | None = None, language: str | None = None
+):
+    result = get_remote_pool().transcribe(audio, model or "small", language)
+    text = result.get("text")
+    return text.strip() if text is not None else None
+
+
+def transcribe(
+    input_wav_path: str, model: str | None = None, language: str | None = None
+):
+    with open(input_wav_path, "rb") as f:
+        return transcribe_wav_bytes(f.read(), model, language)
+
+
+def transcribe_array(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+):
+    return transcribe_wav_bytes(to_wav_bytes(audio, SR), model, language)
+
+
+def transcribe_array_detailed(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+) -> Transcript:
+    result = get_remote_pool().transcribe(
+        to_wav_bytes(audio, SR),
+        model or "small",
+        language,
+        response_format="verbose_json",
+    )
+    return from_verbose_json(result, language)
@@ -0,0 +1,409 @@
+import importlib
+import io
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import soundfile as sf
+
+from ..cancellation import Cancelled, current_token
+from ..slo import LatencyController, get_latency_controller
+from .gate import Transcript
+
+logger = logging.getLogger("rt_py.bricks.stt_router")
+logger.setLevel(logging.DEBUG)
+
+SR = 16000
+# the in-process fallbacks (whisperx, openaiwhisper) load torch in the API
+# process: they are opt-in, through STT_BACKENDS
+DEFAULT_BACKENDS = "whispercpp"
+DEFAULT_DEADLINE_MS = 2000
+MIN_RETRY_AFTER_S = 1.0
+# OpenAI clients ask for "whisper-1": every backend gets the local model instead
+DEFAULT_MODEL_ALIASES = "whisper-1=small"
+
+
+class BackendUnavailable(RuntimeError):
+    pass
+
+
+class NoBackendAvailable(RuntimeError):
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@dataclass
+class BackendStats:
+    """Per (backend, model) observations, smoothed with an EWMA."""
+
+    rtf: float | None = None  # processing time / audio duration
+    latency: float | None = None  # seconds per call
+    error_rate: float = 0.0
+    calls: int = 0
+    errors: int = 0
+    last_error_at: float = 0.0
+
+
+@dataclass
+class Backend:
+    """Adapter around one of the `bricks.stt` modules."""
+
+    name: str
+    module: str | None = None  # defaults to `bricks.stt.<name>`
+    max_inflight: int | None = None  # None: never considered saturated
+    _impl: object = field(default=None, repr=False)
+    _unavailable: bool = False
+
+    def load(self):
+        if self._unavailable:
+            raise BackendUnavailable(self.name)
+        if self._impl is None:
+            try:
+                self._impl = importlib.import_module(
+                    self.module or f".{self.name}", __package__
+                )
+            except ImportError as e:
+                self._unavailable = True
+                logger.warning(f"STT backend {self.name} is not installed: {e}")
+                raise BackendUnavailable(self.name) from e
+        return self._impl
+
+    def transcribe(self, input_wav_path: str, model: str, language: str):
+        return as_text(self.load().transcribe(input_wav_path, model, language))
+
+    def transcribe_array(self, audio: np.ndarray, model: str, language: str):
+        impl = self.load()
+        if hasattr(impl, "transcribe_array"):
+            return as_text(impl.transcribe_array(audio, model, language))
+        raise BackendUnavailable(f"{self.name} does not transcribe arrays")
+
+    def transcribe_array_detailed(self, audio: np.ndarray, model: str, language: str):
+        impl = self.load()
+        if hasattr(impl, "transcribe_array_detailed"):
+            return impl.transcribe_array_detailed(audio, model, language)
+        text = self.transcribe_array(audio, model, language)
+        return Transcript(text, language=language) if text is not None else None
+
+    def transcribe_wav_bytes(self, audio: bytes, model: str, language: str):
+        impl = self.load()
+        if hasattr(impl, "transcribe_wav_bytes"):
+            return as_text(impl.transcribe_wav_bytes(audio, model, language))
+        return self.transcribe_array(decode_wav_bytes(audio), model, language)
+
+    @property
+    def available(self) -> bool:
+        return not self._unavailable
+
+
+def decode_wav_bytes(audio: bytes) -> np.ndarray:
+    samples, sr = sf.read(io.BytesIO(audio), dtype="float32", always_2d=False)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if sr != SR:
+        raise ValueError(f"Expected {SR} Hz audio, got {sr} Hz")
+    return samples
+
+
+def as_text(result):
+    """whisperx returns segments, the other backends return text."""
+    if result is None or isinstance(result, str):
+        return result.strip() if result else result
+    return " ".join(segment["text"].strip() for segment in result).strip()
+
+
+def parse_aliases(spec: str) -> dict[str, str]:
+    """whisper-1=small,large=large-v3 -> {"whisper-1": "small", "large": "large-v3"}"""
+    aliases = {}
+    for entry in spec.split(","):
+        alias, _, model = entry.partition("=")
+        if alias.strip() and model.strip():
+            aliases[alias.strip()] = model.strip()
+    return aliases
+
+
+class STTRouter:
+    """
+    Send every transcription to the backend most likely to meet the deadline.
+
+    For each (backend, model) the router keeps an EWMA of the real-time factor,
+    of the call latency and of the error rate; the requests in flight are
+    counted per backend, whatever their model.
+    Backends are tried in the configured preference order, skipping those that
+      - are saturated (`max_inflight` requests running, when set),
+      - are failing (error rate above `max_error_rate`, retried after `cooldown_s`),
+      - are predicted to miss the deadline (rtf x audio duration).
+    When none qualifies the fastest non-saturated backend is used. A backend
+    raising or returning nothing falls through to the next one. When every
+    backend is skipped, `NoBackendAvailable.retry_after` is the time until the
+    first one is expected back: the end of its cooldown, or the end of its
+    oldest request in flight.
+    Model `aliases` ("whisper-1" for OpenAI clients) are resolved first.
+    With a latency `controller`, the requested model may be swapped for a
+    smaller one while the turn latency is over its target.
+    """
+
+    def __init__(
+        self,
+        backends: list[Backend],
+        deadline_s: float = DEFAULT_DEADLINE_MS / 1000,
+        alpha: float = 0.2,
+        max_error_rate: float = 0.5,
+        cooldown_s: float = 30.0,
+        controller: LatencyController | None = None,
+        aliases: dict[str, str] | None = None,
+    ):
+        self.backends = backends
+        self.controller = controller
+        self.aliases = (
+            parse_aliases(DEFAULT_MODEL_ALIASES) if aliases is None else aliases
+        )
+        self.deadline_s = deadline_s
+        self.alpha = alpha
+        self.max_error_rate = max_error_rate
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str], BackendStats] = {}
+        # start times of the requests in flight, per backend
+        self._running: dict[str, list[float]] = {}
+
+    # --- Public API -----------------------------------------------------------
+
+    def transcribe(
+        self, input_wav_path: str, model: str | None = None, language: str | None = None
+    ):
+        try:
+            duration = sf.info(input_wav_path).duration
+        except RuntimeError:
+            duration = None
+        return self._route(
+            lambda backend, model: backend.transcribe(input_wav_path, model, language),
+            model,
+            duration,
+        )
+
+    def transcribe_array(
+        self, audio: np.ndarray, model: str | None = None, language: str | None = None
+    ):
+        return self._route(
+            lambda backend, model: backend.transcribe_array(audio, model, language),
+            model,
+            audio.size / SR,
+        )
+
+    def transcribe_array_detailed(
+        self, audio: np.ndarray, model: str | None = None, language: str | None = None
+    ) -> Transcript:
+        return self._route(
+            lambda backend, model: backend.transcribe_array_detailed(
+                audio, model, language
+            ),
+            model,
+            audio.size / SR,
+        )
+
+    def transcribe_wav_bytes(
+        self, audio: bytes, model: str | None = None, language: str | None = None
+    ):
+        try:
+            duration = sf.info(io.BytesIO(audio)).duration
+        except RuntimeError:
+            duration = None
+        return self._route(
+            lambda backend, model: backend.transcribe_wav_bytes(audio, model, language),
+            model,
+            duration,
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                f"{backend}:{model}": {
+                    "rtf": s.rtf,
+                    "latency": s.latency,
+                    "error_rate": s.error_rate,
+                    "inflight": len(self._running.get(backend, ())),
+                    "calls": s.calls,
+                    "errors": s.errors,
+                }
+                for (backend, model), s in self._stats.items()
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _stat(self, backend: Backend, model: str) -> BackendStats:
+        return self._stats.setdefault((backend.name, model), BackendStats())
+
+    def _saturated(self, backend: Backend) -> bool:
+        return backend.max_inflight is not None and (
+            len(self._running.get(backend.name, ())) >= backend.max_inflight
+        )
+
+    def _failing(self, s: BackendStats, now: float) -> bool:
+        return (
+            s.error_rate > self.max_error_rate
+            and now - s.last_error_at < self.cooldown_s
+        )
+
+    def candidates(self, model: str, duration: float | None = None) -> list[Backend]:
+        now = time.monotonic()
+        preferred, late = [], []
+        with self._lock:
+            for backend in self.backends:
+                if not backend.available:
+                    continue
+                s = self._stat(backend, model)
+                if self._saturated(backend) or self._failing(s, now):
+                    continue
+                predicted = s.rtf * duration if s.rtf is not None and duration else None
+                if predicted is None or predicted <= self.deadline_s:
+                    preferred.append(backend)
+                else:
+                    late.append((predicted, backend))
+        return preferred + [backend for _, backend in sorted(late, key=lambda x: x[0])]
+
+    def retry_after(self, model: str) -> float:
+        """Seconds until a backend is expected to take `model` requests again."""
+        now = time.monotonic()
+        waits = []
+        with self._lock:
+            for backend in self.backends:
+                if not backend.available:
+                    continue
+                s = self._stat(backend, model)
+                wait = 0.0
+                if self._failing(s, now):
+                    wait = s.last_error_at + self.cooldown_s - now
+                if self._saturated(backend):
+                    # the oldest request in flight frees the first slot
+                    latency = s.latency if s.latency is not None else self.deadline_s
+                    drained = min(self._running[backend.name]) + latency - now
+                    wait = max(wait, drained)
+                waits.append(wait)
+        if not waits:
+            return self.cooldown_s
+        return max(min(waits), MIN_RETRY_AFTER_S)
+
+    def _route(self, call, model: str, duration: float | None = None):
+        model = self.aliases.get(model, model)
+        if self.controller is None:
+            return self._call(call, model, duration)
+        model = self.controller.model_for(model)
+        with self.controller.track("stt", duration, model):
+            return self._call(call, model, duration)
+
+    def _call(self, call, model: str, duration: float | None = None):
+        candidates = self.candidates(model, duration)
+        if not candidates:
+            raise NoBackendAvailable(
+                "Every STT backend is saturated or failing",
+                retry_after=self.retry_after(model),
+            )
+
+        token = current_token()
+        last_error = None
+        for backend in candidates:
+            if token is not None:
+                token.raise_if_cancelled()
+            started = time.monotonic()
+            with self._lock:
+                self._running.setdefault(backend.name, []).append(started)
+            try:
+                result = call(backend, model)
+                if result is None:
+                    raise RuntimeError(f"{backend.name} returned no transcription")
+            except BackendUnavailable as e:
+                last_error = e
+                continue
+            except Cancelled:
+                raise
+            except Exception as e:
+                logger.exception(f"STT backend {backend.name} failed, falling back")
+                self._record(backend, model, None, duration, error=True)
+                last_error = e
+                continue
+            finally:
+                with self._lock:
+                    self._running[backend.name].remove(started)
+            self._record(backend, model, time.monotonic() - started, duration)
+            return result
+
+        raise NoBackendAvailable(
+            "No STT backend could transcribe the audio",
+            retry_after=self.retry_after(model),
+        ) from last_error
+
+    def _record(self, backend, model, elapsed, duration, error=False):
+        a = self.alpha
+        with self._lock:
+            s = self._stat(backend, model)
+            s.calls += 1
+            s.error_rate = (1 - a) * s.error_rate + a * (1.0 if error else 0.0)
+            if error:
+                s.errors += 1
+                s.last_error_at = time.monotonic()
+                return
+            s.latency = (
+                elapsed if s.latency is None else (1 - a) * s.latency + a * elapsed
+            )
+            if duration:
+                rtf = elapsed / duration
+                s.rtf = rtf if s.rtf is None else (1 - a) * s.rtf + a * rtf
+
+
+router: STTRouter | None = None
+
+
+def get_router() -> STTRouter:
+    global router
+
+    if router is None:
+        names = os.getenv("STT_BACKENDS", DEFAULT_BACKENDS).split(",")
+        max_inflight = os.getenv("STT_MAX_INFLIGHT")
+        router = STTRouter(
+            [
+                Backend(
+                    name.strip(),
+                    max_inflight=int(max_inflight) if max_inflight else None,
+                )
+                for name in names
+                if name.strip()
+            ],
+            deadline_s=float(os.getenv("STT_DEADLINE_MS", DEFAULT_DEADLINE_MS)) / 1000,
+            controller=get_latency_controller(),
+            aliases=parse_aliases(
+                os.getenv("STT_MODEL_ALIASES", DEFAULT_MODEL_ALIASES)
+            ),
+        )
+    return router
+
+
+def transcribe(
+    input_wav_path: str, model: str | None = None, language: str | None = None
+):
+    return get_router().transcribe(input_wav_path, model, language)
+
+
+def transcribe_array(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+):
+    return get_router().transcribe_array(audio, model, language)
+
+
+def transcribe_array_detailed(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+) -> Transcript:
+    return get_router().transcribe_array_detailed(audio, model, language)
+
+
+def transcribe_wav_bytes(
+    audio: bytes, model: str | None = None, language: str | None = None
+):
+    return get_router().transcribe_wav_bytes(audio, model, language)
+
+
+def stats() -> dict:
+    return get_router().stats()
@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..cancellation import Cancelled
+
+logger = logging.getLogger("rt_py.bricks.stt_streaming")
+logger.setLevel(logging.DEBUG)
+
+# ---- Types ------------------------------------------------------------------
+
+TranscribeFn = Callable[[np.ndarray], str]  # float32 mono @ 16 kHz -> text
+
+OnPartial = Callable[[str, str], None]  # (committed text, tentative text)
+OnFinal = Callable[[str], None]
+
+
+# ---- Options ----------------------------------------------------------------
+
+
+@dataclass
+class StreamingOptions:
+    sample_rate: int = 16000
+    step_ms: int = 500  # re-decode once this much new audio is buffered
+    min_audio_ms: int = 800  # don't decode before this much audio is buffered
+    max_window_s: float = 25.0  # stay below the 30 s whisper window
+
+
+@dataclass
+class StreamingCallbacks:
+    on_partial: OnPartial | None = None
+    on_final: OnFinal | None = None
+
+
+# ---- Helpers ----------------------------------------------------------------
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+
+def agreed_prefix(previous: list[str], current: list[str]) -> int:
+    """Number of leading words two consecutive hypotheses agree on."""
+    n = 0
+    for a, b in zip(previous, current):
+        if _normalize(a) != _normalize(b):
+            break
+        n += 1
+    return n
+
+
+# ---- Transcriber --------------------------------------------------------------
+
+
+class StreamingTranscriber:
+    """
+    Incremental transcription of an utterance while it is being spoken.
+
+    The growing audio buffer is re-decoded in a background thread every
+    `step_ms` of new audio. Words on which two consecutive hypotheses agree
+    are committed (LocalAgreement-2) and not revised by later partial
+    hypotheses; the rest is tentative.
+    When the buffer would exceed the whisper window the current hypothesis is
+    committed as a whole and decoding restarts on the following audio.
+
+    Feed it the frames of the active segment (FrameProcessor `on_speech_frame`)
+    and call `finish()` on speech end: when no audio arrived after the last
+    partial hypothesis it becomes the final text, otherwise the remaining
+    window is decoded once more.
+    """
+
+    def __init__(
+        self,
+        transcribe_fn: TranscribeFn,
+        options: StreamingOptions | None = None,
+        cb: StreamingCallbacks | None = None,
+    ):
+        self._transcribe_fn = transcribe_fn
+        self.opt = options or StreamingOptions()
+        self.cb = cb or StreamingCallbacks()
+
+        self._cond = threading.Condition()
+        self._frames: list[np.ndarray] = []
+        self._samples = 0
+        self._decoded_samples = 0  # buffer size at the last decode
+        self._hypothesis: list[str] = []
+        self._committed: list[str] = []
+        self._sealed: list[str] = []  # text of the windows already closed
+        self._generation = 0  # bumped on every reset, to drop stale decodes
+        self._busy = False
+        self._closed = False
+
+        self._worker = threading.Thread(
+            target=self._run, name="stt-streaming", daemon=True
+        )
+        self._worker.start()
+
+    # --- Public API -----------------------------------------------------------
+
+    def feed(self, frame: np.ndarray):
+        with self._cond:
+            self._frames.append(np.asarray(frame, dtype=np.float32).reshape(-1))
+            self._samples += self._frames[-1].size
+            self._cond.notify()
+
+    def finish(self) -> str:
+        """Transcribe what is left, emit on_final and get ready for the next utterance."""
+        with self._cond:
+            while self._busy:
+                self._cond.wait()
+            audio = self._audio()
+            pending = self._samples != self._decoded_samples
+            hypothesis = self._hypothesis
+            sealed = self._sealed
+
+            self._reset_locked()
+
+        if pending and audio.size:
+            words = self._decode(audio)
+            # a failed decode (e.g. a saturated STT stage) keeps the last partial
+            if words is not None:
+                hypothesis = words
+
+        text = " ".join(sealed + hypothesis).strip()
+        if self.cb.on_final:
+            self.cb.on_final(text)
+        return text
+
+    def reset(self):
+        with self._cond:
+            while self._busy:
+                self._cond.wait()
+            self._reset_locked()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def committed_text(self) -> str:
+        return " ".join(self._sealed + self._committed)
+
+    # --- Internals ------------------------------------------------------------
+
+    def _reset_locked(self):
+        self._generation += 1
+        self._frames = []
+        self._samples = 0
+        self._decoded_samples = 0
+        self._hypothesis = []
+        self._committed = []
+        self._sealed = []
+
+    def _audio(self) -> np.ndarray:
+        if not self._frames:
+            return np.zeros((0,), dtype=np.float32)
+        return np.concatenate(self._frames, dtype=np.float32)
+
+    def _ready(self) -> bool:
+        sr = self.opt.sample_rate
+        return (
+            self._samples >= self.opt.min_audio_ms * sr // 1000
+            and self._samples - self._decoded_samples >= self.opt.step_ms * sr // 1000
+        )
+
+    def _decode(self, audio: np.ndarray) -> list[str] | None:
+        """The words of the audio, None when the transcription failed."""
+        try:
+            text = self._transcribe_fn(audio) or ""
+        except Cancelled:
+            raise  # the turn is over, not a decode to retry
+        except Exception:
+            logger.exception("Partial transcription failed")
+            return None
+        return text.split()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._ready():
+                    self._cond.wait()
+                if self._closed:
+                    return
+                self._busy = True
+                audio = self._audio()
+                decoded_samples = self._samples
+                generation = self._generation
+                previous = self._hypothesis
+
+            try:
+                words = self._decode(audio)
+            except Cancelled as e:
+                logger.info(f"Partial transcription stopped: {e}")
+                with self._cond:
+                    self._busy = False
+                    self._closed = True
+                    self._cond.notify_all()
+                return
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+                if generation != self._generation:
+                    # finish() or reset() ran meanwhile: this hypothesis is stale
+                    continue
+                if words is None:
+                    # try again after the next step of audio
+                    self._decoded_samples = decoded_samples
+                    continue
+
+                # committed words are final: only a hypothesis that still
+                # starts with them may extend them
+                kept = len(self._committed)
+                n = agreed_prefix(previous, words)
+                if n > kept and agreed_prefix(self._committed, words) == kept:
+                    self._committed = self._committed + words[kept:n]
+                self._hypothesis = words
+                self._decoded_samples = decoded_samples
+
+                sealed_window = (
+                    decoded_samples >= self.opt.max_window_s * self.opt.sample_rate
+                )
+                if sealed_window:
+                    # commit everything and restart on the audio that follows
+                    tail = words[len(self._committed) :]
+                    self._sealed = self._sealed + self._committed + tail
+                    rest = self._audio()[decoded_samples:]
+                    self._frames = [rest] if rest.size else []
+                    self._samples = rest.size
+                    self._decoded_samples = 0
+                    self._hypothesis = []
+                    self._committed = []
+
+                committed = " ".join(self._sealed + self._committed)
+                tentative = (
+                    " ".join(words[len(self._committed) :]) if not sealed_window else ""
+                )
+
+            if self.cb.on_partial:
+                self.cb.on_partial(committed, tentative)
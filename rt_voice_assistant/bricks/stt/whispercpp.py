@@ -1,9 +1,32 @@
+import io
 import json
 import logging
+import math
 import os
-import shutil
+import re
 import subprocess
+import tempfile
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import soundfile as sf
+
+from ..audio import SR, to_wav_bytes
+from ..cancellation import Cancelled, current_token, future_result, run_process
+from ..slo import get_latency_controller
+from .batching import BatchOptions, BatchScheduler
+from .cache import cache_key, get_transcription_cache, pcm_fingerprint, wav_fingerprint
+from .catalog import get_catalog
+from .gate import Transcript, from_verbose_json, from_whisper_cpp_json
+from .whispercpp_server import (
+    DockerWhisperServerWorker,
+    WhisperServerPool,
+    get_worker_pool,
+    shutdown_worker_pool,
+    worker_pool_stats,
+)
 
 logger = logging.getLogger("rt_py.bricks.stt_whisper_cpp")
 logger.setLevel(logging.DEBUG)
@@ -13,6 +36,11 @@ logger.addHandler(handler)
 
 DEFAULT_DOCKER_IMAGE = "ghcr.io/ggml-org/whisper.cpp:main"
 DEFAULT_MODEL = "small"  # Default model to use when whisper-1 is specified
+AUDIO_CTX_FULL = 1500  # encoder positions of the 30 s whisper window
+AUDIO_CTX_PER_SECOND = AUDIO_CTX_FULL // 30
+MIN_AUDIO_CTX = 128
+MAX_DETECT_SECONDS = 10  # language identification only needs the first words
+DETECTED_LANGUAGE_RE = re.compile(r"auto-detected language: (\w+) \(p = ([0-9.]+)\)")
 
 
 def safe_decode(data: bytes) -> str:
@@ -54,12 +82,19 @@ def read_transcription(json_file_path: str) -> str:
     return transcription
 
 
-def execute_whisper(cmd: list[str]):
+def execute_whisper(cmd: list[str], input: bytes | None = None, token=None):
+    """Run whisper-cli (or ffmpeg); killed when the cancellation token is set."""
+    token = token or current_token()
     try:
         logger.info(f"Executing whisper: {cmd}")
-        process_handle = subprocess.run(
-            cmd, check=True, capture_output=True, text=False
-        )
+        if token is None:
+            process_handle = subprocess.run(
+                cmd, check=True, capture_output=True, text=False, input=input
+            )
+        else:
+            process_handle = run_process(cmd, input=input, token=token)
+    except Cancelled:
+        raise
     except subprocess.CalledProcessError as e:
         error_message = "Whisper CLI failed"
         if e.cmd:
@@ -82,7 +117,49 @@ def execute_whisper(cmd: list[str]):
     return process_handle
 
 
-def whisper_cpp_args(model_path, input_wav_path, output_prefix, language=None):
+def wav_duration(audio) -> float:
+    """Duration in seconds of a WAV path or in-memory file, None if unreadable."""
+    try:
+        info = sf.info(io.BytesIO(audio) if isinstance(audio, bytes) else audio)
+    except RuntimeError:
+        return None
+    return info.duration
+
+
+def audio_ctx_for(duration: float):
+    """
+    Size the encoder context (--audio-ctx) from the utterance length.
+    whisper pads every input to 30 s; a 2 s turn only needs ~1/10th of the
+    encoder positions. Returns None to keep the full window.
+    WHISPER_AUDIO_CTX: "auto" (default), "0" (full window) or a fixed value.
+    """
+    setting = os.getenv("WHISPER_AUDIO_CTX", "auto")
+    if setting != "auto":
+        ctx = int(setting)
+        return ctx if 0 < ctx < AUDIO_CTX_FULL else None
+    if not duration:
+        return None
+
+    margin = float(os.getenv("WHISPER_AUDIO_CTX_MARGIN", "0.25"))
+    ctx = math.ceil(duration * (1 + margin) * AUDIO_CTX_PER_SECOND) + 64
+    ctx = max(MIN_AUDIO_CTX, 64 * math.ceil(ctx / 64))
+    return ctx if ctx < AUDIO_CTX_FULL else None
+
+
+def decoding_args() -> list[str]:
+    """Beam size and threads of the current latency controller level (see slo)."""
+    level = get_latency_controller().level()
+    args = []
+    if level.beam_size:
+        args.extend(["-bs", str(level.beam_size)])
+    if level.threads:
+        args.extend(["-t", str(level.threads)])
+    return args
+
+
+def whisper_cpp_args(
+    model_path, input_wav_path, output_prefix, language=None, audio_ctx=None
+):
     cmd = [
         "-m",
         model_path,
@@ -96,105 +173,133 @@ def whisper_cpp_args(model_path, input_wav_path, output_prefix, language=None):
     if language:
         cmd.extend(["-l", language])
 
-    return cmd
+    if audio_ctx:
+        cmd.extend(["-ac", str(audio_ctx)])
 
+    return cmd
 
-def detect_paths(model: str = None, language: str = None):
-    language = language or "en"
 
-    home = os.path.expanduser("~")
-    whisper_cpp_dir = os.getenv(
-        "WHISPER_CPP_DIR", f"{home}/whisper.cpp"
-    )  # as suggested for macOS in our README
+def whisper_cpp_stdio_args(model_path, language=None, audio_ctx=None):
+    """Read the WAV from stdin, print the bare text on stdout."""
+    cmd = [
+        "-m",
+        model_path,
+        "-f",
+        "-",
+        "-nt",
+        "-np",
+    ]
 
-    whisper_binary = f"{whisper_cpp_dir}/build/bin/whisper-cli"
-    if not os.path.exists(whisper_binary):
-        logger.warning(
-            f"Whisper binary does not exist: {whisper_binary} -- will be using docker!"
-        )
-        whisper_binary = None
+    if language:
+        cmd.extend(["-l", language])
 
-    available_models_directories = [
-        os.getenv("WHISPER_MODELS_DIR", "./models"),
-        f"{whisper_cpp_dir}/models",
-    ]
-    available_models = [model] if model else ["small", "tiny", "medium", "base"]
-
-    valid_models_dir, model_path = None, None
-    for models_dir in available_models_directories:
-        if os.path.exists(models_dir) and os.path.isdir(models_dir):
-            for model in available_models:
-                model_paths = [
-                    f"{models_dir}/ggml-{model}.{language}.bin",
-                    f"{models_dir}/ggml-{model}.bin",
-                ]
-                for model_path in model_paths:
-                    if os.path.exists(model_path):
-                        valid_models_dir = models_dir
-                        break
-
-    if not valid_models_dir:
-        raise ValueError(
-            f"No valid models directory found in {available_models_directories}"
-        )
+    if audio_ctx:
+        cmd.extend(["-ac", str(audio_ctx)])
 
-    return whisper_binary, model_path
+    return cmd
 
 
-def transcribe(
-    input_wav_path: str,
-    model: str = None,
-    language: str = None,
+def detect_paths(model: str | None = None, language: str | None = None):
+    """Resolve (whisper_binary, model_path) from the memoized model catalog."""
+    return get_catalog().lookup(model, language)
+
+
+def detect_server_binary(whisper_binary: str | None = None):
+    """Return the `whisper-server` built next to `whisper-cli`, if any."""
+    if not whisper_binary or os.getenv("WHISPER_POOL_SIZE", "1") == "0":
+        return None
+    server_binary = f"{os.path.dirname(whisper_binary)}/whisper-server"
+    if not os.path.exists(server_binary):
+        return None
+    return server_binary
+
+
+def detect_worker_pool(whisper_binary: str | None = None) -> WhisperServerPool:
+    """
+    The warm workers, if any:
+      - the `whisper-server` built next to `whisper-cli`
+      - without a local build, a whisper-server container started once
+        (WHISPER_CPP_DOCKER_SIDECAR=true)
+    """
+    server_binary = detect_server_binary(whisper_binary)
+    if server_binary:
+        return get_worker_pool(server_binary)
+
+    sidecar = os.getenv("WHISPER_CPP_DOCKER_SIDECAR", "false") == "true"
+    if whisper_binary or not sidecar or os.getenv("WHISPER_POOL_SIZE", "1") == "0":
+        return None
+    elevated = os.getenv("WHISPER_CPP_USE_ELEVATED_DOCKER", "false") == "true"
+    return get_worker_pool(
+        os.getenv("WHISPER_CPP_DOCKER_IMAGE", DEFAULT_DOCKER_IMAGE),
+        worker_factory=partial(DockerWhisperServerWorker, elevated=elevated),
+    )
+
+
+def transcribe_with_server(
+    pool: WhisperServerPool,
+    model_path: str,
+    audio: bytes,
+    language: str | None = None,
+    audio_ctx: int | None = None,
 ):
-    if not os.path.isdir("outputs"):
-        os.mkdir("outputs")
+    result = pool.transcribe(
+        audio,
+        model_path,
+        language,
+        audio_ctx=audio_ctx,
+        # the server threads are fixed when it starts
+        beam_size=get_latency_controller().level().beam_size,
+    )
+    transcription = result.get("text")
+    logger.info(f"Transcription: {transcription}")
+    return transcription.strip() if transcription is not None else None
+
+
+def on_startup(model: str | None = None, language: str | None = None):
+    """Start the warm whisper-server workers for the default model."""
+    actual_model = model or DEFAULT_MODEL
+    whisper_binary, model_path = detect_paths(actual_model, language)
+    pool = detect_worker_pool(whisper_binary)
+    if pool:
+        pool.warm_up(model_path, language)
 
-    if not os.path.isdir("audios"):
-        os.mkdir("audios")
 
-    output_prefix = f"outputs/out-{uuid.uuid4()}"
+def on_shutdown():
+    shutdown_worker_pool()
+
 
+def transcribe(
+    input_wav_path: str,
+    model: str | None = None,
+    language: str | None = None,
+):
     actual_model = DEFAULT_MODEL if model == "whisper-1" or not model else model
     whisper_binary, model_path = detect_paths(actual_model, language)
+    audio_ctx = audio_ctx_for(wav_duration(input_wav_path))
+
+    pool = detect_worker_pool(whisper_binary)
+    if pool:
+        try:
+            with open(input_wav_path, "rb") as f:
+                audio = f.read()
+            return transcribe_with_server(pool, model_path, audio, language, audio_ctx)
+        except Exception:
+            logger.exception("Warm whisper server failed, falling back to whisper-cli")
+
+    if not whisper_binary:
+        # no TTY, no copy of the audio: the container reads the WAV on stdin
+        with open(input_wav_path, "rb") as f:
+            audio = f.read()
+        return transcribe_with_cli(None, model_path, audio, language, audio_ctx)
 
-    cmd = []
-    if whisper_binary:
-        cmd.append(whisper_binary)
-        args = whisper_cpp_args(model_path, input_wav_path, output_prefix, language)
-        cmd.extend(args)
-    else:
-        docker_image = os.getenv("WHISPER_CPP_DOCKER_IMAGE", DEFAULT_DOCKER_IMAGE)
-        # copy the audio file to audios folder -- if they are not already there
-        audio_filename = os.path.basename(input_wav_path)
-        audio_dest_path = os.path.join("audios", audio_filename)
-
-        model_path = f"/models/ggml-{model}.{language}.bin"
-        args = whisper_cpp_args(
-            model_path, f"/{audio_dest_path}", f"/{output_prefix}", language
-        )
-        if audio_dest_path != input_wav_path:
-            shutil.copy2(input_wav_path, audio_dest_path)
-            logger.info(f"Copied audio file to {audio_dest_path}")
+    if not os.path.isdir("outputs"):
+        os.mkdir("outputs")
 
-        use_elevated_docker = os.getenv("WHISPER_CPP_USE_ELEVATED_DOCKER", "false")
-        if use_elevated_docker == "true":
-            cmd += ["sudo"]
+    output_prefix = f"outputs/out-{uuid.uuid4()}"
 
-        cmd += [
-            "docker",
-            "run",
-            "-it",
-            "--rm",
-            "-v",
-            f"{os.getcwd()}/models:/models",
-            "-v",
-            f"{os.getcwd()}/audios:/audios",
-            "-v",
-            f"{os.getcwd()}/outputs:/outputs",
-            docker_image,
-            f'"whisper-cli {" ".join(args)}"',
-        ]
-        logger.error(f"Docker command: {' '.join(cmd)}")
+    cmd = [whisper_binary] + whisper_cpp_args(
+        model_path, input_wav_path, output_prefix, language, audio_ctx
+    )
 
     try:
         process_handle = execute_whisper(cmd)
@@ -223,3 +328,355 @@ def transcribe(
             os.remove(f"{output_prefix}.txt")
         if os.path.exists(f"{output_prefix}.json"):
             os.remove(f"{output_prefix}.json")
+
+
+def whisper_cpp_batch_args(
+    model_path, input_wav_paths, output_prefixes, language=None, audio_ctx=None
+):
+    """Several inputs for a single whisper-cli run: the model is loaded once."""
+    cmd = ["-m", model_path]
+    for input_wav_path in input_wav_paths:
+        cmd.extend(["-f", input_wav_path])
+    cmd.append("-ojf")
+    for output_prefix in output_prefixes:
+        cmd.extend(["-of", output_prefix])
+
+    if language:
+        cmd.extend(["-l", language])
+
+    if audio_ctx:
+        cmd.extend(["-ac", str(audio_ctx)])
+
+    return cmd
+
+
+def whisper_cpp_detect_args(model_path):
+    """Language identification only: whisper-cli exits after the detection."""
+    # no -np: the detected language is reported in the logs
+    return ["-m", model_path, "-f", "-", "-l", "auto", "-dl"]
+
+
+def stdio_command(whisper_binary: str, model_path: str, args_fn) -> list[str]:
+    """A whisper-cli command reading its WAV input on stdin, native or dockerized."""
+    cmd = []
+    if whisper_binary:
+        cmd.append(whisper_binary)
+        cmd.extend(args_fn(model_path))
+    else:
+        docker_image = os.getenv("WHISPER_CPP_DOCKER_IMAGE", DEFAULT_DOCKER_IMAGE)
+        args = args_fn(f"/models/{os.path.basename(model_path)}")
+
+        use_elevated_docker = os.getenv("WHISPER_CPP_USE_ELEVATED_DOCKER", "false")
+        if use_elevated_docker == "true":
+            cmd += ["sudo"]
+
+        cmd += [
+            "docker",
+            "run",
+            "-i",
+            "--rm",
+            "-v",
+            f"{os.getcwd()}/models:/models",
+            docker_image,
+            f"whisper-cli {' '.join(args)}",
+        ]
+    return cmd
+
+
+def transcribe_with_cli(
+    whisper_binary: str, model_path: str, audio: bytes, language, audio_ctx=None
+):
+    cmd = stdio_command(
+        whisper_binary,
+        model_path,
+        lambda path: (
+            whisper_cpp_stdio_args(path, language, audio_ctx) + decoding_args()
+        ),
+    )
+
+    try:
+        process_handle = execute_whisper(cmd, input=audio)
+        process_handle.check_returncode()
+    except Cancelled:
+        raise
+    except Exception:
+        logger.exception("Error executing whisper")
+        return None
+
+    logger.info(f"Whisper stderr: {safe_get_text(process_handle.stderr)}")
+    lines = safe_get_text(process_handle.stdout).splitlines()
+    transcription = " ".join(line.strip() for line in lines if line.strip())
+    logger.info(f"Transcription: {transcription}")
+    return transcription
+
+
+def transcribe_batch_with_cli(
+    whisper_binary: str,
+    model_path: str,
+    audios: list[bytes],
+    language,
+    audio_ctx=None,
+) -> list:
+    with tempfile.TemporaryDirectory(prefix="whisper-batch-") as tmp:
+        input_wav_paths = [f"{tmp}/in-{i}.wav" for i in range(len(audios))]
+        output_prefixes = [f"{tmp}/out-{i}" for i in range(len(audios))]
+        for input_wav_path, audio in zip(input_wav_paths, audios):
+            with open(input_wav_path, "wb") as f:
+                f.write(audio)
+
+        cmd = [whisper_binary] + whisper_cpp_batch_args(
+            model_path, input_wav_paths, output_prefixes, language, audio_ctx
+        )
+        cmd += decoding_args()
+        process_handle = execute_whisper(cmd)
+        logger.info(f"Whisper stderr: {safe_get_text(process_handle.stderr)}")
+
+        results = []
+        for output_prefix in output_prefixes:
+            try:
+                transcription = read_transcription(f"{output_prefix}.json")
+                results.append(
+                    transcription.strip() if transcription else transcription
+                )
+            except (OSError, ValueError) as e:
+                results.append(e)
+        return results
+
+
+def transcribe_wav_bytes_batch(
+    audios: list[bytes],
+    model: str | None = None,
+    language: str | None = None,
+) -> list:
+    """
+    Transcribe several in-memory WAV files with the same model and language.
+    Returns one transcription per input (or the exception that input raised).
+      - warm workers: the inputs are decoded in parallel by the pool
+      - whisper-cli: a single run loads the model once for all the inputs
+      - docker: one container per input, unless the sidecar is enabled
+    The encoder context is sized per input for the workers, and from the
+    longest input when several share a whisper-cli run.
+    """
+    actual_model = DEFAULT_MODEL if model == "whisper-1" or not model else model
+    whisper_binary, model_path = detect_paths(actual_model, language)
+    durations = [wav_duration(audio) for audio in audios]
+    audio_ctxs = [audio_ctx_for(duration) for duration in durations]
+
+    pool = detect_worker_pool(whisper_binary)
+    if pool:
+        try:
+            if len(audios) == 1:
+                return [
+                    transcribe_with_server(
+                        pool, model_path, audios[0], language, audio_ctxs[0]
+                    )
+                ]
+            with ThreadPoolExecutor(max_workers=min(len(audios), pool.size)) as ex:
+                futures = [
+                    ex.submit(
+                        transcribe_with_server,
+                        pool,
+                        model_path,
+                        audio,
+                        language,
+                        audio_ctx,
+                    )
+                    for audio, audio_ctx in zip(audios, audio_ctxs)
+                ]
+            return [f.exception() or f.result() for f in futures]
+        except Exception:
+            logger.exception("Warm whisper server failed, falling back to whisper-cli")
+
+    if whisper_binary and len(audios) > 1:
+        known = None not in durations
+        try:
+            return transcribe_batch_with_cli(
+                whisper_binary,
+                model_path,
+                audios,
+                language,
+                audio_ctx_for(max(durations)) if known else None,
+            )
+        except Exception:
+            logger.exception("Batched whisper-cli run failed, transcribing one by one")
+
+    return [
+        transcribe_with_cli(whisper_binary, model_path, audio, language, audio_ctx)
+        for audio, audio_ctx in zip(audios, audio_ctxs)
+    ]
+
+
+batch_scheduler: BatchScheduler | None = None
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    global batch_scheduler
+
+    if batch_scheduler is None:
+        batch_scheduler = BatchScheduler(
+            lambda key, audios: transcribe_wav_bytes_batch(audios, *key),
+            BatchOptions(
+                window_ms=float(os.getenv("WHISPER_BATCH_WINDOW_MS", "5")),
+                max_batch_size=int(os.getenv("WHISPER_BATCH_MAX_SIZE", "8")),
+            ),
+        )
+    return batch_scheduler
+
+
+def transcribe_wav_bytes(
+    audio: bytes,
+    model: str | None = None,
+    language: str | None = None,
+    fingerprint: str | None = None,
+):
+    """
+    Transcribe an in-memory WAV file without touching the disk.
+    The audio goes to a warm worker, or is piped to whisper-cli through stdin
+    and the text is read back from stdout.
+    Identical audio is answered from the transcription cache; concurrent
+    calls for the same model and language are micro-batched.
+    """
+    cache = get_transcription_cache()
+    key = None
+    if cache is not None:
+        actual_model = DEFAULT_MODEL if model == "whisper-1" or not model else model
+        key = cache_key(
+            fingerprint or wav_fingerprint(audio),
+            actual_model,
+            language,
+            audio_ctx=os.getenv("WHISPER_AUDIO_CTX", "auto"),
+            beam_size=get_latency_controller().level().beam_size,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            logger.info(f"Transcription (cached): {cached}")
+            return cached
+
+    if float(os.getenv("WHISPER_BATCH_WINDOW_MS", "5")) <= 0:
+        result = transcribe_wav_bytes_batch([audio], model, language)[0]
+    else:
+        future = get_batch_scheduler().submit((model, language), audio)
+        # a cancelled caller stops waiting; the batch it joined still runs
+        result = future_result(future)
+    if isinstance(result, Exception):
+        raise result
+
+    if key is not None:
+        cache.put(key, result)
+    return result
+
+
+def transcribe_wav_bytes_detailed(
+    audio: bytes, model: str | None = None, language: str | None = None
+) -> Transcript:
+    """
+    Like `transcribe_wav_bytes`, with the segments and token probabilities
+    whisper reports (see gate). Not cached, not batched.
+    """
+    actual_model = DEFAULT_MODEL if model == "whisper-1" or not model else model
+    whisper_binary, model_path = detect_paths(actual_model, language)
+    audio_ctx = audio_ctx_for(wav_duration(audio))
+
+    pool = detect_worker_pool(whisper_binary)
+    if pool:
+        try:
+            result = pool.transcribe(
+                audio,
+                model_path,
+                language,
+                audio_ctx=audio_ctx,
+                beam_size=get_latency_controller().level().beam_size,
+                response_format="verbose_json",
+            )
+            return from_verbose_json(result, language)
+        except Exception:
+            logger.exception("Warm whisper server failed, falling back to whisper-cli")
+            token = current_token()
+            if token is not None:
+                token.raise_if_cancelled()
+
+    if whisper_binary:
+        # the audio still goes through stdin, only the JSON report is a file
+        with tempfile.TemporaryDirectory(prefix="whisper-") as tmp_dir:
+            output_prefix = os.path.join(tmp_dir, "out")
+            cmd = [whisper_binary] + whisper_cpp_args(
+                model_path, "-", output_prefix, language, audio_ctx
+            )
+            cmd += decoding_args()
+            try:
+                execute_whisper(cmd, input=audio)
+                data = safe_json_read(f"{output_prefix}.json")
+            except Cancelled:
+                raise
+            except Exception:
+                logger.exception("Error executing whisper")
+                return None
+        return from_whisper_cpp_json(data, language)
+
+    text = transcribe_with_cli(whisper_binary, model_path, audio, language, audio_ctx)
+    return Transcript(text, language=language) if text is not None else None
+
+
+def transcribe_array_detailed(
+    audio: np.ndarray,
+    model: str | None = None,
+    language: str | None = None,
+    sr: int = SR,
+) -> Transcript:
+    return transcribe_wav_bytes_detailed(to_wav_bytes(audio, sr), model, language)
+
+
+def stats() -> dict:
+    cache = get_transcription_cache()
+    return {
+        "cache": cache.stats() if cache is not None else None,
+        "batching": batch_scheduler.stats() if batch_scheduler else None,
+        "workers": worker_pool_stats(),
+    }
+
+
+def transcribe_array(
+    audio: np.ndarray,
+    model: str | None = None,
+    language: str | None = None,
+    sr: int = SR,
+):
+    """Transcribe a float32 mono signal, e.g. a FrameProcessor utterance."""
+    return transcribe_wav_bytes(
+        to_wav_bytes(audio, sr),
+        model=model,
+        language=language,
+        fingerprint=pcm_fingerprint(audio) if sr == SR else None,
+    )
+
+
+def parse_detected_language(log: str) -> tuple[str, float]:
+    match = DETECTED_LANGUAGE_RE.search(log)
+    if not match:
+        return None, 0.0
+    return match.group(1), float(match.group(2))
+
+
+def detect_language(
+    audio: np.ndarray, model: str | None = None, sr: int = SR
+) -> tuple[str, float]:
+    """
+    Identify the language spoken in the first seconds of a signal with a
+    multilingual model. Returns (language, probability), (None, 0.0) on failure.
+    """
+    actual_model = DEFAULT_MODEL if model == "whisper-1" or not model else model
+    prefix = audio[: int(MAX_DETECT_SECONDS * sr)]
+    try:
+        # "auto" is never a language variant: the multilingual model is picked,
+        # and there may be none
+        whisper_binary, model_path = detect_paths(actual_model, "auto")
+        cmd = stdio_command(whisper_binary, model_path, whisper_cpp_detect_args)
+        process_handle = execute_whisper(cmd, input=to_wav_bytes(prefix, sr))
+    except Exception:
+        logger.exception("Language detection failed")
+        return None, 0.0
+
+    log = safe_get_text(process_handle.stderr) + safe_get_text(process_handle.stdout)
+    language, probability = parse_detected_language(log)
+    logger.info(f"Detected language: {language} (p = {probability:.2f})")
+    return language, probability
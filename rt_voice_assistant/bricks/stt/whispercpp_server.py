@@ -0,0 +1,488 @@
+import atexit
+import logging
+import os
+import socket
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+
+logger = logging.getLogger("rt_py.bricks.stt_whisper_cpp_server")
+logger.setLevel(logging.DEBUG)
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_WORKERS = 4  # whisper-server processes, all models and languages
+DEFAULT_HEALTH_INTERVAL = 5.0  # seconds between two health checks
+DEFAULT_STARTUP_TIMEOUT = 60.0  # loading a large model can take a while
+DEFAULT_REQUEST_TIMEOUT = 120.0
+CONTAINER_PORT = 8080  # whisper-server port inside the sidecar container
+CONTAINER_LABEL = "rt-voice-assistant=whisper-server"
+
+
+def find_free_port(host: str = "127.0.0.1") -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+class WhisperServerWorker:
+    """
+    A long-lived `whisper-server` process with its model loaded once.
+
+    The worker talks the whisper.cpp server HTTP protocol:
+      - GET /health -> 200 once the model is loaded
+      - POST /inference (multipart, field `file`) -> JSON transcription
+    """
+
+    def __init__(
+        self,
+        binary: str,
+        model_path: str,
+        language: str | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+        extra_args: list[str] | None = None,
+    ):
+        self.binary = binary
+        self.model_path = model_path
+        self.language = language
+        self.host = host
+        self.port = port
+        self.extra_args = extra_args or []
+        self.restarts = 0
+        self._process: subprocess.Popen | None = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def command(self) -> list[str]:
+        cmd = [
+            self.binary,
+            "-m",
+            self.model_path,
+            "--host",
+            self.host,
+            "--port",
+            str(self.port),
+        ]
+        if self.language:
+            cmd.extend(["-l", self.language])
+        cmd.extend(self.extra_args)
+        return cmd
+
+    def start(self, timeout: float = DEFAULT_STARTUP_TIMEOUT):
+        if self.port is None:
+            self.port = find_free_port(self.host)
+        cmd = self.command()
+        logger.info(f"Starting whisper server: {cmd}")
+        self._process = subprocess.Popen(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        self.wait_ready(timeout)
+
+    def stop(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process = None
+
+    def restart(self):
+        logger.warning(f"Restarting whisper server {self.url} ({self.model_path})")
+        self.stop()
+        self.restarts += 1
+        # the previous port may still be in TIME_WAIT: pick a fresh one
+        self.port = None
+        self.start()
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def healthy(self, timeout: float = 2.0) -> bool:
+        if not self.is_alive():
+            return False
+        try:
+            response = requests.get(f"{self.url}/health", timeout=timeout)
+        except requests.RequestException:
+            return False
+        # older whisper-server builds have no /health route: being reachable is enough
+        return response.status_code in (200, 404)
+
+    def wait_ready(self, timeout: float = DEFAULT_STARTUP_TIMEOUT):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self.is_alive():
+                raise RuntimeError(
+                    f"whisper server exited during startup: {self.command()}"
+                )
+            if self.healthy():
+                return
+            time.sleep(0.1)
+        self.stop()
+        raise TimeoutError(f"whisper server not ready after {timeout}s: {self.url}")
+
+    def inference(
+        self,
+        audio: bytes,
+        language: str | None = None,
+        filename: str = "audio.wav",
+        timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        **params,
+    ) -> dict:
+        data = {"response_format": "json", "temperature": "0.0"}
+        if language or self.language:
+            data["language"] = language or self.language
+        data.update({k: str(v) for k, v in params.items() if v is not None})
+        response = requests.post(
+            f"{self.url}/inference",
+            files={"file": (filename, audio, "audio/wav")},
+            data=data,
+            timeout=timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class DockerWhisperServerWorker(WhisperServerWorker):
+    """
+    A `whisper-server` running in a long-lived container (the sidecar).
+
+    The container is started once with the models directory mounted, and
+    then every request goes to its published port over HTTP: no container
+    start, model load or audio file copy per utterance.
+    `binary` is the whisper.cpp docker image.
+    """
+
+    ALIVE_CHECK_INTERVAL = 1.0  # seconds a `docker inspect` result is trusted
+
+    def __init__(
+        self,
+        binary: str,
+        model_path: str,
+        language: str | None = None,
+        host: str = "127.0.0.1",
+        port: int | None = None,
+        extra_args: list[str] | None = None,
+        elevated: bool = False,
+    ):
+        super().__init__(binary, model_path, language, host, port, extra_args)
+        self.elevated = elevated
+        self.container_id: str | None = None
+        self._alive = False
+        self._alive_checked_at = 0.0
+
+    def docker(self) -> list[str]:
+        return ["sudo", "docker"] if self.elevated else ["docker"]
+
+    def command(self) -> list[str]:
+        args = [
+            "whisper-server",
+            "-m",
+            f"/models/{os.path.basename(self.model_path)}",
+            "--host",
+            "0.0.0.0",
+            "--port",
+            str(CONTAINER_PORT),
+        ]
+        if self.language:
+            args.extend(["-l", self.language])
+        args.extend(self.extra_args)
+
+        models_dir = os.path.abspath(os.path.dirname(self.model_path))
+        return self.docker() + [
+            "run",
+            "-d",
+            "--rm",
+            "--label",
+            CONTAINER_LABEL,
+            "-p",
+            f"{self.host}:{self.port}:{CONTAINER_PORT}",
+            "-v",
+            f"{models_dir}:/models",
+            self.binary,
+            # the image entrypoint is `bash -c`
+            " ".join(args),
+        ]
+
+    def start(self, timeout: float = DEFAULT_STARTUP_TIMEOUT):
+        if self.port is None:
+            self.port = find_free_port(self.host)
+        cmd = self.command()
+        logger.info(f"Starting whisper server container: {cmd}")
+        process_handle = subprocess.run(cmd, check=True, capture_output=True, text=True)
+        self.container_id = process_handle.stdout.strip()
+        self._alive, self._alive_checked_at = True, time.monotonic()
+        self.wait_ready(timeout)
+
+    def stop(self):
+        if self.container_id is None:
+            return
+        subprocess.run(
+            self.docker() + ["rm", "-f", self.container_id],
+            capture_output=True,
+            check=False,  # already gone is fine
+        )
+        self.container_id = None
+        self._alive = False
+
+    def is_alive(self) -> bool:
+        if self.container_id is None:
+            return False
+        now = time.monotonic()
+        if now - self._alive_checked_at >= self.ALIVE_CHECK_INTERVAL:
+            process_handle = subprocess.run(
+                self.docker()
+                + ["inspect", "-f", "{{.State.Running}}", self.container_id],
+                capture_output=True,
+                text=True,
+                check=False,  # a missing container reads as not running
+            )
+            self._alive = process_handle.stdout.strip() == "true"
+            self._alive_checked_at = now
+        return self._alive
+
+
+class WhisperServerPool:
+    """
+    Warm `whisper-server` workers, keyed by (model_path, language).
+
+    Up to `size` workers are started lazily for every key, and at most
+    `max_workers` in all: a new key takes over the slot of an idle worker
+    of another key when the pool is full. Requests borrow an idle worker; a
+    background thread borrows the idle ones too, and restarts those that
+    crashed or stopped answering their health checks. A worker is only ever
+    restarted by whoever borrowed it, so never under a running request.
+    """
+
+    def __init__(
+        self,
+        binary: str,
+        size: int = DEFAULT_POOL_SIZE,
+        health_interval: float = DEFAULT_HEALTH_INTERVAL,
+        worker_factory=WhisperServerWorker,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        self.binary = binary
+        self.size = max(1, size)
+        self.max_workers = max(1, max_workers)
+        self.health_interval = health_interval
+        self.worker_factory = worker_factory
+
+        self._lock = threading.Condition()
+        # None marks a slot reserved for a worker being started
+        self._workers: dict[tuple[str, str], list[WhisperServerWorker]] = {}
+        self._idle: dict[tuple[str, str], list[WhisperServerWorker]] = {}
+        self._stopped = threading.Event()
+        self._health_thread = None
+        self.evictions = 0
+
+    # --- Public API -----------------------------------------------------------
+
+    def warm_up(self, model_path: str, language: str | None = None):
+        """Start every worker for a key ahead of the first request."""
+        key = (model_path, language)
+        while True:
+            with self._lock:
+                if len(self._workers.get(key, [])) >= self.size:
+                    return
+                reserved, victim = self._reserve(key)
+            if not reserved:
+                return  # the other keys' workers are all busy
+            self._stop(victim)
+            self._release(key, self._start_reserved(key))
+
+    @contextmanager
+    def worker(self, model_path: str, language: str | None = None):
+        key = (model_path, language)
+        worker = self._borrow(key)
+        try:
+            if not worker.is_alive():
+                worker.restart()
+            yield worker
+        finally:
+            self._release(key, worker)
+
+    def transcribe(
+        self,
+        audio: bytes,
+        model_path: str,
+        language: str | None = None,
+        **params,
+    ) -> dict:
+        with self.worker(model_path, language) as worker:
+            try:
+                return worker.inference(audio, language=language, **params)
+            except requests.ConnectionError:
+                # the process died between the health check and the request
+                worker.restart()
+                return worker.inference(audio, language=language, **params)
+
+    def check_health(self):
+        with self._lock:
+            workers = [
+                (key, w)
+                for key, ws in self._workers.items()
+                for w in ws
+                if w is not None
+            ]
+        for key, worker in workers:
+            if self._stopped.is_set():
+                return
+            with self._lock:
+                idle = self._idle.get(key, [])
+                if worker not in idle:
+                    continue  # busy, or evicted meanwhile
+                idle.remove(worker)
+            try:
+                if not worker.healthy():
+                    worker.restart()
+            except Exception:
+                logger.exception(f"Failed to restart whisper server {worker.url}")
+            finally:
+                self._release(key, worker)
+
+    def shutdown(self):
+        self._stopped.set()
+        with self._lock:
+            workers = [w for ws in self._workers.values() for w in ws if w is not None]
+            self._workers.clear()
+            self._idle.clear()
+            self._lock.notify_all()
+        for worker in workers:
+            worker.stop()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                f"{os.path.basename(model_path)}:{language}": {
+                    "workers": len(workers),
+                    "idle": len(self._idle.get((model_path, language), [])),
+                    "restarts": sum(w.restarts for w in workers if w is not None),
+                }
+                for (model_path, language), workers in self._workers.items()
+            }
+
+    # --- Internals ------------------------------------------------------------
+
+    def _borrow(self, key) -> WhisperServerWorker:
+        with self._lock:
+            while True:
+                idle = self._idle.setdefault(key, [])
+                if idle:
+                    return idle.pop()
+                reserved, victim = self._reserve(key)
+                if reserved:
+                    break
+                self._lock.wait()
+        self._stop(victim)
+        return self._start_reserved(key)
+
+    def _release(self, key, worker: WhisperServerWorker):
+        with self._lock:
+            if worker in self._workers.get(key, []):
+                self._idle.setdefault(key, []).append(worker)
+            self._lock.notify_all()
+
+    def _reserve(self, key) -> tuple[bool, WhisperServerWorker]:
+        """
+        Reserve the slot of a new worker for `key` (the lock is held). When
+        the pool is full, an idle worker of another key gives its slot up:
+        it is returned, to be stopped once the lock is released.
+        """
+        workers = self._workers.setdefault(key, [])
+        if len(workers) >= self.size:
+            return False, None
+        victim = None
+        if sum(len(ws) for ws in self._workers.values()) >= self.max_workers:
+            victim = self._evict(key)
+            if victim is None:
+                return False, None
+        # reserve the slot before the (slow) model load
+        workers.append(None)
+        return True, victim
+
+    def _evict(self, key) -> WhisperServerWorker:
+        for other, idle in self._idle.items():
+            if other != key and idle:
+                victim = idle.pop(0)
+                self._workers[other].remove(victim)
+                self.evictions += 1
+                logger.info(f"Whisper server for {other} evicted for {key}")
+                return victim
+        return None
+
+    @staticmethod
+    def _stop(worker: WhisperServerWorker):
+        if worker is not None:
+            worker.stop()
+
+    def _start_reserved(self, key):
+        model_path, language = key
+        worker = self.worker_factory(self.binary, model_path, language)
+        try:
+            worker.start()
+        except Exception:
+            with self._lock:
+                self._workers[key].remove(None)
+                self._lock.notify_all()
+            raise
+        with self._lock:
+            slots = self._workers[key]
+            slots[slots.index(None)] = worker
+        self._ensure_health_thread()
+        return worker
+
+    def _ensure_health_thread(self):
+        if self._health_thread is not None or self.health_interval <= 0:
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="whisper-pool-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def _health_loop(self):
+        while not self._stopped.wait(self.health_interval):
+            self.check_health()
+
+
+pool: WhisperServerPool | None = None
+
+
+def get_worker_pool(
+    binary: str, worker_factory=WhisperServerWorker
+) -> WhisperServerPool:
+    """Return the process-wide pool, created on first use."""
+    global pool
+
+    if pool is None:
+        pool = WhisperServerPool(
+            binary,
+            worker_factory=worker_factory,
+            size=int(os.getenv("WHISPER_POOL_SIZE", DEFAULT_POOL_SIZE)),
+            max_workers=int(os.getenv("WHISPER_POOL_MAX_WORKERS", DEFAULT_MAX_WORKERS)),
+            health_interval=float(
+                os.getenv("WHISPER_POOL_HEALTH_INTERVAL", DEFAULT_HEALTH_INTERVAL)
+            ),
+        )
+        atexit.register(pool.shutdown)
+    return pool
+
+
+def shutdown_worker_pool():
+    global pool
+
+    if pool is not None:
+        pool.shutdown()
+        pool = None
+
+
+def worker_pool_stats():
+    return pool.stats() if pool is not None else None
@@ -1,15 +1,120 @@
+import os
+import threading
+
+import numpy as np
 import whisperx
+from faster_whisper.tokenizer import Tokenizer
 
+from .batching import BatchOptions, BatchScheduler
+from .registry import ModelKey, default_compute_type, default_device, get_model_registry
 
-def transcribe(input_wav_path: str, model: str = None, language: str = None):
-    device = "cuda"
-    batch_size = 4  # reduce if low on GPU mem
-    compute_type = "int8"  # change to "int8" if low on GPU mem (may reduce accuracy)
+SAMPLE_RATE = 16000
+CHUNK_SAMPLES = 30 * SAMPLE_RATE  # whisper decodes at most 30 s per input
+
+# the pipeline tokenizer is shared state: one batch or transcription at a
+# time per process
+_pipeline_lock = threading.Lock()
 
-    model = whisperx.load_model(
-        model or "tiny", device, compute_type=compute_type, download_root="."
+
+def load_model(
+    model: str | None = None, device: str | None = None, compute_type: str | None = None
+):
+    """Load once, then reuse the resident model (see registry)."""
+    model = model or "tiny"
+    device = device or default_device()  # cuda when available, cpu otherwise
+    compute_type = compute_type or default_compute_type(device)
+    return get_model_registry().get(
+        ModelKey("whisperx", model, device, compute_type),
+        lambda: whisperx.load_model(
+            model, device, compute_type=compute_type, download_root="."
+        ),
     )
 
+
+def transcribe(
+    input_wav_path: str, model: str | None = None, language: str | None = None
+):
+    batch_size = 4  # reduce if low on GPU mem
+
+    model = load_model(model)
+
     audio = whisperx.load_audio(input_wav_path)
-    result = model.transcribe(audio, batch_size=batch_size)
+    # transcribe() sets the tokenizer of the language, as _use_language does
+    with _pipeline_lock:
+        result = model.transcribe(audio, batch_size=batch_size, language=language)
     return result["segments"]  # before alignment
+
+
+def _use_language(pipeline, language: str):
+    tokenizer = pipeline.tokenizer
+    if tokenizer is None or tokenizer.language_code != language:
+        pipeline.tokenizer = Tokenizer(
+            pipeline.model.hf_tokenizer,
+            pipeline.model.model.is_multilingual,
+            task="transcribe",
+            language=language,
+        )
+
+
+def transcribe_many(
+    audios: list[np.ndarray],
+    model: str | None = None,
+    language: str | None = None,
+    batch_size: int = 16,
+    device: str | None = None,
+) -> list[str]:
+    """
+    Transcribe several utterances (16 kHz float32 mono) in one batched
+    CTranslate2 inference and return their text in the input order.
+    Utterances longer than 30 s are split; no VAD pass is run, the inputs
+    are expected to be speech segments already (FrameProcessor, long-form VAD).
+    """
+    pipeline = load_model(model, device)
+
+    chunks, owners = [], []
+    for i, audio in enumerate(audios):
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        for start in range(0, audio.size, CHUNK_SAMPLES):
+            chunks.append(audio[start : start + CHUNK_SAMPLES])
+            owners.append(i)
+
+    texts = [[] for _ in audios]
+    with _pipeline_lock:
+        _use_language(pipeline, language or "en")
+        outputs = pipeline(
+            ({"inputs": chunk} for chunk in chunks),
+            batch_size=batch_size,
+            num_workers=0,
+        )
+        for owner, out in zip(owners, outputs):
+            texts[owner].append(out["text"].strip())
+
+    return [" ".join(t for t in owned if t) for owned in texts]
+
+
+batch_scheduler: BatchScheduler | None = None
+
+
+def get_batch_scheduler() -> BatchScheduler:
+    global batch_scheduler
+
+    if batch_scheduler is None:
+        batch_scheduler = BatchScheduler(
+            lambda key, audios: transcribe_many(audios, *key),
+            BatchOptions(
+                window_ms=float(os.getenv("WHISPERX_BATCH_WINDOW_MS", "20")),
+                max_batch_size=int(os.getenv("WHISPERX_BATCH_MAX_SIZE", "16")),
+                max_concurrent_batches=1,
+            ),
+        )
+    return batch_scheduler
+
+
+def transcribe_array(
+    audio: np.ndarray, model: str | None = None, language: str | None = None
+):
+    """
+    Transcribe one utterance; concurrent callers (several speakers, sessions)
+    are queued and decoded together by transcribe_many.
+    """
+    return get_batch_scheduler().submit((model, language), audio).result()
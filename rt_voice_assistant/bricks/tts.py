@@ -1,10 +1,33 @@
 import os
 import platform
-import onnxruntime as ort
 import urllib.request
+
+import numpy as np
+import onnxruntime as ort
 from kokoro_onnx import Kokoro
 
+from .cancellation import CancellationToken
+from .sentences import split_sentences
+from .slo import get_latency_controller
+
 FOLDER = "models"
+SAMPLE_RATE = 24000  # Kokoro output
+
+# whisper language code -> Kokoro language
+KOKORO_LANGUAGES = {
+    "en": "en-us",
+    "fr": "fr-fr",
+    "es": "es",
+    "it": "it",
+    "pt": "pt-br",
+    "hi": "hi",
+    "ja": "ja",
+    "zh": "cmn",
+}
+
+
+def kokoro_language(language: str, default: str = "en-us") -> str:
+    return KOKORO_LANGUAGES.get((language or "").split("-")[0].lower(), default)
 
 
 def download_model_files():
@@ -53,6 +76,29 @@ def get_tts_engine():
     return tts
 
 
+def synthesize(
+    text: str, voice: str, lang: str = "en-us", token: CancellationToken | None = None
+):
+    """
+    Kokoro synthesis of an assistant turn, timed for the latency controller.
+    With a cancellation token the text is synthesized sentence by sentence and
+    the synthesis stops at the first sentence boundary after a cancel.
+    """
+    with get_latency_controller().track("tts"):
+        if token is None:
+            return get_tts_engine().create(text, voice=voice, lang=lang)
+
+        chunks, sample_rate = [], None
+        for sentence in split_sentences(text) or [text]:
+            token.raise_if_cancelled()
+            samples, sample_rate = get_tts_engine().create(
+                sentence, voice=voice, lang=lang
+            )
+            chunks.append(samples)
+        token.raise_if_cancelled()
+        return np.concatenate(chunks), sample_rate
+
+
 def on_startup():
     if not download_model_files():
         raise RuntimeError("Failed to download required model files")
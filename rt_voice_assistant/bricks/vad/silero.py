@@ -1,11 +1,16 @@
 import logging
 import os
+import threading
 
 import numpy as np
 import torch
-from silero_vad import load_silero_vad, VADIterator
+from silero_vad import VADIterator, get_speech_timestamps, load_silero_vad
 
 vad_silero = None
+# separate instances, one per concurrent `speech_timestamps` call: the model
+# is stateful, and get_speech_timestamps resets its state
+vad_offline: list = []
+_vad_offline_lock = threading.Lock()
 silero_iter = None
 _silero_buf = np.zeros(0, dtype=np.float32)
 
@@ -130,3 +135,52 @@ def process_prob(chunk: np.ndarray, sampling_rate: int = SAMPLERATE) -> float:
         logger.debug(f"VAD: {out}")
 
     return out
+
+
+class SileroProb:
+    """
+    P(speech) of the consecutive 512-sample frames of one stream.
+    Unlike `process_prob`, each instance has its own model state: one per
+    session, so that concurrent streams do not mix their context.
+    """
+
+    def __init__(self, sampling_rate: int = SAMPLERATE):
+        self.sampling_rate = sampling_rate
+        self.model = load_silero_vad()
+
+    def __call__(self, frame: np.ndarray) -> float:
+        x = torch.from_numpy(np.ascontiguousarray(as_float32(frame)))
+        return self.model(x, self.sampling_rate).item()
+
+    def reset(self):
+        self.model.reset_states()
+
+
+def speech_timestamps(
+    audio: np.ndarray,
+    sampling_rate: int = SAMPLERATE,
+    min_silence_duration_ms: int = 500,
+    max_speech_duration_s: float = float("inf"),
+) -> list[dict]:
+    """
+    Speech regions of a whole recording, [{"start": ..., "end": ...}] in samples.
+    Regions longer than `max_speech_duration_s` are split at their longest pause.
+    Thread-safe: concurrent calls each borrow a model of their own.
+    """
+    with _vad_offline_lock:
+        model = vad_offline.pop() if vad_offline else None
+    if model is None:
+        model = load_silero_vad()
+
+    try:
+        return get_speech_timestamps(
+            torch.from_numpy(as_float32(audio)),
+            model,
+            sampling_rate=sampling_rate,
+            min_silence_duration_ms=min_silence_duration_ms,
+            max_speech_duration_s=max_speech_duration_s,
+        )
+    finally:
+        model.reset_states()
+        with _vad_offline_lock:
+            vad_offline.append(model)
@@ -24,10 +24,16 @@ from ..bricks.audio import prepare_for_write
 from ..bricks.frame_processor import Callbacks, FrameProcessor, FrameProcessorOptions
 from ..bricks.listen import ListenOptions, listen
 from ..bricks.llm import clean_thinking, get_client, trim_to_budget
-from ..bricks.stt.whispercpp import transcribe
-from ..bricks.tts import get_tts_engine
+from ..bricks.silence import trim_silence
+from ..bricks.stt.gate import check_transcript
+from ..bricks.stt.language import AUTO, LanguageSession
+from ..bricks.stt.router import transcribe_array, transcribe_array_detailed
+from ..bricks.stt.streaming import StreamingCallbacks, StreamingTranscriber
+from ..bricks.stt.whispercpp import detect_language
+from ..bricks.stt.whispercpp import on_startup as on_startup_stt
+from ..bricks.tts import kokoro_language, synthesize
 from ..bricks.tts import on_startup as on_startup_tts
-from ..bricks.vad.silero import process_prob
+from ..bricks.vad.silero import as_float32, process_prob
 
 load_dotenv()
 
@@ -49,7 +55,13 @@ HISTORY = []
 
 
 class Transcriber:
-    def __init__(self, filename_fmt: str):
+    def __init__(
+        self,
+        filename_fmt: str | None = None,
+        streaming: bool = False,
+        trim: bool = True,
+        language: str = "en",
+    ):
         self.frame_processor = FrameProcessor(
             prob_fn=process_prob,
             options=FrameProcessorOptions(
@@ -62,10 +74,27 @@ class Transcriber:
                 on_vad_misfire=self.on_vad_misfire,
                 on_speech_start=self.on_speech_start,
                 on_speech_real_start=self.on_speech_real_start,
-                on_speech_end=self.on_speech_end,
+                on_speech_segment=self.on_speech_segment,
+                on_speech_frame=self.on_speech_frame if streaming else None,
             ),
         )
         self.filename_fmt = filename_fmt
+        self.trim = trim
+        self.language = language
+        # "auto": detect on the first utterances, then pin
+        self.languages = LanguageSession(detect_language) if language == AUTO else None
+        self.turn_language = None
+        # decode while the user speaks, most of the text is ready on speech end
+        self.streaming = (
+            StreamingTranscriber(
+                lambda audio: transcribe_array(
+                    audio, model="small", language=self.language_for(audio, final=False)
+                ),
+                cb=StreamingCallbacks(on_partial=self.on_partial),
+            )
+            if streaming
+            else None
+        )
 
     def on_frame_processed(self, p_speech: float, frame: np.ndarray):
         pass
@@ -73,6 +102,22 @@ class Transcriber:
 
     def on_vad_misfire(self):
         logger.info("VAD misfire")
+        self.turn_language = None
+        if self.streaming:
+            self.streaming.reset()
+
+    def language_for(self, audio: np.ndarray, final: bool = True) -> str:
+        """The language of the current utterance, detected once per turn until pinned."""
+        if self.languages is None:
+            return self.language
+        if self.turn_language is None:
+            if not (
+                final or self.languages.pinned or self.languages.enough_speech(audio)
+            ):
+                # too little speech to tell yet: the partials use the best guess
+                return self.languages.guess()
+            self.turn_language = self.languages.language_for(as_float32(audio))
+        return self.turn_language
 
     def on_speech_start(self):
         logger.info("Speech start")
@@ -80,7 +125,13 @@ class Transcriber:
     def on_speech_real_start(self):
         logger.info("Speech real start")
 
-    def on_speech_end(self, frame: np.ndarray):
+    def on_speech_frame(self, frame: np.ndarray):
+        self.streaming.feed(as_float32(frame))
+
+    def on_partial(self, committed: str, tentative: str):
+        print(f"\r... {committed} [{tentative}]", end="", flush=True)
+
+    def save_utterance(self, audio: np.ndarray):
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         filename = self.filename_fmt.format(timestamp)
 
@@ -91,13 +142,47 @@ class Transcriber:
             channels=1,
             subtype="FLOAT",
         ) as wav:
-            wav.write(prepare_for_write(frame))
-
-        transcription = transcribe(
-            model="small",
-            language="en",
-            input_wav_path=filename,
-        )
+            wav.write(audio)
+
+    def on_speech_segment(self, segment: np.ndarray, probs: np.ndarray):
+        if self.filename_fmt:
+            self.save_utterance(prepare_for_write(segment))
+
+        audio = segment
+        if self.trim:
+            # whisper only gets the speech and short pauses
+            audio, time_map = trim_silence(segment, probs)
+            logger.info(f"Trimmed {len(segment)} -> {time_map.kept_samples} samples")
+
+        if self.streaming:
+            guess = self.languages.guess() if self.languages else None
+            transcript = self.streaming.finish()
+            print()
+            # a short turn: its language is identified on the whole utterance
+            if (
+                guess
+                and self.turn_language is None
+                and self.language_for(audio) != guess
+            ):
+                transcript = transcribe_array_detailed(
+                    prepare_for_write(audio),
+                    model="small",
+                    language=self.turn_language,
+                )
+        else:
+            transcript = transcribe_array_detailed(
+                prepare_for_write(audio),
+                model="small",
+                language=self.language_for(audio),
+            )
+
+        # noise, silence or a whisper hallucination: not worth an answer
+        decision = check_transcript(transcript, duration=len(segment) / 16000)
+        if not decision:
+            logger.info(f"Turn skipped ({decision.reason}): {decision.text!r}")
+            self.turn_language = None
+            return
+        transcription = decision.text
         print(f"Transcription: {transcription}")
 
         client = get_client(url=URL)
@@ -113,8 +198,10 @@ class Transcriber:
 
         audible_text = clean_thinking(text)
         HISTORY.append({"role": "assistant", "content": audible_text})
-        tts = get_tts_engine()
-        samples, sample_rate = tts.create(audible_text, voice=VOICE, lang=LANGUAGE)
+        # answer in the language the user spoke
+        lang = kokoro_language(self.turn_language) if self.languages else LANGUAGE
+        self.turn_language = None
+        samples, sample_rate = synthesize(audible_text, voice=VOICE, lang=lang)
         sd.play(samples, sample_rate)
         sd.wait()
 
@@ -127,7 +214,16 @@ if __name__ == "__main__":
     if not os.path.isdir("audios"):
         os.mkdir("audios")
 
-    transcriber = Transcriber(filename_fmt="audios/voice_{}.wav")
+    # load the whisper model once, every utterance then goes to a warm worker
+    on_startup_stt("small", "en")
+    # utterances are transcribed in memory, keep a copy on disk only when asked
+    save_utterances = os.getenv("SAVE_UTTERANCES", "false") == "true"
+    transcriber = Transcriber(
+        filename_fmt="audios/voice_{}.wav" if save_utterances else None,
+        streaming=os.getenv("STT_STREAMING", "false") == "true",
+        trim=os.getenv("STT_TRIM_SILENCE", "true") == "true",
+        language=os.getenv("STT_LANGUAGE", "en"),
+    )
     options = ListenOptions(
         samplerate=16000,
         channels=1,
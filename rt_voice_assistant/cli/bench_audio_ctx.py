@@ -0,0 +1,97 @@
+import os
+import re
+import statistics
+import sys
+import time
+
+import soundfile as sf
+
+from ..bricks.audio import SR, to_wav_bytes
+from ..bricks.stt.whispercpp import (
+    AUDIO_CTX_FULL,
+    audio_ctx_for,
+    detect_paths,
+    transcribe_with_cli,
+)
+
+SAMPLES = [
+    ("audios/jfk.wav", "en"),
+    ("rt_voice_assistant/qa/sample-en.wav", "en"),
+    ("rt_voice_assistant/qa/sample-fr.wav", "fr"),
+]
+CLIP_SECONDS = [2, 4, None]  # None: the whole sample
+RUNS = 3
+
+
+def words(text: str) -> list[str]:
+    return re.findall(r"\w+", (text or "").lower())
+
+
+def wer(reference: str, hypothesis: str) -> float:
+    """Word error rate: word-level edit distance over the reference length."""
+    ref, hyp = words(reference), words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+    previous = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        current = [i]
+        for j, h in enumerate(hyp, 1):
+            current.append(
+                min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (r != h))
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+def timed(whisper_binary, model_path, audio, language, audio_ctx):
+    latencies = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        text = transcribe_with_cli(
+            whisper_binary, model_path, audio, language, audio_ctx
+        )
+        latencies.append(time.perf_counter() - started)
+    return text, statistics.median(latencies)
+
+
+def bench(model: str):
+    print(
+        f"{'sample':<40} {'audio':>6} {'ctx':>5} {'latency':>8} {'speedup':>8} {'WER':>6}"
+    )
+    for path, language in SAMPLES:
+        if not os.path.exists(path):
+            print(f"{path}: missing, skipped")
+            continue
+        samples, sr = sf.read(path, dtype="float32", always_2d=False)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        if sr != SR:
+            print(f"{path}: {sr} Hz, expected {SR} Hz, skipped")
+            continue
+        whisper_binary, model_path = detect_paths(model, language)
+
+        for clip in CLIP_SECONDS:
+            clipped = samples if clip is None else samples[: clip * SR]
+            duration = clipped.size / SR
+            audio = to_wav_bytes(clipped)
+            # the full 30 s window is the reference for both latency and accuracy
+            reference, full_latency = timed(
+                whisper_binary, model_path, audio, language, None
+            )
+            audio_ctx = audio_ctx_for(duration)
+            if audio_ctx is None:
+                text, latency = reference, full_latency
+            else:
+                text, latency = timed(
+                    whisper_binary, model_path, audio, language, audio_ctx
+                )
+            print(
+                f"{os.path.basename(path):<40} {duration:>5.1f}s "
+                f"{audio_ctx or AUDIO_CTX_FULL:>5} {latency:>7.2f}s "
+                f"{full_latency / latency:>7.1f}x {wer(reference, text):>6.1%}"
+            )
+
+
+if __name__ == "__main__":
+    # uv run -m rt_voice_assistant.cli.bench_audio_ctx [model]
+    bench(sys.argv[1] if len(sys.argv) > 1 else "small")
@@ -11,8 +11,8 @@
 
 import logging
 import os
-from datetime import datetime
 import sys
+from datetime import datetime
 
 import numpy as np
 import soundfile as sf
@@ -20,15 +20,27 @@ import soundfile as sf
 from ..bricks.audio import prepare_for_write
 from ..bricks.frame_processor import Callbacks, FrameProcessor, FrameProcessorOptions
 from ..bricks.listen import ListenOptions, listen
-from ..bricks.stt.whispercpp import transcribe
-from ..bricks.vad.silero import process_prob
+from ..bricks.silence import trim_silence
+from ..bricks.stt.language import AUTO, LanguageSession
+from ..bricks.stt.longform import LONG_AUDIO_S, merge_results, transcribe_long
+from ..bricks.stt.router import transcribe, transcribe_array
+from ..bricks.stt.streaming import StreamingCallbacks, StreamingTranscriber
+from ..bricks.stt.whispercpp import detect_language
+from ..bricks.stt.whispercpp import on_startup as on_startup_stt
+from ..bricks.vad.silero import as_float32, process_prob
 
 logger = logging.getLogger("rt_py.cli.transcribe")
 logger.setLevel(logging.DEBUG)
 
 
 class Transcriber:
-    def __init__(self, filename_fmt: str):
+    def __init__(
+        self,
+        filename_fmt: str | None = None,
+        streaming: bool = False,
+        trim: bool = True,
+        language: str = "en",
+    ):
         self.frame_processor = FrameProcessor(
             prob_fn=process_prob,
             options=FrameProcessorOptions(
@@ -41,10 +53,27 @@ class Transcriber:
                 on_vad_misfire=self.on_vad_misfire,
                 on_speech_start=self.on_speech_start,
                 on_speech_real_start=self.on_speech_real_start,
-                on_speech_end=self.on_speech_end,
+                on_speech_segment=self.on_speech_segment,
+                on_speech_frame=self.on_speech_frame if streaming else None,
             ),
         )
         self.filename_fmt = filename_fmt
+        self.trim = trim
+        self.language = language
+        # "auto": detect on the first utterances, then pin
+        self.languages = LanguageSession(detect_language) if language == AUTO else None
+        self.turn_language = None
+        # decode while the user speaks, most of the text is ready on speech end
+        self.streaming = (
+            StreamingTranscriber(
+                lambda audio: transcribe_array(
+                    audio, model="small", language=self.language_for(audio, final=False)
+                ),
+                cb=StreamingCallbacks(on_partial=self.on_partial),
+            )
+            if streaming
+            else None
+        )
 
     def on_frame_processed(self, p_speech: float, frame: np.ndarray):
         pass
@@ -52,6 +81,22 @@ class Transcriber:
 
     def on_vad_misfire(self):
         logger.info("VAD misfire")
+        self.turn_language = None
+        if self.streaming:
+            self.streaming.reset()
+
+    def language_for(self, audio: np.ndarray, final: bool = True) -> str:
+        """The language of the current utterance, detected once per turn until pinned."""
+        if self.languages is None:
+            return self.language
+        if self.turn_language is None:
+            if not (
+                final or self.languages.pinned or self.languages.enough_speech(audio)
+            ):
+                # too little speech to tell yet: the partials use the best guess
+                return self.languages.guess()
+            self.turn_language = self.languages.language_for(as_float32(audio))
+        return self.turn_language
 
     def on_speech_start(self):
         logger.info("Speech start")
@@ -59,7 +104,13 @@ class Transcriber:
     def on_speech_real_start(self):
         logger.info("Speech real start")
 
-    def on_speech_end(self, frame: np.ndarray):
+    def on_speech_frame(self, frame: np.ndarray):
+        self.streaming.feed(as_float32(frame))
+
+    def on_partial(self, committed: str, tentative: str):
+        print(f"\r... {committed} [{tentative}]", end="", flush=True)
+
+    def save_utterance(self, audio: np.ndarray):
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
         filename = self.filename_fmt.format(timestamp)
 
@@ -70,13 +121,40 @@ class Transcriber:
             channels=1,
             subtype="FLOAT",
         ) as wav:
-            wav.write(prepare_for_write(frame))
-
-        transcription = transcribe(
-            model="small",
-            language="en",
-            input_wav_path=filename,
-        )
+            wav.write(audio)
+
+    def on_speech_segment(self, segment: np.ndarray, probs: np.ndarray):
+        if self.filename_fmt:
+            self.save_utterance(prepare_for_write(segment))
+
+        audio = segment
+        if self.trim:
+            # whisper only gets the speech and short pauses
+            audio, time_map = trim_silence(segment, probs)
+            logger.info(f"Trimmed {len(segment)} -> {time_map.kept_samples} samples")
+
+        if self.streaming:
+            guess = self.languages.guess() if self.languages else None
+            transcription = self.streaming.finish()
+            print()
+            # a short turn: its language is identified on the whole utterance
+            if (
+                guess
+                and self.turn_language is None
+                and self.language_for(audio) != guess
+            ):
+                transcription = transcribe_array(
+                    prepare_for_write(audio),
+                    model="small",
+                    language=self.turn_language,
+                )
+        else:
+            transcription = transcribe_array(
+                prepare_for_write(audio),
+                model="small",
+                language=self.language_for(audio),
+            )
+        self.turn_language = None
         print(f"Transcription: {transcription}")
 
     def __call__(self, frame: np.ndarray):
@@ -93,6 +171,23 @@ if __name__ == "__main__":
         filename = sys.argv[1]
 
     if filename:
+        info = sf.info(filename)
+        if info.duration > LONG_AUDIO_S and info.samplerate == 16000:
+            # long recordings (e.g. a capture_*.wav) are cut at the pauses
+            # and the chunks transcribed in parallel
+            audio, _ = sf.read(filename, dtype="float32", always_2d=False)
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+            results = []
+            for result in transcribe_long(
+                audio,
+                lambda chunk: transcribe_array(chunk, model="small", language="en"),
+            ):
+                print(f"[{result.start:8.2f} -> {result.end:8.2f}] {result.text}")
+                results.append(result)
+            print(f"Transcription: {merge_results(results)}")
+            sys.exit(0)
+
         transcription = transcribe(
             model="small",
             language="en",
@@ -101,7 +196,16 @@ if __name__ == "__main__":
         print(f"Transcription: {transcription}")
         exit(0)
 
-    transcriber = Transcriber(filename_fmt="audios/voice_{}.wav")
+    # load the whisper model once, every utterance then goes to a warm worker
+    on_startup_stt("small", "en")
+    # utterances are transcribed in memory, keep a copy on disk only when asked
+    save_utterances = os.getenv("SAVE_UTTERANCES", "false") == "true"
+    transcriber = Transcriber(
+        filename_fmt="audios/voice_{}.wav" if save_utterances else None,
+        streaming=os.getenv("STT_STREAMING", "false") == "true",
+        trim=os.getenv("STT_TRIM_SILENCE", "true") == "true",
+        language=os.getenv("STT_LANGUAGE", "en"),
+    )
     options = ListenOptions(
         samplerate=16000,
         channels=1,
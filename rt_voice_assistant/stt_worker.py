@@ -0,0 +1,100 @@
+import argparse
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from typing import Annotated
+
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+
+from .bricks.stt.whispercpp import on_shutdown as on_shutdown_stt
+from .bricks.stt.whispercpp import on_startup as on_startup_stt
+from .bricks.stt.whispercpp import stats as stt_stats
+from .bricks.stt.whispercpp import (
+    transcribe_wav_bytes,
+    transcribe_wav_bytes_detailed,
+)
+
+logger = logging.getLogger("rt_py.stt_worker")
+logger.setLevel(logging.DEBUG)
+
+# the models this worker keeps resident, every model when empty
+MODELS = [m.strip() for m in os.getenv("STT_WORKER_MODELS", "").split(",") if m.strip()]
+LANGUAGE = os.getenv("STT_WORKER_LANGUAGE", "en")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    for model in MODELS:
+        try:
+            on_startup_stt(model, LANGUAGE)
+        except Exception:
+            logger.exception(f"Could not warm up the {model} whisper.cpp workers")
+    yield
+    on_shutdown_stt()
+
+
+app = FastAPI(
+    title="RealTime Voice Assistant STT worker",
+    description="whisper-server compatible transcription endpoint",
+    lifespan=lifespan,
+)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "models": MODELS or None, "stt": stt_stats()}
+
+
+@app.post("/inference")
+async def inference(
+    file: Annotated[UploadFile, File()],
+    model: str = Form("small"),
+    language: str = Form(None),
+    response_format: str = Form("json"),
+):
+    """The whisper-server /inference protocol, for one of the served models."""
+    if MODELS and model not in MODELS:
+        raise HTTPException(status_code=404, detail=f"Model {model} is not served here")
+
+    audio = await file.read()
+    if response_format == "verbose_json":
+        transcript = await asyncio.to_thread(
+            transcribe_wav_bytes_detailed, audio, model, language
+        )
+        if transcript is None:
+            raise HTTPException(status_code=500, detail="Transcription failed")
+        return {
+            "text": transcript.text,
+            "language": transcript.language,
+            "segments": [
+                {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "no_speech_prob": segment.no_speech_prob,
+                    "avg_logprob": segment.avg_logprob,
+                    "tokens": [{"p": p} for p in segment.token_probs],
+                }
+                for segment in transcript.segments
+            ],
+        }
+
+    text = await asyncio.to_thread(transcribe_wav_bytes, audio, model, language)
+    if text is None:
+        raise HTTPException(status_code=500, detail="Transcription failed")
+    return {"text": text}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a remote STT worker")
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8178,
+        help="Port to run the worker on (default: 8178)",
+    )
+    args = parser.parse_args()
+    uvicorn.run(app, host="0.0.0.0", port=args.port)
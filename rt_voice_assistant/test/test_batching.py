@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from ..bricks.stt.batching import BatchOptions, BatchScheduler
+
+
+class RecordingBatchFn:
+    def __init__(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, key, items):
+        with self.lock:
+            self.calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+
+def test_concurrent_requests_share_a_batch():
+    batch_fn = RecordingBatchFn()
+    scheduler = BatchScheduler(batch_fn, BatchOptions(window_ms=50, max_batch_size=10))
+    futures = [scheduler.submit("small-en", i) for i in range(3)]
+    assert [f.result(timeout=2) for f in futures] == [
+        "small-en:0",
+        "small-en:1",
+        "small-en:2",
+    ]
+    assert batch_fn.calls == [("small-en", [0, 1, 2])]
+    scheduler.shutdown()
+
+
+def test_keys_are_batched_separately():
+    batch_fn = RecordingBatchFn()
+    scheduler = BatchScheduler(batch_fn, BatchOptions(window_ms=50))
+    en = scheduler.submit(("small", "en"), "a")
+    fr = scheduler.submit(("small", "fr"), "b")
+    assert en.result(timeout=2) == "('small', 'en'):a"
+    assert fr.result(timeout=2) == "('small', 'fr'):b"
+    assert len(batch_fn.calls) == 2
+    scheduler.shutdown()
+
+
+def test_full_batch_is_flushed_before_the_window():
+    batch_fn = RecordingBatchFn()
+    scheduler = BatchScheduler(
+        batch_fn, BatchOptions(window_ms=10_000, max_batch_size=2)
+    )
+    started = time.monotonic()
+    futures = [scheduler.submit("k", i) for i in range(2)]
+    assert [f.result(timeout=2) for f in futures] == ["k:0", "k:1"]
+    assert time.monotonic() - started < 1
+    scheduler.shutdown()
+
+
+def test_errors_are_reported_per_item_and_per_batch():
+    def batch_fn(key, items):
+        if key == "broken":
+            raise RuntimeError("whisper crashed")
+        return [ValueError("bad audio") if item == "bad" else item for item in items]
+
+    scheduler = BatchScheduler(batch_fn, BatchOptions(window_ms=20))
+    good, bad = scheduler.submit("k", "good"), scheduler.submit("k", "bad")
+    broken = scheduler.submit("broken", "x")
+    assert good.result(timeout=2) == "good"
+    with pytest.raises(ValueError, match="bad audio"):
+        bad.result(timeout=2)
+    with pytest.raises(RuntimeError, match="whisper crashed"):
+        broken.result(timeout=2)
+    assert scheduler.stats()["items"] == 3
+    scheduler.shutdown()
@@ -0,0 +1,60 @@
+import numpy as np
+
+from ..bricks.audio import to_wav_bytes
+from ..bricks.stt.cache import (
+    TranscriptionCache,
+    cache_key,
+    pcm_fingerprint,
+    wav_fingerprint,
+)
+
+
+def test_fingerprint_depends_on_the_samples_not_the_container():
+    audio = np.linspace(-0.5, 0.5, 1600, dtype=np.float32)
+    assert wav_fingerprint(to_wav_bytes(audio)) == pcm_fingerprint(audio)
+    assert pcm_fingerprint(audio) != pcm_fingerprint(audio[::-1])
+
+
+def test_key_includes_model_language_and_params():
+    keys = {
+        cache_key("abc", "small", "en"),
+        cache_key("abc", "small", "fr"),
+        cache_key("abc", "base", "en"),
+        cache_key("abc", "small", "en", beam_size=5),
+    }
+    assert len(keys) == 4
+    assert cache_key("abc", "small", "en") == cache_key("abc", "small", "en")
+
+
+class TestTranscriptionCache:
+    def test_hits_and_misses_are_counted(self):
+        cache = TranscriptionCache(max_entries=2)
+        assert cache.get("a") is None
+        cache.put("a", "hello")
+        assert cache.get("a") == "hello"
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    def test_memory_tier_is_lru(self):
+        cache = TranscriptionCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1"
+
+    def test_disk_tier_survives_a_restart(self, tmp_path):
+        TranscriptionCache(directory=str(tmp_path)).put("abcdef", "persisted")
+        cache = TranscriptionCache(directory=str(tmp_path))
+        assert cache.get("abcdef") == "persisted"
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_disk_tier_is_bounded(self, tmp_path):
+        cache = TranscriptionCache(
+            max_entries=1, directory=str(tmp_path), max_disk_bytes=200
+        )
+        for i in range(20):
+            cache.put(f"{i:04d}", "x" * 20)
+        assert cache.stats()["disk_bytes"] <= 200
+        assert cache.get("0019") == "x" * 20
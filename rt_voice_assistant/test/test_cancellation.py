@@ -0,0 +1,141 @@
+import sys
+import threading
+import time
+import types
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from ..bricks.cancellation import (
+    CancellationToken,
+    Cancelled,
+    TurnRegistry,
+    current_token,
+    future_result,
+    run_process,
+)
+from ..bricks.stt.batching import BatchOptions, BatchScheduler
+from ..bricks.stt.router import Backend, STTRouter
+
+SLEEP = [sys.executable, "-c", "import time; time.sleep(30)"]
+
+
+def cancel_later(token, delay=0.1):
+    timer = threading.Timer(delay, token.cancel, ("test",))
+    timer.start()
+    return timer
+
+
+class TestCancellationToken:
+    def test_callbacks_run_once_on_cancel(self):
+        token = CancellationToken()
+        calls = []
+        with token.on_cancel(lambda: calls.append(1)):
+            token.cancel("gone")
+            token.cancel("again")
+        assert calls == [1]
+        assert token.reason == "gone"
+        with pytest.raises(Cancelled):
+            token.raise_if_cancelled()
+
+    def test_callback_runs_immediately_when_already_cancelled(self):
+        token = CancellationToken()
+        token.cancel()
+        calls = []
+        with token.on_cancel(lambda: calls.append(1)):
+            pass
+        assert calls == [1]
+
+    def test_callback_is_dropped_after_the_block(self):
+        token = CancellationToken()
+        calls = []
+        with token.on_cancel(lambda: calls.append(1)):
+            pass
+        token.cancel()
+        assert calls == []
+
+    def test_bound_token_is_current(self):
+        token = CancellationToken()
+        assert current_token() is None
+        with token.bound():
+            assert current_token() is token
+        assert current_token() is None
+
+
+class TestRunProcess:
+    def test_without_token(self):
+        result = run_process([sys.executable, "-c", "print('hi')"])
+        assert result.stdout.strip() == b"hi"
+
+    def test_cancel_kills_the_process(self):
+        token = CancellationToken()
+        cancel_later(token)
+        started = time.monotonic()
+        with pytest.raises(Cancelled):
+            run_process(SLEEP, token=token)
+        assert time.monotonic() - started < 5
+
+    def test_input_and_output_with_token(self):
+        cmd = [sys.executable, "-c", "import sys; sys.stdout.write(sys.stdin.read())"]
+        result = run_process(cmd, input=b"audio", token=CancellationToken())
+        assert result.stdout == b"audio"
+
+
+class TestFutureResult:
+    def test_gives_up_on_cancel(self):
+        token = CancellationToken()
+        future = Future()
+        cancel_later(token)
+        with pytest.raises(Cancelled):
+            future_result(future, token)
+        assert future.cancelled()
+
+    def test_batch_skips_cancelled_requests(self):
+        seen = []
+
+        def batch_fn(key, items):
+            seen.extend(items)
+            return items
+
+        scheduler = BatchScheduler(batch_fn, BatchOptions(window_ms=50))
+        dropped = scheduler.submit("k", "dropped")
+        kept = scheduler.submit("k", "kept")
+        dropped.cancel()
+        assert kept.result(timeout=2) == "kept"
+        assert seen == ["kept"]
+        scheduler.shutdown()
+
+
+class TestTurnRegistry:
+    def test_new_turn_cancels_the_previous_one(self):
+        turns = TurnRegistry()
+        first = turns.start("s1")
+        other = turns.start("s2")
+        second = turns.start("s1")
+        assert first.cancelled and not second.cancelled and not other.cancelled
+        turns.finish("s1", first)  # late finish of the superseded turn
+        assert turns.stats() == {"inflight": 2, "superseded": 1}
+
+
+class TestRouterCancellation:
+    def test_cancelled_transcription_does_not_fall_back(self):
+        calls = []
+
+        def cancelled(audio, model=None, language=None):
+            calls.append("a")
+            raise Cancelled("gone")
+
+        def ok(audio, model=None, language=None):
+            calls.append("b")
+            return "hello"
+
+        router = STTRouter(
+            [
+                Backend("a", _impl=types.SimpleNamespace(transcribe_array=cancelled)),
+                Backend("b", _impl=types.SimpleNamespace(transcribe_array=ok)),
+            ]
+        )
+        with pytest.raises(Cancelled):
+            router.transcribe_array(np.zeros(16000, dtype=np.float32))
+        assert calls == ["a"]
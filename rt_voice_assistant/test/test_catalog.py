@@ -0,0 +1,91 @@
+import pytest
+
+from ..bricks.stt.catalog import ModelCatalog, parse_model_filename
+
+
+def touch(directory, *filenames):
+    for filename in filenames:
+        (directory / filename).write_bytes(b"")
+
+
+@pytest.mark.parametrize(
+    "filename,expected",
+    [
+        ("ggml-small.bin", ("small", None, None)),
+        ("ggml-small.en.bin", ("small", "en", None)),
+        ("ggml-small.en-q5_1.bin", ("small", "en", "q5_1")),
+        ("ggml-large-v3-turbo-q8_0.bin", ("large-v3-turbo", None, "q8_0")),
+        ("ggml-large-v3.bin", ("large-v3", None, None)),
+        ("ggml-small.en-encoder.mlmodelc", None),
+        ("README.md", None),
+    ],
+)
+def test_parse_model_filename(filename, expected):
+    assert parse_model_filename(filename) == expected
+
+
+class TestModelCatalog:
+    def build(self, *directories, quantization=None):
+        catalog = ModelCatalog(
+            whisper_binary="/bin/whisper-cli",
+            directories=[str(d) for d in directories],
+            quantization=quantization,
+        )
+        catalog.refresh()
+        return catalog
+
+    def test_english_variant_is_preferred(self, tmp_path):
+        touch(tmp_path, "ggml-small.bin", "ggml-small.en.bin")
+        catalog = self.build(tmp_path)
+        assert catalog.lookup("small", "en") == (
+            "/bin/whisper-cli",
+            f"{tmp_path}/ggml-small.en.bin",
+        )
+        assert catalog.lookup("small", "fr")[1] == f"{tmp_path}/ggml-small.bin"
+
+    def test_lookup_returns_the_validated_model(self, tmp_path):
+        first, second = tmp_path / "first", tmp_path / "second"
+        first.mkdir()
+        second.mkdir()
+        touch(first, "ggml-tiny.bin")
+        touch(second, "ggml-base.bin")
+        catalog = self.build(first, second)
+        assert catalog.lookup("base", "en")[1] == f"{second}/ggml-base.bin"
+        assert catalog.lookup("tiny", "en")[1] == f"{first}/ggml-tiny.bin"
+
+    def test_quantization_preference(self, tmp_path):
+        touch(tmp_path, "ggml-base.en.bin", "ggml-base.en-q5_1.bin")
+        assert self.build(tmp_path).lookup("base", "en")[1].endswith("base.en.bin")
+        catalog = self.build(tmp_path, quantization="q5_1")
+        assert catalog.lookup("base", "en")[1].endswith("base.en-q5_1.bin")
+
+    def test_only_quantized_variant_available(self, tmp_path):
+        touch(tmp_path, "ggml-medium-q8_0.bin")
+        catalog = self.build(tmp_path)
+        assert catalog.lookup("medium", "en")[1].endswith("ggml-medium-q8_0.bin")
+
+    def test_unknown_model_is_rejected(self, tmp_path, monkeypatch):
+        touch(tmp_path, "ggml-small.bin")
+        catalog = self.build(tmp_path)
+
+        def no_disk(*args, **kwargs):
+            raise AssertionError("the disk must not be probed")
+
+        monkeypatch.setattr("os.path.exists", no_disk)
+        monkeypatch.setattr("os.listdir", no_disk)
+        with pytest.raises(ValueError, match="Unknown whisper model"):
+            catalog.lookup("gigantic", "en")
+        with pytest.raises(ValueError, match="not found"):
+            catalog.lookup("medium", "en")
+
+    def test_default_model_order(self, tmp_path):
+        touch(tmp_path, "ggml-base.bin", "ggml-tiny.bin")
+        assert self.build(tmp_path).lookup(None, "en")[1].endswith("ggml-tiny.bin")
+
+    def test_refresh_picks_up_new_models(self, tmp_path):
+        catalog = self.build(tmp_path)
+        with pytest.raises(ValueError):
+            catalog.lookup("small", "en")
+        touch(tmp_path, "ggml-small.en.bin")
+        catalog.refresh()
+        assert catalog.lookup("small", "en")[1].endswith("ggml-small.en.bin")
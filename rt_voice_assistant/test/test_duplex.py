@@ -0,0 +1,158 @@
+import threading
+import time
+
+import numpy as np
+
+from ..bricks.duplex import JitterBuffer, SessionOptions, VoiceSession, to_pcm16
+
+FRAME = 512
+
+
+def pcm(frames: int, amplitude: float) -> bytes:
+    return to_pcm16(np.full(frames * FRAME, amplitude, dtype=np.float32))
+
+
+def loudness(frame: np.ndarray) -> float:
+    return 0.9 if np.abs(frame).mean() > 0.1 else 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self.audio = []
+
+    def event(self, event):
+        self.events.append(event)
+
+    def types(self):
+        return [e["type"] for e in self.events if e["type"] != "partial"]
+
+
+def session(
+    recorder,
+    respond_fn,
+    transcribe_fn=lambda audio: "hello there friend",
+    save_reply_fn=None,
+):
+    return VoiceSession(
+        prob_fn=loudness,
+        transcribe_fn=transcribe_fn,
+        respond_fn=respond_fn,
+        synthesize_fn=lambda sentence, token: (np.zeros(2400, np.float32), 24000),
+        emit_event=recorder.event,
+        emit_audio=recorder.audio.append,
+        options=SessionOptions(partials=False),
+        save_reply_fn=save_reply_fn,
+    )
+
+
+class TestJitterBuffer:
+    def test_reframes_unaligned_packets(self):
+        buffer = JitterBuffer(frame_samples=4)
+        data = to_pcm16(np.linspace(-0.5, 0.5, 10, dtype=np.float32))
+        buffer.push(data[:3])
+        assert len(buffer) == 0
+        buffer.push(data[3:])
+        assert len(buffer) == 2  # 2 samples stay pending
+        assert buffer.pop().shape == (4,)
+
+    def test_drops_the_oldest_frames_when_behind(self):
+        buffer = JitterBuffer(frame_samples=2, max_frames=2)
+        buffer.push(to_pcm16(np.array([0.1, 0.1, 0.2, 0.2, 0.3, 0.3], np.float32)))
+        assert buffer.dropped == 1
+        assert np.allclose(buffer.pop(), 0.2, atol=1e-3)
+
+
+class TestVoiceSession:
+    def test_turn_events_and_audio(self):
+        recorder = Recorder()
+        saved = []
+        s = session(
+            recorder,
+            lambda text, token: iter(["Hi. ", "How are ", "you?"]),
+            save_reply_fn=saved.append,
+        )
+        s.feed(pcm(10, 0.0) + pcm(20, 0.5) + pcm(15, 0.0))
+        s.wait(timeout=5)
+        s.close()
+
+        assert recorder.types() == [
+            "speech_start",
+            "speech_end",
+            "final",
+            "llm_token",
+            "audio",
+            "llm_token",
+            "llm_token",
+            "audio",
+            "response_end",
+        ]
+        audio_events = [e for e in recorder.events if e["type"] == "audio"]
+        assert [e["text"] for e in audio_events] == ["Hi.", "How are you?"]
+        assert [len(chunk) for chunk in recorder.audio] == [4800, 4800]
+        assert recorder.events[-1]["text"] == "Hi. How are you?"
+        assert saved == ["Hi. How are you?"]
+
+    def test_rejected_transcript_gets_no_reply(self):
+        recorder = Recorder()
+        s = session(
+            recorder,
+            lambda text, token: iter(["never"]),
+            transcribe_fn=lambda audio: "[BLANK_AUDIO]",
+        )
+        s.feed(pcm(10, 0.0) + pcm(20, 0.5) + pcm(15, 0.0))
+        s.wait(timeout=5)
+        s.close()
+        assert recorder.types() == ["speech_start", "speech_end", "rejected"]
+
+    def test_speaking_over_the_assistant_interrupts_it(self):
+        recorder = Recorder()
+        replying = threading.Event()
+        saved = []
+
+        def respond(text, token):
+            yield "Let me think. "
+            yield "Well"
+            replying.set()
+            while not token.cancelled:
+                time.sleep(0.01)
+            token.raise_if_cancelled()
+
+        s = session(recorder, respond, save_reply_fn=saved.append)
+        s.feed(pcm(10, 0.0) + pcm(20, 0.5) + pcm(15, 0.0))
+        assert replying.wait(timeout=5)
+        s.feed(pcm(20, 0.5))
+        s.jitter.join(timeout=5)
+        s.wait(timeout=5)
+        s.close()
+
+        types = recorder.types()
+        assert "response_end" not in types
+        assert types[-2:] == ["speech_start", "interrupted"]
+        assert recorder.events[-1]["reason"] == "barge-in"
+        # only what was spoken is remembered
+        assert saved == ["Let me think."]
+
+    def test_a_misfire_does_not_interrupt_the_assistant(self):
+        recorder = Recorder()
+        replying, done = threading.Event(), threading.Event()
+
+        def respond(text, token):
+            yield "Let me think. "
+            replying.set()
+            assert done.wait(timeout=5)
+            yield "Done."
+
+        s = session(recorder, respond)
+        s.feed(pcm(10, 0.0) + pcm(20, 0.5) + pcm(15, 0.0))
+        assert replying.wait(timeout=5)
+        # a cough: shorter than min_speech_frames
+        s.feed(pcm(2, 0.5) + pcm(15, 0.0))
+        s.jitter.join(timeout=5)
+        done.set()
+        s.wait(timeout=5)
+        s.close()
+
+        types = recorder.types()
+        assert "interrupted" not in types
+        assert "response_end" in types
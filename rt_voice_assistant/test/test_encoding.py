@@ -0,0 +1,103 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ..bricks.encoding import (
+    FORMATS,
+    AudioFormat,
+    EncodedAudioCache,
+    NotAcceptable,
+    available,
+    encode,
+    negotiate,
+)
+
+needs_mp3 = pytest.mark.skipif(
+    "mp3" not in FORMATS, reason="libsndfile built without MPEG support"
+)
+
+
+def speechlike(sr: int = 24000, seconds: float = 2.0) -> np.ndarray:
+    t = np.arange(int(sr * seconds)) / sr
+    x = sum(np.sin(2 * np.pi * hz * t) / k for k, hz in enumerate([220, 440, 880], 1))
+    return (0.3 * x * (0.5 + 0.5 * np.sin(2 * np.pi * 3 * t))).astype(np.float32)
+
+
+class TestNegotiate:
+    def test_query_wins_over_accept(self):
+        assert negotiate("audio/mpeg", "flac").name == "flac"
+
+    def test_defaults_to_wav(self):
+        assert negotiate(None).name == "wav"
+        assert negotiate("*/*").name == "wav"
+        assert negotiate("audio/*").name == "wav"
+
+    @needs_mp3
+    def test_preferred_media_type(self):
+        accept = "audio/wav;q=0.5, audio/ogg;codecs=opus, audio/mpeg;q=0.8"
+        assert negotiate(accept).name == "ogg"
+        assert negotiate("audio/ogg;q=0, audio/mpeg;q=0.1").name == "mp3"
+
+    def test_formats_libsndfile_cannot_write(self, monkeypatch):
+        monkeypatch.setattr(sf, "available_formats", lambda: {"WAV": "WAV"})
+        assert available(FORMATS["pcm"])
+        assert available(FORMATS["wav"])
+        assert not available(AudioFormat("mp3", "audio/mpeg", "mp3", "MP3"))
+
+    def test_nothing_acceptable(self):
+        with pytest.raises(NotAcceptable):
+            negotiate("application/json")
+        with pytest.raises(NotAcceptable):
+            negotiate(None, "aiff")
+
+
+class TestEncode:
+    @pytest.mark.parametrize(
+        "name", ["wav", "ogg", pytest.param("mp3", marks=needs_mp3), "flac"]
+    )
+    def test_decodes_back(self, name):
+        x = speechlike()
+        data = encode(x, 24000, FORMATS[name])
+        decoded, sr = sf.read(io.BytesIO(data), dtype="float32")
+        assert sr == 24000
+        assert abs(decoded.size - x.size) < 0.1 * x.size
+
+    @needs_mp3
+    def test_compressed_formats_are_smaller(self):
+        x = speechlike()
+        wav = len(encode(x, 24000, FORMATS["wav"]))
+        assert len(encode(x, 24000, FORMATS["ogg"])) < wav / 4
+        assert len(encode(x, 24000, FORMATS["mp3"])) < wav / 4
+
+    @needs_mp3
+    def test_compression_level(self):
+        x = speechlike()
+        best = encode(x, 24000, FORMATS["mp3"], compression_level=0.0)
+        smallest = encode(x, 24000, FORMATS["mp3"], compression_level=1.0)
+        assert len(smallest) < len(best)
+
+    def test_pcm(self):
+        assert len(encode(np.zeros(100, np.float32), 24000, FORMATS["pcm"])) == 200
+
+    def test_opus_rates(self):
+        data = encode(speechlike(22050), 22050, FORMATS["ogg"])
+        assert sf.info(io.BytesIO(data)).samplerate == 48000
+
+
+class TestEncodedAudioCache:
+    def test_lru_bounded_by_bytes(self):
+        cache = EncodedAudioCache(max_bytes=10)
+        cache.put(("a", "v", "en-us", "mp3", None), b"12345")
+        cache.put(("b", "v", "en-us", "mp3", None), b"12345")
+        assert cache.get(("a", "v", "en-us", "mp3", None)) == b"12345"
+        cache.put(("c", "v", "en-us", "mp3", None), b"12345")
+        assert cache.get(("b", "v", "en-us", "mp3", None)) is None
+        assert cache.get(("a", "v", "en-us", "mp3", None)) is not None
+        assert cache.stats()["bytes"] == 10
+
+    def test_long_texts_are_not_kept(self):
+        cache = EncodedAudioCache(max_text=5)
+        cache.put(("a long answer", "v", "en-us", "wav", None), b"data")
+        assert cache.stats()["entries"] == 0
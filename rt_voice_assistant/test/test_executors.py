@@ -0,0 +1,79 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from ..bricks.cancellation import CancellationToken, current_token
+from ..bricks.executors import BoundedExecutor, Saturated
+
+
+class TestBoundedExecutor:
+    def test_runs_off_the_event_loop(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+
+        async def main():
+            return await executor.run(threading.current_thread)
+
+        assert asyncio.run(main()) is not threading.main_thread()
+        assert executor.stats()["completed"] == 1
+        executor.shutdown()
+
+    def test_rejects_when_the_queue_is_full(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=1)
+        release = threading.Event()
+
+        async def main():
+            running = asyncio.ensure_future(executor.run(release.wait))
+            queued = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            assert executor.stats()["running"] == 1
+            assert executor.stats()["queued"] == 1
+            with pytest.raises(Saturated) as e:
+                await executor.run(release.wait)
+            assert e.value.retry_after >= 1
+            with pytest.raises(Saturated):
+                executor.check()
+            release.set()
+            await asyncio.gather(running, queued)
+            executor.check()  # room again
+
+        asyncio.run(main())
+        assert executor.stats()["rejected"] == 2
+        executor.shutdown()
+
+    def test_carries_the_cancellation_token(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        token = CancellationToken()
+
+        async def main():
+            with token.bound():
+                return await executor.run(current_token)
+
+        assert asyncio.run(main()) is token
+        executor.shutdown()
+
+    def test_an_abandoned_job_keeps_its_slot_until_it_is_done(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        release = threading.Event()
+
+        async def main():
+            waiting = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            waiting.cancel()
+            await asyncio.sleep(0.05)
+            # the worker thread is still busy with the job
+            with pytest.raises(Saturated):
+                executor.check()
+
+        asyncio.run(main())
+        release.set()
+        time.sleep(0.05)
+        executor.check()
+        executor.shutdown()
+
+    def test_blocking_callers(self):
+        executor = BoundedExecutor("test", max_workers=1, max_queue=0)
+        assert executor.call(threading.current_thread) is not threading.main_thread()
+        assert executor.stats()["queued"] == 0
+        executor.shutdown()
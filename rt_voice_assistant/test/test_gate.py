@@ -0,0 +1,105 @@
+from ..bricks.stt.gate import (
+    Segment,
+    Transcript,
+    check_transcript,
+    from_verbose_json,
+    from_whisper_cpp_json,
+)
+
+WHISPER_CPP_JSON = {
+    "result": {"language": "en"},
+    "transcription": [
+        {
+            "offsets": {"from": 0, "to": 1800},
+            "text": " Turn on the lights.",
+            "tokens": [
+                {"text": "[_BEG_]", "p": 0.1},
+                {"text": " Turn", "p": 0.9},
+                {"text": " on", "p": 0.95},
+                {"text": " the", "p": 0.97},
+                {"text": " lights", "p": 0.92},
+                {"text": ".", "p": 0.88},
+                {"text": "[_TT_90]", "p": 0.2},
+            ],
+        }
+    ],
+}
+
+
+def test_whisper_cpp_json_keeps_text_token_probabilities():
+    transcript = from_whisper_cpp_json(WHISPER_CPP_JSON)
+    assert transcript.text == "Turn on the lights."
+    assert transcript.language == "en"
+    assert transcript.segments[0].end == 1.8
+    assert transcript.token_probs == [0.9, 0.95, 0.97, 0.92, 0.88]
+    assert check_transcript(transcript).accepted
+
+
+def test_verbose_json_reports_no_speech_probability():
+    transcript = from_verbose_json(
+        {
+            "text": " Thank you.",
+            "segments": [
+                {
+                    "start": 0.0,
+                    "end": 1.0,
+                    "text": " Thank you.",
+                    "no_speech_prob": 0.9,
+                }
+            ],
+        }
+    )
+    assert check_transcript(transcript).reason == "no-speech"
+
+
+def test_empty_and_annotations_are_rejected():
+    assert check_transcript(None).reason == "empty"
+    assert check_transcript("").reason == "empty"
+    assert check_transcript(" [BLANK_AUDIO] ").reason == "empty"
+    assert check_transcript("(wind blowing) ♪").reason == "empty"
+
+
+def test_hallucinations_need_confident_tokens():
+    doubtful = Transcript(
+        "Thank you.", [Segment(0.0, 0.8, "Thank you.", token_probs=[0.6, 0.7])]
+    )
+    assert check_transcript(doubtful).reason == "hallucination"
+    confident = Transcript(
+        "Thank you.", [Segment(0.0, 0.8, "Thank you.", token_probs=[0.95, 0.9])]
+    )
+    assert check_transcript(confident).accepted
+
+
+def test_hallucinations_on_likely_silence_are_rejected():
+    transcript = Transcript(
+        "Bye.", [Segment(0.0, 0.5, "Bye.", no_speech_prob=0.45, avg_logprob=-0.2)]
+    )
+    assert check_transcript(transcript).reason == "hallucination"
+    transcript.segments[0].no_speech_prob = 0.05
+    assert check_transcript(transcript).accepted
+
+
+def test_listed_phrases_are_kept_without_decoder_evidence():
+    # plain text backends, the streaming CLI and the duplex sessions
+    assert check_transcript("Thank you.").accepted
+    assert check_transcript("Bye!", duration=0.6).accepted
+
+
+def test_low_confidence_is_rejected():
+    transcript = Transcript(
+        "Turn the lights on", [Segment(0.0, 1.5, "", token_probs=[0.2, 0.3, 0.4])]
+    )
+    assert check_transcript(transcript).reason == "low-confidence"
+
+
+def test_loops_are_rejected():
+    assert check_transcript("you " * 12).reason == "repetition"
+    text = "one two three four five six seven eight nine ten eleven twelve"
+    assert check_transcript(text, duration=1.0).reason == "too-fast"
+    assert check_transcript(text, duration=5.0).accepted
+
+
+def test_real_turn_is_accepted_without_the_annotations():
+    decision = check_transcript("[MUSIC] What time is it?")
+    assert decision.accepted
+    assert decision.text == "What time is it?"
@@ -0,0 +1,94 @@
+import io
+import shutil
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ..bricks import ingest
+from ..bricks.ingest import UndecodableAudio, decode_audio, resample, sniff_format
+
+
+def tone(sr: int, seconds: float = 1.0, hz: float = 440.0) -> np.ndarray:
+    t = np.arange(int(sr * seconds)) / sr
+    return (0.5 * np.sin(2 * np.pi * hz * t)).astype(np.float32)
+
+
+def encode(x: np.ndarray, sr: int, format: str, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    sf.write(buffer, x, sr, format=format, **kwargs)
+    return buffer.getvalue()
+
+
+def peak_hz(x: np.ndarray, sr: int) -> float:
+    spectrum = np.abs(np.fft.rfft(x))
+    return np.argmax(spectrum) * sr / x.size
+
+
+class TestSniffFormat:
+    @pytest.mark.parametrize(
+        "format, expected",
+        [("WAV", "wav"), ("FLAC", "flac"), ("OGG", "ogg"), ("AIFF", "aiff")],
+    )
+    def test_soundfile_containers(self, format, expected):
+        assert sniff_format(encode(tone(16000, 0.1), 16000, format)[:16]) == expected
+
+    def test_other_containers(self):
+        assert sniff_format(b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81") == "webm"
+        assert sniff_format(b"\x00\x00\x00\x20ftypM4A ") == "mp4"
+        assert sniff_format(b"ID3\x04\x00") == "mp3"
+        assert sniff_format(b"\xff\xfb\x90\x64") == "mp3"
+        assert sniff_format(b"\xff\xf1\x50\x80") == "aac"
+        assert sniff_format(b"hello world") is None
+
+
+class TestResample:
+    def test_keeps_the_pitch(self):
+        x = resample(tone(44100), 44100, 16000)
+        assert x.dtype == np.float32
+        assert x.size == 16000
+        assert peak_hz(x, 16000) == pytest.approx(440, abs=2)
+        assert np.abs(x).max() == pytest.approx(0.5, abs=0.02)
+
+    def test_removes_what_the_target_rate_cannot_hold(self):
+        x = resample(tone(48000, hz=12000), 48000, 16000)
+        # the tone stopping abruptly at the end is not band-limited
+        assert np.abs(x[:-64]).max() < 0.01
+
+    def test_upsampling_keeps_the_pitch(self):
+        x = resample(tone(24000), 24000, 48000)
+        assert x.size == 48000
+        assert peak_hz(x, 48000) == pytest.approx(440, abs=2)
+        assert np.abs(x).max() == pytest.approx(0.5, abs=0.02)
+
+    def test_blocks_do_not_change_the_result(self, monkeypatch):
+        x = np.random.default_rng(0).standard_normal(4410).astype(np.float32)
+        whole = resample(x, 44100, 16000)
+        monkeypatch.setattr(ingest, "RESAMPLE_BLOCK", 3)
+        assert np.allclose(resample(x, 44100, 16000), whole, atol=1e-6)
+
+
+class TestDecodeAudio:
+    @pytest.mark.parametrize("format", ["WAV", "FLAC", "OGG"])
+    def test_stereo_upload_to_16k_mono(self, format):
+        stereo = np.stack([tone(44100), tone(44100)], axis=1)
+        upload = io.BytesIO(encode(stereo, 44100, format))
+        samples = decode_audio(upload)
+        assert samples.dtype == np.float32
+        assert samples.ndim == 1
+        assert samples.size == 16000
+        assert peak_hz(samples, 16000) == pytest.approx(440, abs=2)
+
+    def test_16k_wav_is_not_resampled(self):
+        x = tone(16000)
+        samples = decode_audio(encode(x, 16000, "WAV", subtype="FLOAT"))
+        assert np.array_equal(samples, x)
+
+    def test_empty_upload(self):
+        with pytest.raises(UndecodableAudio):
+            decode_audio(b"")
+
+    @pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not found")
+    def test_garbage_goes_through_ffmpeg_and_fails(self):
+        with pytest.raises(UndecodableAudio):
+            decode_audio(b"definitely not audio" * 100)
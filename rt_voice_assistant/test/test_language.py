@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+
+from ..bricks.stt import language as language_module
+from ..bricks.stt import whispercpp
+from ..bricks.stt.language import LanguageSession, LanguageSessions, resolve_language
+from ..bricks.stt.whispercpp import parse_detected_language
+
+AUDIO = np.zeros(16000, dtype=np.float32)
+
+
+def detector(*results):
+    calls = []
+    results = iter(results)
+
+    def detect(audio):
+        calls.append(audio)
+        return next(results)
+
+    return detect, calls
+
+
+def test_parse_whisper_cpp_log():
+    log = "whisper_full_with_state: auto-detected language: fr (p = 0.973120)\n"
+    assert parse_detected_language(log) == ("fr", 0.97312)
+    assert parse_detected_language("nothing here") == (None, 0.0)
+
+
+def test_confident_detection_is_pinned():
+    detect, calls = detector(("fr", 0.95))
+    session = LanguageSession(detect)
+    assert session.language_for(AUDIO) == "fr"
+    assert session.language_for(AUDIO) == "fr"
+    assert len(calls) == 1
+    assert session.pinned
+
+
+def test_low_confidence_is_checked_again():
+    detect, calls = detector(("de", 0.3), ("en", 0.4), ("en", 0.45))
+    session = LanguageSession(detect)
+    assert session.language_for(AUDIO) == "de"
+    assert session.language_for(AUDIO) == "en"
+    assert not session.pinned
+    # two agreeing detections pin the language
+    assert session.language_for(AUDIO) == "en"
+    assert session.pinned
+    assert len(calls) == 3
+
+
+def test_pinned_language_is_checked_again():
+    detect, calls = detector(("en", 0.9), ("fr", 0.9), ("fr", 0.95), ("fr", 0.9))
+    session = LanguageSession(detect, recheck_every=3, max_doubts=2)
+    assert session.language_for(AUDIO) == "en"
+    assert session.language_for(AUDIO) == "en"
+    assert session.language_for(AUDIO) == "en"
+    assert len(calls) == 1
+    # the check disagrees: the next turn checks again
+    assert session.language_for(AUDIO) == "fr"
+    assert session.pinned and session.language == "en"
+    # two doubtful checks in a row: the new language is pinned
+    assert session.language_for(AUDIO) == "fr"
+    assert session.pinned and session.language == "fr"
+    assert session.language_for(AUDIO) == "fr"
+    assert len(calls) == 3
+
+
+def test_detection_does_not_hold_the_session():
+    started, release = threading.Barrier(2), threading.Event()
+
+    def detect(audio):
+        started.wait(timeout=5)
+        release.wait(timeout=5)
+        return "fr", 0.9
+
+    session = LanguageSession(detect)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(session.language_for(AUDIO)))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    # both turns are detecting at once
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert results == ["fr", "fr"]
+    assert session.detections == 2
+    assert session.pinned
+
+
+def test_requests_without_a_session_pin_nothing(monkeypatch):
+    sessions = LanguageSessions(lambda audio: ("fr", 0.95))
+    monkeypatch.setattr(language_module, "sessions", sessions)
+    assert resolve_language("auto", AUDIO) == "fr"
+    assert resolve_language("de", AUDIO) == "de"
+    assert sessions.stats() == {"sessions": 0, "pinned": 0, "detections": 1}
+
+
+def test_failed_detection_falls_back_to_the_default():
+    detect, _ = detector((None, 0.0))
+    assert LanguageSession(detect, default="en").language_for(AUDIO) == "en"
+
+
+def test_sessions_are_independent_and_bounded():
+    sessions = LanguageSessions(lambda audio: ("en", 0.9), max_sessions=2)
+    a = sessions.get("a")
+    a.pin("fr")
+    assert sessions.get("b").language_for(AUDIO) == "en"
+    assert sessions.get("a").language_for(AUDIO) == "fr"
+    # "b" is the least recently used session
+    sessions.get("c")
+    assert sessions.stats() == {"sessions": 2, "pinned": 1, "detections": 0}
+    assert sessions.get("a").pinned
+
+
+def test_short_windows_are_not_enough_to_detect():
+    detect, calls = detector(("fr", 0.95))
+    session = LanguageSession(detect, default="en")
+    assert not session.enough_speech(np.zeros(int(0.8 * 16000), dtype=np.float32))
+    assert session.enough_speech(np.zeros(3 * 16000, dtype=np.float32))
+    assert session.guess() == "en"
+    session.language_for(AUDIO)
+    assert session.guess() == "fr"
+    assert len(calls) == 1
+
+
+def test_detection_without_a_multilingual_model_fails_softly(monkeypatch):
+    def no_model(model, language):
+        raise FileNotFoundError("no multilingual model")
+
+    monkeypatch.setattr(whispercpp, "detect_paths", no_model)
+    assert whispercpp.detect_language(AUDIO) == (None, 0.0)
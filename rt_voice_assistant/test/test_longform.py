@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from ..bricks.stt.longform import Chunk, merge_results, plan_chunks, transcribe_long
+
+SR = 100  # one sample per 10 ms keeps the numbers readable
+
+
+def test_regions_are_grouped_up_to_the_chunk_length():
+    regions = [
+        {"start": 0, "end": 300},
+        {"start": 400, "end": 700},
+        {"start": 900, "end": 1000},
+    ]
+    chunks = plan_chunks(regions, 1000, sr=SR, max_chunk_s=8)
+    # the first two regions fit together, the cut is in the middle of the gap
+    assert chunks == [Chunk(0, 0, 700 + 100), Chunk(1, 800, 1000)]
+
+
+def test_long_regions_are_split():
+    chunks = plan_chunks([{"start": 0, "end": 2500}], 2500, sr=SR, max_chunk_s=10)
+    assert [(c.start, c.end) for c in chunks] == [
+        (0, 1000),
+        (1000, 2000),
+        (2000, 2500),
+    ]
+
+
+def test_leading_and_trailing_silence_is_skipped():
+    chunks = plan_chunks([{"start": 200, "end": 400}], 1000, sr=SR)
+    assert [(c.start, c.end) for c in chunks] == [(200, 400)]
+
+
+def test_chunks_are_transcribed_in_parallel_and_yielded_in_order():
+    audio = np.arange(3000, dtype=np.float32)
+    regions = [
+        {"start": 0, "end": 900},
+        {"start": 1000, "end": 1900},
+        {"start": 2000, "end": 2900},
+    ]
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def transcribe(chunk):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        # the first chunk is the slowest one
+        time.sleep(0.05 if chunk[0] == 0 else 0.01)
+        with lock:
+            running[0] -= 1
+        return f"from {int(chunk[0])}"
+
+    results = list(
+        transcribe_long(
+            audio,
+            transcribe,
+            segment_fn=lambda audio, sr: regions,
+            sr=SR,
+            max_workers=3,
+            max_chunk_s=10,
+        )
+    )
+    assert [r.index for r in results] == [0, 1, 2]
+    assert results[1].start == 9.5
+    assert results[1].text == "from 950"
+    assert merge_results(results) == "from 0 from 950 from 1950"
+    assert peak[0] > 1
+
+
+def test_chunks_are_submitted_a_few_at_a_time():
+    audio = np.zeros(5000, dtype=np.float32)
+    regions = [{"start": i * 1000, "end": i * 1000 + 900} for i in range(5)]
+    submitted = []
+
+    class Executor:
+        def submit(self, fn, chunk):
+            submitted.append(len(submitted))
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                return pool.submit(fn, chunk)
+
+    results = transcribe_long(
+        audio,
+        lambda chunk: "x",
+        segment_fn=lambda audio, sr: regions,
+        sr=SR,
+        max_workers=2,
+        max_chunk_s=10,
+        executor=Executor(),
+    )
+    next(results)
+    assert len(submitted) == 3  # two ahead of the consumer, then one more
+    assert len(list(results)) == 4
+    assert len(submitted) == 5
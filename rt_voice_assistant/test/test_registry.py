@@ -0,0 +1,53 @@
+import pytest
+
+from ..bricks.stt.registry import ModelKey, ModelRegistry
+
+MB = 1024 * 1024
+
+
+@pytest.fixture(autouse=True)
+def no_rss(monkeypatch):
+    # use the static size estimates
+    monkeypatch.setattr(
+        "rt_voice_assistant.bricks.stt.registry.resident_set_size", lambda: 0
+    )
+
+
+class TestModelRegistry:
+    def test_model_is_loaded_once(self):
+        registry = ModelRegistry(1000 * MB)
+        loads = []
+        key = ModelKey("whisperx", "tiny", "cpu", "int8")
+        for _ in range(3):
+            model = registry.get(key, lambda: loads.append(1) or object())
+        assert len(loads) == 1
+        assert registry.get(key, lambda: None) is model
+
+    def test_keys_include_device_and_compute_type(self):
+        registry = ModelRegistry(1000 * MB)
+        cpu = registry.get(ModelKey("whisperx", "tiny", "cpu", "int8"), object)
+        gpu = registry.get(ModelKey("whisperx", "tiny", "cuda", "float16"), object)
+        assert cpu is not gpu
+        assert registry.stats()["loads"] == 2
+
+    def test_least_recently_used_model_is_evicted(self):
+        registry = ModelRegistry(500 * MB)
+        tiny = ModelKey("openaiwhisper", "tiny", "cpu")
+        base = ModelKey("openaiwhisper", "base", "cpu")
+        tiny_en = ModelKey("openaiwhisper", "tiny.en", "cpu")
+
+        registry.get(tiny, object)
+        registry.get(base, object)
+        registry.get(tiny, object)  # base is now the least recently used
+        registry.get(tiny_en, object)
+
+        resident = [m["model"] for m in registry.stats()["models"]]
+        assert resident == ["tiny", "tiny.en"]
+        assert registry.evictions == 1
+        assert registry.used_bytes() <= 500 * MB
+
+    def test_model_larger_than_the_budget_stays_resident(self):
+        registry = ModelRegistry(100 * MB)
+        key = ModelKey("whisperx", "medium", "cpu", "int8")
+        model = registry.get(key, object)
+        assert registry.get(key, lambda: None) is model
@@ -0,0 +1,100 @@
+import requests
+from fastapi.testclient import TestClient
+
+from .. import stt_worker
+from ..bricks.stt.remote import RemoteWorker, RemoteWorkerPool, parse_workers
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(response=self)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    """Stands in for the HTTP workers: `down` hosts refuse the connection."""
+
+    def __init__(self, down=()):
+        self.down = set(down)
+        self.posts = []
+
+    def _host(self, url):
+        return url.split("/")[2]
+
+    def get(self, url, timeout=None):
+        if self._host(url) in self.down:
+            raise requests.ConnectionError(url)
+        return FakeResponse()
+
+    def post(self, url, files=None, data=None, timeout=None):
+        host = self._host(url)
+        self.posts.append(host)
+        if host in self.down:
+            raise requests.ConnectionError(url)
+        return FakeResponse(payload={"text": f" {data['model']}@{host} "})
+
+
+def test_parse_workers():
+    workers = parse_workers("http://a:1=small,base; http://b:1/ ;")
+    assert [w.url for w in workers] == ["http://a:1", "http://b:1"]
+    assert workers[0].models == {"small", "base"}
+    assert workers[1].models is None
+
+
+def test_models_only_go_to_the_workers_that_keep_them():
+    session = FakeSession()
+    pool = RemoteWorkerPool(
+        [RemoteWorker("http://a", frozenset({"tiny"})), RemoteWorker("http://b")],
+        session=session,
+    )
+    assert pool.transcribe(b"", "small")["text"] == " small@b "
+    assert pool.transcribe(b"", "tiny")["text"] == " tiny@a "
+
+
+def test_least_outstanding_worker_is_picked():
+    session = FakeSession()
+    pool = RemoteWorkerPool(
+        [RemoteWorker("http://a"), RemoteWorker("http://b")], session=session
+    )
+    pool.workers[0].outstanding = 3
+    pool.transcribe(b"", "small")
+    assert session.posts == ["b"]
+
+
+def test_failed_request_is_retried_on_another_worker():
+    session = FakeSession(down={"a"})
+    pool = RemoteWorkerPool(
+        [RemoteWorker("http://a"), RemoteWorker("http://b")], session=session
+    )
+    assert pool.transcribe(b"", "small")["text"] == " small@b "
+    assert session.posts == ["a", "b"]
+    assert pool.stats()["http://a"]["healthy"] is False
+
+    # the unhealthy worker is skipped until its health check passes
+    session.posts.clear()
+    pool.transcribe(b"", "small")
+    assert session.posts == ["b"]
+    session.down.clear()
+    pool.check_health()
+    assert pool.stats()["http://a"]["healthy"] is True
+
+
+def test_worker_app_speaks_the_inference_protocol(monkeypatch):
+    monkeypatch.setattr(stt_worker, "MODELS", ["base"])
+    monkeypatch.setattr(
+        stt_worker,
+        "transcribe_wav_bytes",
+        lambda audio, model, language: f"{len(audio)} bytes with {model}",
+    )
+    pool = RemoteWorkerPool(
+        [RemoteWorker("http://testserver", frozenset({"base"}))],
+        session=TestClient(stt_worker.app),
+    )
+    assert pool.transcribe(b"RIFF", "base", "en") == {"text": "4 bytes with base"}
@@ -0,0 +1,129 @@
+import time
+import types
+
+import numpy as np
+import pytest
+
+from ..bricks.stt.router import Backend, NoBackendAvailable, STTRouter
+
+ONE_SECOND = np.zeros(16000, dtype=np.float32)
+
+
+def fake_backend(name, text=None, error=None, calls=None, **kwargs):
+    def transcribe_array(audio, model=None, language=None):
+        if calls is not None:
+            calls.append(name)
+        if error:
+            raise error
+        return text
+
+    impl = types.SimpleNamespace(transcribe_array=transcribe_array)
+    return Backend(name, _impl=impl, **kwargs)
+
+
+class TestSTTRouter:
+    def test_preferred_backend_is_used_first(self):
+        calls = []
+        router = STTRouter(
+            [
+                fake_backend("a", "from a", calls=calls),
+                fake_backend("b", "from b", calls=calls),
+            ]
+        )
+        assert router.transcribe_array(ONE_SECOND, "small", "en") == "from a"
+        assert calls == ["a"]
+
+    def test_failing_backend_falls_back(self):
+        calls = []
+        router = STTRouter(
+            [
+                fake_backend("broken", error=RuntimeError("boom"), calls=calls),
+                fake_backend("empty", None, calls=calls),
+                fake_backend("ok", "hello", calls=calls),
+            ]
+        )
+        assert router.transcribe_array(ONE_SECOND, "small", "en") == "hello"
+        assert calls == ["broken", "empty", "ok"]
+        stats = router.stats()
+        assert stats["broken:small"]["errors"] == 1
+        assert stats["ok:small"]["errors"] == 0
+
+    def test_backend_with_a_high_error_rate_is_skipped(self):
+        calls = []
+        router = STTRouter(
+            [
+                fake_backend("broken", error=RuntimeError("boom"), calls=calls),
+                fake_backend("ok", "hello", calls=calls),
+            ],
+            alpha=0.6,
+        )
+        router.transcribe_array(ONE_SECOND, "small", "en")
+        calls.clear()
+        router.transcribe_array(ONE_SECOND, "small", "en")
+        assert calls == ["ok"]
+
+    def test_slow_backend_is_skipped_when_it_would_miss_the_deadline(self):
+        router = STTRouter(
+            [fake_backend("slow", "slow"), fake_backend("fast", "fast")],
+            deadline_s=1.0,
+        )
+        router._stat(router.backends[0], "small").rtf = 2.0
+        router._stat(router.backends[1], "small").rtf = 0.2
+        assert [b.name for b in router.candidates("small", 1.0)] == ["fast", "slow"]
+        # a short utterance still fits the deadline on the preferred backend
+        assert [b.name for b in router.candidates("small", 0.25)] == ["slow", "fast"]
+
+    def test_saturated_backends_are_skipped(self):
+        router = STTRouter([fake_backend("a", "a", max_inflight=1)])
+        router._running["a"] = [time.monotonic()]
+        with pytest.raises(NoBackendAvailable):
+            router.transcribe_array(ONE_SECOND, "small", "en")
+
+    def test_inflight_requests_are_counted_per_backend(self):
+        router = STTRouter([fake_backend("a", "a", max_inflight=1)])
+        # a request for another model holds the only slot
+        router._running["a"] = [time.monotonic()]
+        with pytest.raises(NoBackendAvailable):
+            router.transcribe_array(ONE_SECOND, "tiny", "en")
+
+    def test_backends_are_not_capped_by_default(self):
+        router = STTRouter([fake_backend("a", "a")])
+        router._running["a"] = [time.monotonic()] * 100
+        assert router.transcribe_array(ONE_SECOND, "small", "en") == "a"
+
+    def test_retry_after_is_the_predicted_drain_time(self):
+        router = STTRouter([fake_backend("a", "a", max_inflight=1)], deadline_s=1.0)
+        router._stat(router.backends[0], "small").latency = 5.0
+        router._running["a"] = [time.monotonic() - 1.0]
+        with pytest.raises(NoBackendAvailable) as e:
+            router.transcribe_array(ONE_SECOND, "small", "en")
+        assert 3.5 < e.value.retry_after <= 4.0
+
+    def test_retry_after_is_the_soonest_cooldown_expiry(self):
+        router = STTRouter(
+            [fake_backend("a", "a"), fake_backend("b", "b")], cooldown_s=30.0
+        )
+        now = time.monotonic()
+        for backend, failed_at in zip(router.backends, (now - 5.0, now - 20.0)):
+            s = router._stat(backend, "small")
+            s.error_rate, s.last_error_at = 1.0, failed_at
+        with pytest.raises(NoBackendAvailable) as e:
+            router.transcribe_array(ONE_SECOND, "small", "en")
+        assert 9.5 < e.value.retry_after <= 10.0
+
+    def test_openai_model_alias_is_mapped(self):
+        models = []
+        impl = types.SimpleNamespace(
+            transcribe_array=lambda audio, model, language: models.append(model) or "a"
+        )
+        router = STTRouter([Backend("whisperx", _impl=impl)])
+        assert router.transcribe_array(ONE_SECOND, "whisper-1", "en") == "a"
+        assert models == ["small"]
+        assert "whisperx:small" in router.stats()
+
+    def test_segments_are_joined(self):
+        impl = types.SimpleNamespace(
+            transcribe_array=lambda *args: [{"text": " Hello"}, {"text": " world. "}]
+        )
+        router = STTRouter([Backend("whisperx", _impl=impl)])
+        assert router.transcribe_array(ONE_SECOND) == "Hello world."
@@ -0,0 +1,54 @@
+import io
+import threading
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from ..bricks.audio import to_pcm16, wav_stream_header
+from ..bricks.sentences import SentenceBuffer, pipeline_sentences
+
+
+class TestSentenceBuffer:
+    def test_sentences_complete_on_the_following_whitespace(self):
+        buffer = SentenceBuffer()
+        assert buffer.push("Hello there.") == []
+        assert buffer.push(" How") == ["Hello there."]
+        assert buffer.push(" are you? I") == ["How are you?"]
+        assert buffer.flush() == ["I"]
+
+
+class TestPipelineSentences:
+    def test_first_sentence_before_the_stream_ends(self):
+        release = threading.Event()
+
+        def pieces():
+            yield "One. "
+            yield "Two"
+            release.wait(timeout=5)
+            yield " three."
+
+        sentences = pipeline_sentences(pieces())
+        assert next(sentences) == "One."
+        release.set()
+        assert list(sentences) == ["Two three."]
+
+    def test_errors_reach_the_consumer(self):
+        def pieces():
+            yield "Fine. "
+            raise RuntimeError("stream broke")
+
+        sentences = pipeline_sentences(pieces())
+        assert next(sentences) == "Fine."
+        with pytest.raises(RuntimeError):
+            next(sentences)
+
+
+class TestStreamingWav:
+    def test_header_then_pcm_decodes(self):
+        samples = np.linspace(-0.5, 0.5, 2400, dtype=np.float32)
+        data = wav_stream_header(24000) + to_pcm16(samples)
+        decoded, sr = sf.read(io.BytesIO(data), dtype="float32")
+        assert sr == 24000
+        assert decoded.size == samples.size
+        assert np.allclose(decoded, samples, atol=1e-3)
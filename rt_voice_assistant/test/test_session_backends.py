@@ -0,0 +1,197 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from ..bricks.session_backends import (
+    RedisBackend,
+    RespClient,
+    SQLiteBackend,
+    decode_history,
+    encode_history,
+    read_reply,
+)
+from ..bricks.sessions import SessionUnavailable, SharedSessionStore
+
+
+def words(messages):
+    return sum(len(m["content"].split()) for m in messages)
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """A stand-in for a Redis server: GET, SET PX, DEL and WATCH/MULTI/EXEC."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeRedisHandler)
+        self.lock = threading.Lock()
+        self.data = {}  # key -> (value, expires)
+        self.writes = {}  # key -> number of writes, for WATCH
+        threading.Thread(target=self.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def url(self):
+        return f"redis://127.0.0.1:{self.server_address[1]}/0"
+
+    def get(self, key):
+        value, expires = self.data.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            return None
+        return value
+
+    def set(self, key, value, px=None):
+        expires = time.monotonic() + px / 1000 if px else None
+        self.data[key] = (value, expires)
+        self.writes[key] = self.writes.get(key, 0) + 1
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server: FakeRedis = self.server
+        watched, queued = {}, None
+        while True:
+            try:
+                command = read_reply(self.rfile)
+            except ConnectionError:
+                return
+            name, args = command[0].upper(), command[1:]
+            if queued is not None and name not in (b"EXEC",):
+                queued.append((name, args))
+                self.send(b"+QUEUED\r\n")
+                continue
+            with server.lock:
+                if name == b"WATCH":
+                    watched = {k: server.writes.get(k, 0) for k in args}
+                    self.send(b"+OK\r\n")
+                elif name == b"UNWATCH":
+                    watched = {}
+                    self.send(b"+OK\r\n")
+                elif name == b"MULTI":
+                    queued = []
+                    self.send(b"+OK\r\n")
+                elif name == b"EXEC":
+                    changed = any(
+                        server.writes.get(k, 0) != n for k, n in watched.items()
+                    )
+                    commands, queued, watched = queued, None, {}
+                    if changed:
+                        self.send(b"*-1\r\n")
+                        continue
+                    replies = [self.run(server, n, a) for n, a in commands]
+                    self.send(b"*%d\r\n" % len(replies) + b"".join(replies))
+                else:
+                    self.send(self.run(server, name, args))
+
+    def run(self, server, name, args):
+        if name == b"GET":
+            value = server.get(args[0])
+            if value is None:
+                return b"$-1\r\n"
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            px = int(args[3]) if len(args) > 3 and args[2].upper() == b"PX" else None
+            server.set(args[0], args[1], px)
+            return b"+OK\r\n"
+        if name == b"DEL":
+            existed = server.data.pop(args[0], None) is not None
+            server.writes[args[0]] = server.writes.get(args[0], 0) + 1
+            return b":%d\r\n" % existed
+        return b"-ERR unknown command\r\n"
+
+    def send(self, data):
+        self.wfile.write(data)
+        self.wfile.flush()
+
+
+@pytest.fixture
+def redis():
+    server = FakeRedis()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "sessions.db"))
+    return RedisBackend(RespClient(request.getfixturevalue("redis").url))
+
+
+class TestSerialization:
+    def test_round_trip(self):
+        messages = [
+            {"role": "user", "content": "héllo"},
+            {"role": "assistant", "content": "hi"},
+        ]
+        assert decode_history(encode_history(messages, [1, 1])) == (messages, [1, 1])
+        assert decode_history(None) == ([], [])
+
+
+class TestBackends:
+    def test_compare_and_set(self, backend):
+        assert backend.load("a") == (0, None)
+        assert backend.save("a", b"one", 0, ttl_s=60)
+        assert not backend.save("a", b"stale", 0, ttl_s=60)
+        assert backend.load("a") == (1, b"one")
+        assert backend.save("a", b"two", 1, ttl_s=60)
+        assert not backend.save("a", b"stale", 1, ttl_s=60)
+        assert backend.load("a") == (2, b"two")
+
+    def test_expired_sessions_are_gone(self, backend):
+        assert backend.save("a", b"one", 0, ttl_s=0.05)
+        time.sleep(0.1)
+        assert backend.load("a") == (0, None)
+        assert backend.save("a", b"again", 0, ttl_s=60)
+
+    def test_delete(self, backend):
+        backend.save("a", b"one", 0, ttl_s=60)
+        backend.delete("a")
+        assert backend.load("a") == (0, None)
+
+
+class TestSharedSessionStore:
+    def test_two_processes_share_a_conversation(self, backend):
+        first = SharedSessionStore(backend, words)
+        second = SharedSessionStore(backend, words)
+        with first.session("a") as conversation:
+            conversation.append("user", "hello there")
+        with second.session("a") as conversation:
+            assert conversation.messages == [{"role": "user", "content": "hello there"}]
+            assert conversation.tokens == [2]
+            conversation.append("assistant", "hi")
+        with first.session("a") as conversation:
+            assert len(conversation.messages) == 2
+
+    def test_a_concurrent_change_is_replayed_not_lost(self, backend):
+        first = SharedSessionStore(backend, words)
+        second = SharedSessionStore(backend, words)
+        with first.session("a") as conversation:
+            conversation.append("user", "one")
+            # another node saves the session meanwhile
+            with second.session("a") as other:
+                other.append("user", "two")
+        assert first.conflicts == 1
+        with second.session("a") as conversation:
+            assert [m["content"] for m in conversation.messages] == ["two", "one"]
+
+    def test_clear(self, backend):
+        store = SharedSessionStore(backend, words)
+        with store.session("a") as conversation:
+            conversation.append("user", "one")
+        store.clear("a")
+        with store.session("a") as conversation:
+            assert conversation.messages == []
+
+    def test_a_backend_outage_is_reported_as_unavailable(self):
+        class Down:
+            def load(self, session_id):
+                raise ConnectionRefusedError("no server")
+
+        store = SharedSessionStore(Down(), words)
+        with pytest.raises(SessionUnavailable), store.session("a"):
+            pass
+        assert store.failures == 1
@@ -0,0 +1,104 @@
+import threading
+
+from ..bricks.sessions import MESSAGE_OVERHEAD, SessionStore
+
+
+def words(messages):
+    return sum(len(m["content"].split()) for m in messages)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def store(**kwargs):
+    return SessionStore(words, **kwargs)
+
+
+class TestSessionStore:
+    def test_sessions_are_isolated(self):
+        s = store()
+        with s.session("a") as conversation:
+            conversation.append("user", "hello from a")
+        with s.session("b") as conversation:
+            conversation.append("user", "hello from b")
+            assert s.context(conversation, "system") == [
+                {"role": "system", "content": "system"},
+                {"role": "user", "content": "hello from b"},
+            ]
+
+        s.clear("a")
+        with s.session("a") as conversation:
+            assert conversation.messages == []
+        with s.session("b") as conversation:
+            assert len(conversation.messages) == 1
+
+    def test_context_trims_the_oldest_messages_with_cached_counts(self):
+        counted = []
+
+        def count(messages):
+            counted.append(messages)
+            return words(messages)
+
+        s = SessionStore(count)
+        with s.session("a") as conversation:
+            for i in range(5):
+                conversation.append("user", "one two three")
+            messages = s.context(conversation, "be brief", budget=8)
+            assert len(messages) == 3  # the last two are always kept
+            assert conversation.total_tokens == 6
+            s.context(conversation, "be brief", budget=8)
+        # every message and the system prompt were counted once
+        assert len(counted) == 6
+
+    def test_idle_sessions_expire(self):
+        clock = Clock()
+        s = store(ttl_s=10, clock=clock)
+        with s.session("old") as conversation:
+            conversation.append("user", "hi")
+        clock.now = 11
+        with s.session("new") as conversation:
+            conversation.append("user", "hi")
+        assert s.stats()["sessions"] == 1
+        assert s.stats()["expired"] == 1
+
+    def test_memory_cap_evicts_the_least_recently_used(self):
+        s = store(max_bytes=3 * (MESSAGE_OVERHEAD + 10))
+        for session_id in ["a", "b", "c"]:
+            with s.session(session_id) as conversation:
+                conversation.append("user", "0123456789")
+        with s.session("a"):
+            pass  # a is used again: b is now the oldest
+        with s.session("d") as conversation:
+            conversation.append("user", "0123456789")
+
+        assert s.stats()["evicted"] == 1
+        assert s.stats()["bytes"] == 3 * (MESSAGE_OVERHEAD + 10)
+        with s.session("a") as conversation:
+            assert conversation.messages
+        with s.session("b") as conversation:
+            assert conversation.messages == []
+
+    def test_requests_of_a_session_are_serialized(self):
+        s = store()
+        inside = threading.Event()
+        release = threading.Event()
+
+        def first():
+            with s.session("a") as conversation:
+                inside.set()
+                release.wait(timeout=5)
+                conversation.append("user", "first")
+
+        thread = threading.Thread(target=first)
+        thread.start()
+        assert inside.wait(timeout=5)
+        release.set()
+        with s.session("a") as conversation:
+            conversation.append("user", "second")
+        thread.join()
+        assert [m["content"] for m in conversation.messages] == ["first", "second"]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from ..bricks.frame_processor import Callbacks, FrameProcessor, FrameProcessorOptions
+from ..bricks.silence import TrimOptions, trim_silence
+
+FRAME = 4
+OPTIONS = TrimOptions(margin_frames=1, max_pause_frames=2)
+
+
+def frames_of(audio):
+    return [int(x) for x in audio[::FRAME]]
+
+
+def test_leading_and_trailing_silence_is_trimmed_to_the_margin():
+    probs = [0.0, 0.0, 0.0, 0.9, 0.9, 0.0, 0.0, 0.0]
+    audio = np.repeat(np.arange(len(probs), dtype=np.float32), FRAME)
+    trimmed, time_map = trim_silence(audio, probs, OPTIONS)
+    assert frames_of(trimmed) == [2, 3, 4, 5]
+    assert time_map.to_original_sample(0) == 2 * FRAME
+
+
+def test_long_pauses_are_compacted():
+    probs = [0.9] + [0.0] * 6 + [0.9]
+    audio = np.repeat(np.arange(len(probs), dtype=np.float32), FRAME)
+    trimmed, time_map = trim_silence(audio, probs, OPTIONS)
+    # one frame of the pause kept on each side
+    assert frames_of(trimmed) == [0, 1, 6, 7]
+    assert time_map.to_original_sample(2 * FRAME) == 6 * FRAME
+    assert time_map.to_original(3 * FRAME / 16000) == 7 * FRAME / 16000
+
+
+def test_short_pauses_are_kept():
+    probs = [0.9, 0.0, 0.0, 0.9]
+    audio = np.repeat(np.arange(len(probs), dtype=np.float32), FRAME)
+    trimmed, _ = trim_silence(audio, probs, OPTIONS)
+    assert frames_of(trimmed) == [0, 1, 2, 3]
+
+
+def test_unvoiced_audio_is_untouched():
+    audio = np.ones(3 * FRAME, dtype=np.float32)
+    trimmed, time_map = trim_silence(audio, [0.1, 0.1, 0.1], OPTIONS)
+    assert trimmed is audio
+    assert time_map.to_original_sample(5) == 5
+
+
+def test_frame_processor_reports_one_probability_per_frame():
+    segments = []
+    probs = [0.1, 0.2, 0.9, 0.9, 0.8, 0.0, 0.0, 0.0]
+    it = iter(probs)
+    processor = FrameProcessor(
+        prob_fn=lambda frame: next(it),
+        options=FrameProcessorOptions(
+            frame_samples=FRAME,
+            pre_speech_pad_frames=2,
+            redemption_frames=2,
+            min_speech_frames=2,
+        ),
+        cb=Callbacks(on_speech_segment=lambda audio, p: segments.append((audio, p))),
+    )
+    for i in range(len(probs)):
+        processor.process(np.full(FRAME, i, dtype=np.float32))
+    ((audio, segment_probs),) = segments
+    assert len(audio) == len(segment_probs) * FRAME
+    assert np.allclose(segment_probs, probs[1:])
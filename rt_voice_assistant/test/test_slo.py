@@ -0,0 +1,117 @@
+import types
+
+import numpy as np
+
+from ..bricks.slo import LatencyController, Level, build_ladder
+from ..bricks.stt.router import Backend, STTRouter
+
+ONE_SECOND = np.zeros(16000, dtype=np.float32)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def controller(**kwargs):
+    clock = FakeClock()
+    options = {
+        "target_s": 1.0,
+        "ladder": build_ladder(["small", "base", "tiny"], cpu_count=8),
+        "alpha": 1.0,
+        "hold_s": 5.0,
+        "clock": clock,
+        **kwargs,
+    }
+    return LatencyController(**options), clock
+
+
+class TestLadder:
+    def test_beam_then_models_then_threads(self):
+        assert build_ladder(["small", "base", "tiny"], cpu_count=8) == [
+            Level(),
+            Level("small", beam_size=1),
+            Level("base", beam_size=1),
+            Level("tiny", beam_size=1),
+            Level("tiny", beam_size=1, threads=2),
+        ]
+
+
+class TestLatencyController:
+    def test_only_measures_without_target(self):
+        c, _ = controller(target_s=None)
+        c.observe("stt", 5.0, audio_s=2.0, model="small")
+        assert c.level() == Level()
+        assert c.stats()["rtf"] == {"small": 2.5}
+
+    def test_steps_down_when_over_target(self):
+        c, _ = controller()
+        c.observe("stt", 0.7)
+        c.observe("tts", 0.5)
+        assert c.level() == Level("small", beam_size=1)
+        assert c.downgrades == 1
+
+    def test_holds_after_a_change(self):
+        c, clock = controller()
+        c.observe("stt", 2.0)
+        c.observe("stt", 2.0)
+        assert c.downgrades == 1
+        clock.now = 6.0
+        c.observe("stt", 2.0)
+        assert c.downgrades == 2
+        assert c.model_for("small") == "base"
+
+    def test_steps_up_when_well_under_target(self):
+        c, clock = controller()
+        c.observe("stt", 2.0)
+        clock.now = 6.0
+        c.observe("stt", 0.9)  # between the watermarks: stay
+        assert c.level() == Level("small", beam_size=1)
+        clock.now = 12.0
+        c.observe("stt", 0.3)
+        assert c.level() == Level()
+        assert c.upgrades == 1
+
+    def test_steps_down_when_requests_queue_up(self):
+        c, _ = controller(max_queue=1)
+        with c.track("stt"), c.track("stt"), c.track("tts"):
+            pass
+        assert c.downgrades == 1
+
+    def test_model_for_never_upgrades(self):
+        c, clock = controller()
+        for t in (0, 6, 12):
+            clock.now = t
+            c.observe("stt", 2.0)
+        assert c.model_for("large-v3") == "tiny"
+        assert c.model_for("whisper-1") == "tiny"
+        assert c.model_for(None) == "tiny"
+        assert c.model_for("tiny") == "tiny"
+
+
+class TestRouterWithController:
+    def test_router_asks_for_the_allowed_model(self):
+        models = []
+
+        def transcribe_array(audio, model=None, language=None):
+            models.append(model)
+            return "hello"
+
+        c, clock = controller()
+        router = STTRouter(
+            [
+                Backend(
+                    "a", _impl=types.SimpleNamespace(transcribe_array=transcribe_array)
+                )
+            ],
+            controller=c,
+        )
+        for t in (0, 6):
+            clock.now = t
+            c.observe("stt", 2.0)
+        assert router.transcribe_array(ONE_SECOND, "small", "en") == "hello"
+        assert models == ["base"]
+        assert "base" in c.stats()["rtf"]
@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import pytest
+
+from ..bricks.cancellation import Cancelled
+from ..bricks.frame_processor import Callbacks, FrameProcessor, FrameProcessorOptions
+from ..bricks.stt.streaming import (
+    StreamingCallbacks,
+    StreamingOptions,
+    StreamingTranscriber,
+    agreed_prefix,
+)
+
+SR = 16000
+WORDS = ["ask", "not", "what", "your", "country", "can", "do", "for", "you"]
+
+
+def fake_transcribe(audio: np.ndarray) -> str:
+    """One word per 0.5 s of audio, the last one still uncertain."""
+    n = int(audio.size / (SR / 2))
+    words = WORDS[:n]
+    if words:
+        words[-1] = words[-1].upper() + "?"
+    return " ".join(words)
+
+
+def test_agreed_prefix_ignores_case_and_punctuation():
+    assert agreed_prefix(["Hello,", "world"], ["hello", "World!", "again"]) == 2
+    assert agreed_prefix(["hello", "word"], ["hello", "world"]) == 1
+    assert agreed_prefix([], ["hello"]) == 0
+
+
+def test_partials_commit_a_stable_prefix():
+    partials = []
+    decoded = threading.Event()
+
+    def on_partial(committed, tentative):
+        partials.append((committed, tentative))
+        decoded.set()
+
+    streaming = StreamingTranscriber(
+        fake_transcribe,
+        StreamingOptions(step_ms=500, min_audio_ms=500),
+        StreamingCallbacks(on_partial=on_partial),
+    )
+    for _ in range(4):
+        decoded.clear()
+        streaming.feed(np.zeros(SR // 2, dtype=np.float32))
+        assert decoded.wait(timeout=2)
+
+    committed, tentative = partials[-1]
+    assert committed == "ask not what"
+    assert tentative == "YOUR?"
+    assert streaming.committed_text == "ask not what"
+    streaming.close()
+
+
+def test_committed_words_are_not_revised():
+    hypotheses = iter(
+        [
+            "the cat sat",
+            "the cat sat on",
+            # whisper changes its mind about words already committed
+            "a hat sat on the",
+            "the cat sat on the mat",
+            "the cat sat on the mat today",
+        ]
+    )
+    partials = []
+    decoded = threading.Event()
+
+    def on_partial(committed, tentative):
+        partials.append((committed, tentative))
+        decoded.set()
+
+    streaming = StreamingTranscriber(
+        lambda audio: next(hypotheses),
+        StreamingOptions(step_ms=500, min_audio_ms=500),
+        StreamingCallbacks(on_partial=on_partial),
+    )
+    for _ in range(5):
+        decoded.clear()
+        streaming.feed(np.zeros(SR // 2, dtype=np.float32))
+        assert decoded.wait(timeout=2)
+    streaming.close()
+
+    assert [committed for committed, _ in partials] == [
+        "",
+        "the cat sat",
+        "the cat sat",  # not "a hat sat on"
+        "the cat sat",  # "on the" was only agreed with the rejected hypothesis
+        "the cat sat on the mat",
+    ]
+    assert partials[2][1] == "on the"
+
+
+def test_finish_reuses_the_last_hypothesis_when_nothing_is_pending():
+    calls = []
+
+    def transcribe(audio):
+        calls.append(audio.size)
+        return fake_transcribe(audio)
+
+    decoded = threading.Event()
+    finals = []
+    streaming = StreamingTranscriber(
+        transcribe,
+        StreamingOptions(step_ms=500, min_audio_ms=500),
+        StreamingCallbacks(on_partial=lambda *_: decoded.set(), on_final=finals.append),
+    )
+    streaming.feed(np.zeros(SR, dtype=np.float32))
+    assert decoded.wait(timeout=2)
+
+    assert streaming.finish() == "ask NOT?"
+    assert finals == ["ask NOT?"]
+    assert calls == [SR]
+
+    # the transcriber is ready for the next utterance
+    streaming.feed(np.zeros(SR // 4, dtype=np.float32))
+    assert streaming.finish() == ""
+    streaming.close()
+
+
+def test_a_cancelled_decode_is_not_a_failure():
+    def cancelled(audio):
+        raise Cancelled("barge-in")
+
+    streaming = StreamingTranscriber(
+        cancelled, StreamingOptions(step_ms=500, min_audio_ms=500)
+    )
+    streaming.feed(np.zeros(SR, dtype=np.float32))
+    # the partials stop with the turn
+    streaming._worker.join(timeout=2)
+    assert not streaming._worker.is_alive()
+    with pytest.raises(Cancelled):
+        streaming.finish()
+
+
+def test_frame_processor_streams_the_active_segment():
+    frames = []
+    probs = iter([0.9] * 6 + [0.0] * 4)
+    processor = FrameProcessor(
+        prob_fn=lambda frame: next(probs),
+        options=FrameProcessorOptions(
+            frame_samples=4,
+            pre_speech_pad_frames=2,
+            redemption_frames=2,
+            min_speech_frames=2,
+        ),
+        cb=Callbacks(on_speech_frame=frames.append, on_speech_end=lambda audio: None),
+    )
+    for i in range(10):
+        processor.process(np.full(4, i, dtype=np.float32))
+    assert [int(f[0]) for f in frames] == [0, 1, 2, 3, 4, 5, 6, 7, 8]
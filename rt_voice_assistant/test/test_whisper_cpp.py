@@ -1,6 +1,9 @@
+from unittest.mock import MagicMock, mock_open, patch
+
+import numpy as np
 import pytest
-from unittest.mock import patch, MagicMock, mock_open
-from ..bricks.stt.whispercpp import transcribe
+
+from ..bricks.stt.whispercpp import audio_ctx_for, transcribe, transcribe_array
 
 
 class TestWhisperCpp:
@@ -13,7 +16,6 @@ class TestWhisperCpp:
         self.subprocess_patcher = patch(
             "rt_voice_assistant.bricks.stt.whispercpp.subprocess"
         )
-        self.shutil_patcher = patch("rt_voice_assistant.bricks.stt.whispercpp.shutil")
         self.open_patcher = patch("builtins.open", new_callable=mock_open)
         self.uuid_patcher = patch("rt_voice_assistant.bricks.stt.whispercpp.uuid")
         self.detect_paths_patcher = patch(
@@ -23,7 +25,6 @@ class TestWhisperCpp:
         # Start all patches
         self.mock_os = self.os_patcher.start()
         self.mock_subprocess = self.subprocess_patcher.start()
-        self.mock_shutil = self.shutil_patcher.start()
         self.mock_open = self.open_patcher.start()
         self.mock_uuid = self.uuid_patcher.start()
         self.mock_detect_paths = self.detect_paths_patcher.start()
@@ -69,8 +70,7 @@ class TestWhisperCpp:
             "audios": False,
         }.get(path, False)
 
-        self.mock_os.path.basename.return_value = "test_audio.wav"
-        self.mock_os.path.join.return_value = "audios/test_audio.wav"
+        self.mock_os.path.basename.side_effect = lambda path: path.rsplit("/", 1)[-1]
         self.mock_os.getcwd.return_value = "/test/working/dir"
 
         self.mock_uuid.uuid4.return_value = "test-uuid"
@@ -86,7 +86,6 @@ class TestWhisperCpp:
         # Stop all patches
         self.os_patcher.stop()
         self.subprocess_patcher.stop()
-        self.shutil_patcher.stop()
         self.open_patcher.stop()
         self.uuid_patcher.stop()
         self.detect_paths_patcher.stop()
@@ -143,84 +142,43 @@ class TestWhisperCpp:
 
         # Mock subprocess result
         mock_process = MagicMock()
-        mock_process.stdout = b"docker stdout"
+        mock_process.stdout = b" Docker test\n"
         mock_process.stderr = b"docker stderr"
         mock_process.check_returncode.return_value = None
         self.mock_subprocess.run.return_value = mock_process
 
         # Mock file reading
-        mock_file_content = '{"transcription": [{"text": "Docker test"}]}'
         self.mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
+            b"RIFF audio"
         )
 
         # Call function
         result = transcribe("test_audio.wav", model="small", language="en")
 
-        # Log the actual command that was executed
         call_args = self.mock_subprocess.run.call_args[0][0]
         print(f"\nDOCKER COMMAND: {call_args}")
 
+        # no TTY, the audio on stdin, the model resolved by detect_paths
         expected_command = [
             "docker",
             "run",
-            "-it",
+            "-i",
             "--rm",
             "-v",
             "/test/working/dir/models:/models",
-            "-v",
-            "/test/working/dir/audios:/audios",
-            "-v",
-            "/test/working/dir/outputs:/outputs",
             "ghcr.io/ggml-org/whisper.cpp:main",
-            '"whisper-cli -m /models/ggml-small.en.bin -f /audios/test_audio.wav -ojf -of /outputs/out-test-uuid"',
+            "whisper-cli -m /models/ggml-small.en.bin -f - -nt -np -l en",
         ]
 
         assert call_args == expected_command
+        assert self.mock_subprocess.run.call_args[1]["input"] == b"RIFF audio"
 
         # Assertions
         assert result == "Docker test"
-        # Note: shutil.copy2 is only called when the Docker path is taken and audio_dest_path != input_wav_path
-        # In this test, they are different paths, so copy2 should be called
-        self.mock_shutil.copy2.assert_called_once()
         self.mock_subprocess.run.assert_called_once()
-        self.mock_os.remove.assert_called()
-
-    def test_transcribe_with_docker_no_copy_needed(self):
-        """Test Docker transcription when audio file is already in audios folder."""
-        # Setup detect_paths to return None for binary (will use Docker)
-        self.mock_detect_paths.return_value = (None, "./models/ggml-small.en.bin")
-
-        # Mock path operations to simulate audio file already in audios folder
-        self.mock_os.path.basename.return_value = "test_audio.wav"
-        self.mock_os.path.join.return_value = "audios/test_audio.wav"
-
-        # Mock subprocess result
-        mock_process = MagicMock()
-        mock_process.stdout = b"docker no copy stdout"
-        mock_process.stderr = b"docker no copy stderr"
-        mock_process.check_returncode.return_value = None
-        self.mock_subprocess.run.return_value = mock_process
-
-        # Mock file reading
-        mock_file_content = '{"transcription": [{"text": "No copy needed"}]}'
-        self.mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
-        )
-
-        # Call function with audio path that's already in audios folder
-        result = transcribe("audios/test_audio.wav", model="small", language="en")
-
-        # Log the actual command that was executed
-        call_args = self.mock_subprocess.run.call_args[0][0]
-        print(f"\nDOCKER NO COPY COMMAND: {call_args}")
-
-        # Assertions
-        assert result == "No copy needed"
-        # shutil.copy2 should NOT be called since audio_dest_path == input_wav_path
-        self.mock_shutil.copy2.assert_not_called()
-        self.mock_subprocess.run.assert_called_once()
-        self.mock_os.remove.assert_called()
+        # nothing is copied nor written next to the app
+        self.mock_os.mkdir.assert_not_called()
+        self.mock_os.remove.assert_not_called()
 
     def test_transcribe_model_not_found(self):
         """Test transcription when model file doesn't exist."""
@@ -389,15 +347,14 @@ class TestWhisperCpp:
 
         # Mock subprocess result
         mock_process = MagicMock()
-        mock_process.stdout = b"elevated docker stdout"
+        mock_process.stdout = b"Elevated Docker test"
         mock_process.stderr = b"elevated docker stderr"
         mock_process.check_returncode.return_value = None
         self.mock_subprocess.run.return_value = mock_process
 
         # Mock file reading
-        mock_file_content = '{"transcription": [{"text": "Elevated Docker test"}]}'
         self.mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
+            b"RIFF audio"
         )
 
         # Call function
@@ -416,25 +373,20 @@ class TestWhisperCpp:
             "sudo",
             "docker",
             "run",
-            "-it",
+            "-i",
             "--rm",
             "-v",
             "/test/working/dir/models:/models",
-            "-v",
-            "/test/working/dir/audios:/audios",
-            "-v",
-            "/test/working/dir/outputs:/outputs",
             "ghcr.io/ggml-org/whisper.cpp:main",
-            '"whisper-cli -m /models/ggml-small.en.bin -f /audios/test_audio.wav -ojf -of /outputs/out-test-uuid"',
+            "whisper-cli -m /models/ggml-small.en.bin -f - -nt -np -l en",
         ]
 
         assert call_args == expected_command
 
         # Assertions
         assert result == "Elevated Docker test"
-        self.mock_shutil.copy2.assert_called_once()
         self.mock_subprocess.run.assert_called_once()
-        self.mock_os.remove.assert_called()
+        self.mock_os.remove.assert_not_called()
 
     def test_transcribe_with_elevated_docker_false(self):
         """Test transcription using Docker without sudo when WHISPER_CPP_USE_ELEVATED_DOCKER is false."""
@@ -451,15 +403,14 @@ class TestWhisperCpp:
 
         # Mock subprocess result
         mock_process = MagicMock()
-        mock_process.stdout = b"non-elevated docker stdout"
+        mock_process.stdout = b"Non-elevated Docker test"
         mock_process.stderr = b"non-elevated docker stderr"
         mock_process.check_returncode.return_value = None
         self.mock_subprocess.run.return_value = mock_process
 
         # Mock file reading
-        mock_file_content = '{"transcription": [{"text": "Non-elevated Docker test"}]}'
         self.mock_open.return_value.__enter__.return_value.read.return_value = (
-            mock_file_content
+            b"RIFF audio"
         )
 
         # Call function
@@ -477,22 +428,69 @@ class TestWhisperCpp:
         expected_command = [
             "docker",
             "run",
-            "-it",
+            "-i",
             "--rm",
             "-v",
             "/test/working/dir/models:/models",
-            "-v",
-            "/test/working/dir/audios:/audios",
-            "-v",
-            "/test/working/dir/outputs:/outputs",
             "ghcr.io/ggml-org/whisper.cpp:main",
-            '"whisper-cli -m /models/ggml-small.en.bin -f /audios/test_audio.wav -ojf -of /outputs/out-test-uuid"',
+            "whisper-cli -m /models/ggml-small.en.bin -f - -nt -np -l en",
         ]
 
         assert call_args == expected_command
 
         # Assertions
         assert result == "Non-elevated Docker test"
-        self.mock_shutil.copy2.assert_called_once()
         self.mock_subprocess.run.assert_called_once()
-        self.mock_os.remove.assert_called()
+        self.mock_os.remove.assert_not_called()
+
+    def test_transcribe_array_pipes_audio_through_stdio(self):
+        """Test in-memory transcription: WAV on stdin, text on stdout, no files."""
+        self.mock_detect_paths.return_value = (
+            "/test/home/whisper.cpp/build/bin/whisper-cli",
+            "./models/ggml-small.en.bin",
+        )
+
+        mock_process = MagicMock()
+        mock_process.stdout = b" Hello\n world \n"
+        mock_process.stderr = b""
+        mock_process.check_returncode.return_value = None
+        self.mock_subprocess.run.return_value = mock_process
+
+        audio = np.zeros(1600, dtype=np.float32)
+        result = transcribe_array(audio, model="small", language="en")
+
+        call_args = self.mock_subprocess.run.call_args[0][0]
+        assert call_args == [
+            "/test/home/whisper.cpp/build/bin/whisper-cli",
+            "-m",
+            "./models/ggml-small.en.bin",
+            "-f",
+            "-",
+            "-nt",
+            "-np",
+            "-l",
+            "en",
+            # 0.1 s of audio: the smallest encoder context
+            "-ac",
+            "128",
+        ]
+        stdin = self.mock_subprocess.run.call_args[1]["input"]
+        assert stdin[:4] == b"RIFF"
+        assert result == "Hello world"
+        self.mock_open.assert_not_called()
+        self.mock_os.remove.assert_not_called()
+
+
+def test_audio_ctx_is_sized_from_the_utterance(monkeypatch):
+    monkeypatch.delenv("WHISPER_AUDIO_CTX", raising=False)
+    monkeypatch.delenv("WHISPER_AUDIO_CTX_MARGIN", raising=False)
+    assert audio_ctx_for(0.5) == 128
+    # 2 s + 25% margin = 125 positions, plus padding, rounded to 64
+    assert audio_ctx_for(2.0) == 192
+    assert audio_ctx_for(30.0) is None
+    assert audio_ctx_for(None) is None
+
+    monkeypatch.setenv("WHISPER_AUDIO_CTX", "0")
+    assert audio_ctx_for(2.0) is None
+    monkeypatch.setenv("WHISPER_AUDIO_CTX", "768")
+    assert audio_ctx_for(2.0) == 768
@@ -0,0 +1,164 @@
+import threading
+from typing import ClassVar
+
+import requests
+
+from ..bricks.stt.whispercpp_server import DockerWhisperServerWorker, WhisperServerPool
+
+
+class FakeWorker:
+    """Stands in for a whisper-server process."""
+
+    started: ClassVar[list] = []
+
+    def __init__(self, binary, model_path, language=None):
+        self.model_path = model_path
+        self.language = language
+        self.alive = False
+        self.restarts = 0
+        self.fail_next = False
+
+    def start(self):
+        self.alive = True
+        FakeWorker.started.append(self)
+
+    def stop(self):
+        self.alive = False
+
+    def restart(self):
+        self.restarts += 1
+        self.alive = True
+        self.fail_next = False
+
+    def is_alive(self):
+        return self.alive
+
+    def healthy(self):
+        return self.alive
+
+    def inference(self, audio, language=None, **params):
+        if self.fail_next:
+            raise requests.ConnectionError("worker died")
+        return {"text": f"{self.model_path}:{language or self.language}:{len(audio)}"}
+
+
+class TestWhisperServerPool:
+    def setup_method(self):
+        FakeWorker.started = []
+        self.pool = WhisperServerPool(
+            "whisper-server", size=2, health_interval=0, worker_factory=FakeWorker
+        )
+
+    def teardown_method(self):
+        self.pool.shutdown()
+
+    def test_worker_is_reused_across_requests(self):
+        for _ in range(3):
+            result = self.pool.transcribe(b"abc", "ggml-small.en.bin", "en")
+        assert result == {"text": "ggml-small.en.bin:en:3"}
+        assert len(FakeWorker.started) == 1
+
+    def test_workers_are_keyed_by_model_and_language(self):
+        self.pool.transcribe(b"a", "ggml-small.bin", "fr")
+        self.pool.transcribe(b"a", "ggml-small.bin", "de")
+        self.pool.transcribe(b"a", "ggml-base.bin", "fr")
+        assert len(FakeWorker.started) == 3
+
+    def test_warm_up_starts_the_configured_pool_size(self):
+        self.pool.warm_up("ggml-small.en.bin", "en")
+        assert len(FakeWorker.started) == 2
+        assert self.pool.stats()["ggml-small.en.bin:en"]["idle"] == 2
+
+    def test_crashed_worker_is_restarted(self):
+        self.pool.transcribe(b"a", "ggml-small.en.bin", "en")
+        worker = FakeWorker.started[0]
+        worker.alive = False
+        self.pool.check_health()
+        assert worker.restarts == 1
+        assert worker.alive
+
+    def test_connection_error_restarts_and_retries(self):
+        self.pool.transcribe(b"a", "ggml-small.en.bin", "en")
+        worker = FakeWorker.started[0]
+        worker.fail_next = True
+        result = self.pool.transcribe(b"ab", "ggml-small.en.bin", "en")
+        assert result == {"text": "ggml-small.en.bin:en:2"}
+        assert worker.restarts == 1
+
+    def test_health_check_skips_busy_workers(self):
+        with self.pool.worker("ggml-small.en.bin", "en") as worker:
+            worker.alive = False  # e.g. still loading, or mid-request
+            self.pool.check_health()
+            assert worker.restarts == 0
+        self.pool.check_health()
+        assert worker.restarts == 1
+
+    def test_workers_are_capped_across_keys(self):
+        pool = WhisperServerPool(
+            "whisper-server",
+            size=2,
+            health_interval=0,
+            worker_factory=FakeWorker,
+            max_workers=2,
+        )
+        pool.warm_up("ggml-small.bin", "fr")
+        with pool.worker("ggml-small.bin", "fr") as busy:
+            # the busy worker stays, the idle one gives its slot up
+            pool.transcribe(b"a", "ggml-small.bin", "de")
+            stats = pool.stats()
+            assert stats["ggml-small.bin:fr"]["workers"] == 1
+            assert stats["ggml-small.bin:de"]["workers"] == 1
+            assert [w.alive for w in FakeWorker.started[:2]].count(False) == 1
+            assert busy.alive
+        assert pool.evictions == 1
+        pool.shutdown()
+
+    def test_a_full_pool_waits_for_an_idle_worker(self):
+        pool = WhisperServerPool(
+            "whisper-server",
+            size=1,
+            health_interval=0,
+            worker_factory=FakeWorker,
+            max_workers=1,
+        )
+        results = []
+        with pool.worker("ggml-small.bin", "fr"):
+            thread = threading.Thread(
+                target=lambda: results.append(
+                    pool.transcribe(b"a", "ggml-small.bin", "de")
+                )
+            )
+            thread.start()
+            thread.join(timeout=0.1)
+            assert not results
+        thread.join(timeout=2)
+        assert results == [{"text": "ggml-small.bin:de:1"}]
+        assert len(FakeWorker.started) == 2
+        pool.shutdown()
+
+
+def test_docker_sidecar_command():
+    worker = DockerWhisperServerWorker(
+        "ghcr.io/ggml-org/whisper.cpp:main",
+        "/srv/models/ggml-small.en.bin",
+        "en",
+        port=40123,
+        elevated=True,
+    )
+    assert worker.command() == [
+        "sudo",
+        "docker",
+        "run",
+        "-d",
+        "--rm",
+        "--label",
+        "rt-voice-assistant=whisper-server",
+        "-p",
+        "127.0.0.1:40123:8080",
+        "-v",
+        "/srv/models:/models",
+        "ghcr.io/ggml-org/whisper.cpp:main",
+        "whisper-server -m /models/ggml-small.en.bin --host 0.0.0.0 --port 8080 -l en",
+    ]
+    assert worker.url == "http://127.0.0.1:40123"
+    assert not worker.is_alive()
@@ -0,0 +1,95 @@
+import importlib
+import importlib.util
+import sys
+import threading
+import types
+
+import numpy as np
+import pytest
+
+SR = 16000
+
+
+class FakeTokenizer:
+    def __init__(self, hf_tokenizer, multilingual, task, language):
+        self.language_code = language
+
+
+class FakePipeline:
+    """Tells the chunks apart by their first sample."""
+
+    def __init__(self):
+        self.tokenizer = None
+        self.model = types.SimpleNamespace(
+            hf_tokenizer=None, model=types.SimpleNamespace(is_multilingual=True)
+        )
+        self.batches = []
+
+    def __call__(self, inputs, batch_size, num_workers):
+        chunks = [item["inputs"] for item in inputs]
+        self.batches.append(len(chunks))
+        language = self.tokenizer.language_code
+        return [{"text": f" {language}{int(chunk[0])} "} for chunk in chunks]
+
+    def transcribe(self, audio, batch_size, language):
+        return {"segments": [{"text": language}]}
+
+
+@pytest.fixture
+def whisperx(monkeypatch):
+    # the tests run without the whisperx and faster-whisper packages
+    tokenizer = types.ModuleType("faster_whisper.tokenizer")
+    tokenizer.Tokenizer = FakeTokenizer
+    monkeypatch.setitem(sys.modules, "whisperx", types.ModuleType("whisperx"))
+    monkeypatch.setitem(
+        sys.modules, "faster_whisper", types.ModuleType("faster_whisper")
+    )
+    monkeypatch.setitem(sys.modules, "faster_whisper.tokenizer", tokenizer)
+    name = importlib.util.resolve_name("..bricks.stt.whisperx", __package__)
+    monkeypatch.delitem(sys.modules, name, False)
+    module = importlib.import_module(name)
+    pipeline = FakePipeline()
+    monkeypatch.setattr(module, "load_model", lambda *args, **kwargs: pipeline)
+    yield module, pipeline
+    # the next import gets the real packages again
+    sys.modules.pop(module.__name__, None)
+
+
+def utterance(seconds: float, first: int) -> np.ndarray:
+    """Every 30 s chunk starts with its own number: first, first + 1, ..."""
+    audio = np.zeros(int(seconds * SR), dtype=np.float32)
+    for i, start in enumerate(range(0, audio.size, 30 * SR)):
+        audio[start] = first + i
+    return audio
+
+
+class TestTranscribeMany:
+    def test_chunks_are_given_back_to_their_utterance(self, whisperx):
+        module, pipeline = whisperx
+        texts = module.transcribe_many(
+            [utterance(70, 1), utterance(5, 7), utterance(31, 8)], language="fr"
+        )
+        assert texts == ["fr1 fr2 fr3", "fr7", "fr8 fr9"]
+        assert pipeline.batches == [6]  # one batched inference
+
+    def test_the_tokenizer_follows_the_language(self, whisperx):
+        module, pipeline = whisperx
+        assert module.transcribe_many([utterance(1, 1)]) == ["en1"]
+        assert module.transcribe_many([utterance(1, 1)], language="de") == ["de1"]
+        assert pipeline.tokenizer.language_code == "de"
+
+    def test_transcribe_waits_for_the_batches(self, whisperx, monkeypatch):
+        module, _ = whisperx
+        monkeypatch.setattr(
+            sys.modules["whisperx"], "load_audio", lambda path: np.zeros(SR), False
+        )
+        results = []
+        with module._pipeline_lock:
+            thread = threading.Thread(
+                target=lambda: results.append(module.transcribe("a.wav", language="it"))
+            )
+            thread.start()
+            thread.join(timeout=0.1)
+            assert not results  # a batch holds the pipeline
+        thread.join(timeout=2)
+        assert results == [[{"text": "it"}]]